@@ -19,31 +19,123 @@
 
 """This package contains round behaviours of VotingAbciApp."""
 
+import hashlib
+import json
+import math
+import mmap
+import os
+import statistics
+import time
 from abc import ABC
-from typing import Generator, Set, Type, cast
+from dataclasses import dataclass, field, replace
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+import numpy as np
+from aea.protocols.base import Message
 
-from packages.valory.skills.abstract_round_abci.base import AbstractRound
+from packages.valory.contracts.gnosis_safe.contract import (
+    GnosisSafeContract,
+    SafeOperation,
+)
+from packages.valory.protocols.contract_api import ContractApiMessage
+from packages.valory.protocols.http import HttpMessage
+from packages.valory.protocols.ipfs import IpfsMessage
+from packages.valory.protocols.ipfs.dialogues import IpfsDialogue
+from packages.valory.protocols.ledger_api import LedgerApiMessage
+from packages.valory.skills.abstract_round_abci.base import AbstractRound, get_name
+from packages.valory.skills.abstract_round_abci.behaviour_utils import (
+    TimeoutException,
+)
 from packages.valory.skills.abstract_round_abci.behaviours import (
     AbstractRoundBehaviour,
     BaseBehaviour,
 )
-from packages.valory.skills.learning_abci.models import Params, SharedState
+from packages.valory.skills.abstract_round_abci.io_.store import SupportedFiletype
+from packages.valory.skills.abstract_round_abci.models import Requests
+from packages.valory.skills.abstract_round_abci.utils import (
+    get_data_from_nested_dict,
+)
+from packages.valory.skills.learning_abci.columnar import decode_table, read_header
+from packages.valory.skills.learning_abci.ipfs_tools import (
+    build_manifest,
+    decode_binary,
+    encode_binary,
+    get_chunk_name,
+    get_cid,
+    get_directory_cid,
+    get_manifest_cid,
+    get_manifest_name,
+    is_same_cid,
+    read_chunks,
+)
+from packages.valory.skills.learning_abci.models import (
+    BenchmarkTool,
+    FeeOracle,
+    FeeQuote,
+    IPFSCache,
+    Params,
+    PriceObservation,
+    PriceVector,
+    RateLimiter,
+    SharedState,
+)
+from packages.valory.skills.learning_abci.multisend import (
+    MultisendQueue,
+    get_multisend_data,
+)
+from packages.valory.skills.learning_abci.payload_tools import (
+    decode_prices,
+    encode_prices,
+    encode_reports,
+    encode_transfers,
+    is_attested_by,
+)
 from packages.valory.skills.learning_abci.payloads import (
     APICheckPayload,
+    CustomContractPayload,
     DecisionMakingPayload,
-    TxPreparationPayload,
-    IPFSStoragePayload,
+    IPFSPayload,
     MultisendTxPayload,
+    TxPreparationPayload,
+)
+from packages.valory.skills.learning_abci.reports import (
+    DATASET_COLUMN_PREFIX,
+    INDEX_FILENAME,
+    PRICE_COLUMN_PREFIX,
+    build_batch,
+    encode_report,
+    is_batch_due,
 )
 from packages.valory.skills.learning_abci.rounds import (
     APICheckRound,
+    CustomContractRound,
     DecisionMakingRound,
-    Event,
-    learningAbciApp,
-    SynchronizedData,
-    TxPreparationRound,
+    IPFSRetrieveRound,
     IPFSStoreRound,
     MultisendTxRound,
+    SynchronizedData,
+    TxPreparationRound,
+    VotingAbciApp,
+)
+from packages.valory.skills.learning_abci.safe_tx import get_safe_tx_hash
+from packages.valory.skills.transaction_settlement_abci.payload_tools import (
+    hash_payload_to_hex,
+)
+from packages.valory.skills.transaction_settlement_abci.rounds import (
+    SynchronizedData as TxSettlementSynchronizedData,
 )
 
 
@@ -51,8 +143,30 @@ HTTP_OK = 200
 GNOSIS_CHAIN_ID = "gnosis"
 TX_DATA = b"0x"
 SAFE_GAS = 0
+TRANSFER_VALUE = 1
 VALUE_KEY = "value"
 TO_ADDRESS_KEY = "to_address"
+API_KEY_PLACEHOLDER = "{api_key}"
+TOKEN_IDS_PLACEHOLDER = "{ids}"
+TOKEN_ID_PLACEHOLDER = "{id}"
+RETRIABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+@dataclass
+class PriceQuery:
+    """The state of a concurrent query of the price sources."""
+
+    deadline: float
+    prices: Dict[str, PriceVector] = field(default_factory=dict)
+    responses: Dict[str, str] = field(default_factory=dict)
+    failed: Set[str] = field(default_factory=set)
+    scheduled: Dict[str, float] = field(default_factory=dict)
+    attempts: Dict[str, int] = field(default_factory=dict)
+
+    def has_due_requests(self) -> bool:
+        """Check whether a scheduled request is due."""
+        now = time.time()
+        return any(send_at <= now for send_at in self.scheduled.values())
 
 
 class VotingBaseBehaviour(BaseBehaviour, ABC):
@@ -73,8 +187,777 @@ class VotingBaseBehaviour(BaseBehaviour, ABC):
         """Return the state."""
         return cast(SharedState, self.context.state)
 
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """Return the rate limiter of the outbound HTTP requests."""
+        return cast(RateLimiter, self.context.rate_limiter)
+
+    @property
+    def fee_oracle(self) -> FeeOracle:
+        """Return the fee oracle of the transactions."""
+        return cast(FeeOracle, self.context.fee_oracle)
+
+    @property
+    def ipfs_cache(self) -> IPFSCache:
+        """Return the cache of the files retrieved from IPFS."""
+        return cast(IPFSCache, self.context.ipfs_cache)
+
+    @property
+    def benchmark_tool(self) -> BenchmarkTool:
+        """Return the benchmark tool."""
+        return cast(BenchmarkTool, self.context.benchmark_tool)
+
+    def get_ipfs_files(
+        self, cid: str, use_cache: bool = True
+    ) -> Generator[None, None, Optional[Dict[str, Union[bytes, mmap.mmap]]]]:
+        """
+        Get the files of a CID, from the local cache if possible, otherwise from IPFS.
+
+        :param cid: the CID.
+        :param use_cache: whether to look the files up in the local cache, and to cache them.
+        :yield: None
+        :return: the content of each file, by name, or None if the files could not be retrieved
+        """
+        if use_cache:
+            cached = self.ipfs_cache.get(cid)
+            if cached is not None:
+                self.context.logger.info(f"Retrieved {cid} from the IPFS cache.")
+                return cached
+
+        ipfs_message, ipfs_dialogue = self._build_ipfs_get_file_req(
+            cid, timeout=self.params.ipfs_timeout
+        )
+        response = yield from self._do_ipfs_request(
+            ipfs_dialogue, ipfs_message, timeout=self.params.ipfs_timeout
+        )
+        if response.performative != IpfsMessage.Performative.FILES:
+            self.context.logger.error(f"Could not retrieve {cid} from IPFS: {response}")
+            return None
+
+        files = {name: data.encode() for name, data in response.files.items()}
+        if use_cache and not self.ipfs_cache.put(cid, files):
+            # e.g. a directory, whose CID cannot be verified without the name of the directory
+            self.context.logger.debug(f"The files of {cid} were not cached.")
+        return files
+
+    def get_dataset_path(self, path: str) -> str:
+        """Get the path of a dataset, which is relative to the data directory of the agent unless it is absolute."""
+        return os.path.join(self.context.data_dir, path)
+
+    def get_file_manifest(self, path: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the manifest of a file which is stored on IPFS in chunks.
+
+        Building the manifest reads the whole file, so it is only built again once the file has changed.
+
+        :param path: the path of the file.
+        :param name: the name under which the file is stored.
+        :return: the manifest, or None if the file cannot be read
+        """
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            self.context.logger.error(f"Could not read {path}: {e}")
+            return None
+        version = (stat.st_size, stat.st_mtime_ns)
+        chunk_size = self.params.ipfs_chunk_size
+        built = self.local_state.file_manifests.get(path)
+        if built is not None:
+            built_version, manifest = built
+            if (
+                built_version == version
+                and manifest["name"] == name
+                and manifest["chunk_size"] == chunk_size
+            ):
+                return manifest
+        try:
+            manifest = build_manifest(path, name, chunk_size)
+        except OSError as e:
+            self.context.logger.error(f"Could not read {path}: {e}")
+            return None
+        self.local_state.file_manifests[path] = (version, manifest)
+        return manifest
+
+    def _store_ipfs_file(
+        self, ipfs_message: IpfsMessage, ipfs_dialogue: IpfsDialogue, cid: str
+    ) -> Generator[None, None, bool]:
+        """Send a request to store a file on IPFS, and check that the file was stored under the expected CID."""
+        response = yield from self._do_ipfs_request(
+            ipfs_dialogue, ipfs_message, timeout=self.params.ipfs_timeout
+        )
+        if response.performative != IpfsMessage.Performative.IPFS_HASH:
+            self.context.logger.error(f"Could not store {cid} on IPFS: {response}")
+            return False
+        if not is_same_cid(response.ipfs_hash, cid):
+            self.context.logger.error(
+                f"The file was stored as {response.ipfs_hash}, instead of {cid}."
+            )
+            return False
+        return True
+
+    def upload_file(self, path: str, name: str) -> Generator[None, None, Optional[str]]:
+        """
+        Upload a file to IPFS in chunks, followed by its manifest, holding a single chunk in memory at a time.
+
+        The chunks are stored one after the other, and the progress and the throughput of the upload
+        are reported to the benchmark tool.
+
+        :param path: the path of the file.
+        :param name: the name under which the file is stored.
+        :yield: None
+        :return: the CID of the manifest, or None if the file could not be uploaded
+        """
+        manifest = self.get_file_manifest(path, name)
+        if manifest is None:
+            return None
+        manifest_cid = get_manifest_cid(manifest)
+        if manifest_cid in self.local_state.uploaded_cids:
+            return manifest_cid
+
+        transfer = f"upload_{name}"
+        self.benchmark_tool.start_transfer(transfer, manifest["size"])
+        started_at = time.time()
+        chunks = read_chunks(path, manifest["chunk_size"])
+        for index, (chunk, chunk_cid) in enumerate(zip(chunks, manifest["chunks"])):
+            filename = os.path.join(self.context.data_dir, get_chunk_name(name, index))
+            ipfs_message, ipfs_dialogue = self._build_ipfs_message(
+                performative=IpfsMessage.Performative.STORE_FILES,  # type: ignore
+                files={filename: encode_binary(chunk).decode()},
+                timeout=self.params.ipfs_timeout,
+            )
+            stored = yield from self._store_ipfs_file(
+                ipfs_message, ipfs_dialogue, chunk_cid
+            )
+            if not stored:
+                return None
+            self.benchmark_tool.measure_transfer(
+                transfer, len(chunk), time.time() - started_at
+            )
+
+        filename = os.path.join(self.context.data_dir, get_manifest_name(name))
+        ipfs_message, ipfs_dialogue = self._build_ipfs_store_file_req(
+            filename,
+            manifest,
+            filetype=SupportedFiletype.JSON,
+            timeout=self.params.ipfs_timeout,
+        )
+        stored = yield from self._store_ipfs_file(
+            ipfs_message, ipfs_dialogue, manifest_cid
+        )
+        if not stored:
+            return None
+        throughput = self.benchmark_tool.transfer_data[transfer].throughput
+        self.context.logger.info(
+            f"Uploaded {name} as {manifest_cid}: {manifest['size']} bytes in "
+            f"{len(manifest['chunks'])} chunks, at {throughput / 1024:.1f} KiB/s."
+        )
+        self.local_state.uploaded_cids.add(manifest_cid)
+        return manifest_cid
+
+    def download_file(self, cid: str, path: str) -> Generator[None, None, bool]:
+        """
+        Download a file which is stored on IPFS in chunks, writing it chunk by chunk.
+
+        The file is written aside and only moved to its path once its size and its digest match its manifest.
+
+        :param cid: the CID of the manifest of the file.
+        :param path: the path to write the file to.
+        :yield: None
+        :return: whether the file was downloaded
+        """
+        files = yield from self.get_ipfs_files(cid)
+        if files is None:
+            return False
+        try:
+            ((_, data),) = files.items()
+            manifest = json.loads(bytes(data))
+        except ValueError as e:
+            self.context.logger.error(f"{cid} is not the manifest of a file: {e}")
+            return False
+
+        partial_path = f"{path}.part"
+        with open(partial_path, "wb") as file:
+            digest = yield from self._download_chunks(manifest, file)
+        if (
+            digest != manifest["sha256"]
+            or os.path.getsize(partial_path) != manifest["size"]
+        ):
+            self.context.logger.error(f"Could not download {manifest['name']} ({cid}).")
+            os.remove(partial_path)
+            return False
+        os.replace(partial_path, path)
+        stat = os.stat(path)
+        self.local_state.file_manifests[path] = (
+            (stat.st_size, stat.st_mtime_ns),
+            manifest,
+        )
+        throughput = self.benchmark_tool.transfer_data[
+            f"download_{manifest['name']}"
+        ].throughput
+        self.context.logger.info(
+            f"Downloaded {manifest['name']} ({cid}) to {path}, at {throughput / 1024:.1f} KiB/s."
+        )
+        return True
+
+    def _download_chunks(
+        self, manifest: Dict[str, Any], file: BinaryIO
+    ) -> Generator[None, None, Optional[str]]:
+        """
+        Download the chunks of a file, bypassing the IPFS cache, and write them to the given file.
+
+        :param manifest: the manifest of the file.
+        :param file: the file to write the chunks to.
+        :yield: None
+        :return: the SHA-256 digest of the written content, or None if a chunk could not be downloaded
+        """
+        name = manifest["name"]
+        transfer = f"download_{name}"
+        self.benchmark_tool.start_transfer(transfer, manifest["size"])
+        started_at = time.time()
+        digest = hashlib.sha256()
+        for index, chunk_cid in enumerate(manifest["chunks"]):
+            files = yield from self.get_ipfs_files(chunk_cid, use_cache=False)
+            if files is None:
+                return None
+            chunk_name = get_chunk_name(name, index)
+            data = files.get(chunk_name)
+            if data is None or not is_same_cid(get_cid(chunk_name, data), chunk_cid):
+                self.context.logger.error(
+                    f"The chunk {chunk_cid} of {name} is invalid."
+                )
+                return None
+            chunk = decode_binary(data)
+            digest.update(chunk)
+            file.write(chunk)
+            self.benchmark_tool.measure_transfer(
+                transfer, len(chunk), time.time() - started_at
+            )
+        return digest.hexdigest()
+
+    def get_rate_limited_http_response(
+        self,
+        method: str,
+        url: str,
+        content: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        parameters: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Generator[None, None, Optional[HttpMessage]]:
+        """
+        Send an http request within the budget of its host, retrying it while the host is overloaded.
+
+        :param method: the http request method (i.e. 'GET' or 'POST').
+        :param url: the url to send the message to.
+        :param content: the payload.
+        :param headers: headers to be included.
+        :param parameters: url query parameters.
+        :param timeout: the time within which the request must complete, by default `round_timeout_seconds`.
+        :yield: None
+        :return: the last response, or None if the request could not be sent in time
+        """
+        timeout = self.params.round_timeout_seconds if timeout is None else timeout
+        deadline = time.time() + timeout
+        response: Optional[HttpMessage] = None
+
+        for attempt in range(self.rate_limiter.max_retries + 1):
+            delay = self.rate_limiter.reserve(url, deadline)
+            if delay is None:
+                self.context.logger.warning(
+                    f"Giving up on {url}, as the rate limit of its host delays it past the timeout."
+                )
+                break
+            if delay > 0:
+                yield from self.sleep(delay)
+
+            response = yield from self.get_http_response(
+                method, url, content=content, headers=headers, parameters=parameters
+            )
+            if response.status_code not in RETRIABLE_STATUS_CODES:
+                break
+
+            retry_after = self.rate_limiter.parse_retry_after(response.headers)
+            retry_in = self.rate_limiter.backoff(url, attempt, retry_after)
+            if (
+                attempt == self.rate_limiter.max_retries
+                or time.time() + retry_in >= deadline
+            ):
+                self.context.logger.warning(
+                    f"{url} responded with status {response.status_code}, giving up after {attempt + 1} attempts."
+                )
+                break
+            self.context.logger.warning(
+                f"{url} responded with status {response.status_code}, retrying in {retry_in:.1f}s."
+            )
+
+        return response
+
+    def get_fee_quote(self) -> Generator[None, None, Optional[FeeQuote]]:
+        """
+        Get an EIP-1559 fee quote, only sampling the fee history of the chain if the cached one is stale.
+
+        When the skill is chained with the transaction settlement, the quote is also applied to its gas params,
+        so that the transaction is settled with it.
+
+        :yield: None
+        :return: the quote, or None if the fee history has never been sampled successfully
+        """
+        block_count = self.fee_oracle.get_block_count(GNOSIS_CHAIN_ID)
+        if block_count > 0:
+            response = yield from self.get_ledger_api_response(
+                performative=LedgerApiMessage.Performative.GET_STATE,  # type: ignore
+                ledger_callable="fee_history",
+                block_count=block_count,
+                newest_block="latest",
+                reward_percentiles=self.fee_oracle.reward_percentiles,
+                chain_id=GNOSIS_CHAIN_ID,
+            )
+            if response.performative == LedgerApiMessage.Performative.STATE:
+                self.fee_oracle.update(
+                    GNOSIS_CHAIN_ID, response.state.body["fee_history_result"]
+                )
+            else:
+                self.context.logger.warning(
+                    f"Could not sample the fee history, using the cached one: {response}"
+                )
+
+        quote = self.fee_oracle.quote(GNOSIS_CHAIN_ID)
+        if quote is None:
+            return None
+
+        self.context.logger.info(f"Fee quote: {quote}")
+        # the gas params are only there when the transaction settlement params are chained in
+        gas_params = getattr(self.params, "gas_params", None)
+        if gas_params is not None:
+            gas_params.max_fee_per_gas = quote.max_fee_per_gas
+            gas_params.max_priority_fee_per_gas = quote.max_priority_fee_per_gas
+        return quote
+
+    def get_settlement_tx_hash(
+        self,
+        to_address: str,
+        value: int,
+        data: bytes,
+        nonce: int,
+        operation: int = SafeOperation.CALL.value,
+        gas_limit: int = 0,
+    ) -> str:
+        """
+        Get the hash of a Safe transaction, serialized with its parameters for the transaction settlement.
+
+        The Safe transaction hash is computed locally, from the cached domain separator of the Safe,
+        instead of calling `get_raw_safe_transaction_hash` of the Safe contract.
+
+        :param to_address: the tx recipient address.
+        :param value: the ETH value of the transaction.
+        :param data: the data of the transaction.
+        :param nonce: the Safe nonce of the transaction.
+        :param operation: the operation type of the Safe transaction.
+        :param gas_limit: the gas limit of the settled transaction, or 0 to estimate it.
+        :return: the tx hash
+        """
+        domain_separator = self.local_state.get_safe_domain_separator(
+            self.params.safe_chain_id, self.synchronized_data.safe_contract_address
+        )
+        safe_tx_hash = get_safe_tx_hash(
+            domain_separator,
+            to_address=to_address,
+            value=value,
+            data=data,
+            nonce=nonce,
+            operation=operation,
+            safe_tx_gas=SAFE_GAS,
+        )
+        return hash_payload_to_hex(
+            safe_tx_hash=safe_tx_hash,
+            ether_value=value,
+            safe_tx_gas=SAFE_GAS,
+            to_address=to_address,
+            data=data,
+            operation=operation,
+            gas_limit=gas_limit,
+        )
+
+    def get_safe_nonce(self) -> Generator[None, None, Optional[int]]:
+        """
+        Get the nonce of the Safe on chain, only reading it from the chain again if a transaction was settled since.
+
+        :yield: None
+        :return: the nonce, or None if it could not be read
+        """
+        if self.local_state.safe_nonce is not None and not self.has_settled_tx():
+            self.local_state.safe_nonce_reset_index = (
+                self.synchronized_data.db.reset_index
+            )
+            return self.local_state.safe_nonce
+
+        response = yield from self.get_contract_api_response(
+            performative=ContractApiMessage.Performative.GET_STATE,  # type: ignore
+            contract_address=self.synchronized_data.safe_contract_address,
+            contract_id=str(GnosisSafeContract.contract_id),
+            contract_callable="get_safe_nonce",
+        )
+        if response.performative != ContractApiMessage.Performative.STATE:
+            self.context.logger.error(
+                f"Could not read the nonce of the Safe: {response}"
+            )
+            return None
+
+        self.local_state.safe_nonce = cast(int, response.state.body["safe_nonce"])
+        self.local_state.safe_nonce_reset_index = self.synchronized_data.db.reset_index
+        return self.local_state.safe_nonce
+
+    def has_settled_tx(self) -> bool:
+        """
+        Check whether the transaction settlement reported a settled transaction since the nonce was read.
+
+        A period which is no longer in the history of the db is assumed to have settled a transaction.
+
+        :return: whether the cached nonce may be outdated
+        """
+        db = self.synchronized_data.db
+        final_tx_hash_key = get_name(TxSettlementSynchronizedData.final_tx_hash)
+        for reset_index in range(
+            self.local_state.safe_nonce_reset_index, db.reset_index + 1
+        ):
+            data = db.get_latest_from_reset_index(reset_index)
+            if not data or data.get(final_tx_hash_key) is not None:
+                return True
+        return False
+
+    def update_price_history(self) -> None:
+        """Sync the local price history, with its rolling statistics, with the agreed price history."""
+        self.local_state.sync_price_history(self.synchronized_data.price_history)
+        history = self.local_state.price_history
+        self.context.logger.info(
+            f"Price history of {len(history)} periods: mean={history.mean}, std={history.std}, "
+            f"min={history.min}, max={history.max}"
+        )
+
+
+class PriceSourcesBehaviour(VotingBaseBehaviour, ABC):
+    """Base behaviour for the behaviours which query the price sources."""
+
+    def aggregate_prices(
+        self, source_prices: Dict[str, PriceVector]
+    ) -> Optional[PriceVector]:
+        """Aggregate the price vectors of the sources into their per-token median."""
+        if not source_prices:
+            self.context.logger.error("Could not get the prices from any source.")
+            return None
+
+        prices = tuple(
+            statistics.median(present) if present else None
+            for present in (
+                [price for price in column if price is not None]
+                for column in zip(*source_prices.values())
+            )
+        )
+        missing = [
+            token_id
+            for token_id, price in zip(self.params.price_token_ids, prices)
+            if price is None
+        ]
+        if missing:
+            self.context.logger.warning(f"No source has a price for {missing}.")
+        self.context.logger.info(
+            f"Prices are {prices} (source prices: {source_prices})"
+        )
+        return prices
+
+    def observe_price_sources(self) -> Generator[None, None, PriceObservation]:
+        """
+        Get an observation of the price sources, preferably the one prefetched in the background.
+
+        :yield: None
+        :return: the prefetched observation if it is not older than `price_prefetch_max_age`, otherwise a new one
+        """
+        observation = self.local_state.price_observation
+        if (
+            observation is not None
+            and observation.token_ids == tuple(self.params.price_token_ids)
+            and time.time() - observation.observed_at
+            <= self.params.price_prefetch_max_age
+        ):
+            self.context.logger.info(
+                f"Using the prices prefetched {time.time() - observation.observed_at:.1f}s ago."
+            )
+            return observation
+
+        observation = yield from self.query_price_sources()
+        return observation
+
+    def query_price_sources(self) -> Generator[None, None, PriceObservation]:
+        """
+        Query all the price sources concurrently.
+
+        Each source is queried for all the tokens at once, and we only wait until `price_source_quorum` sources
+        have answered, or until `price_source_timeout` has passed, so that a slow provider cannot delay the round.
+        The requests are spaced out by the rate limiter, and the ones rejected by an overloaded host are retried
+        after a backoff, as long as this fits in the timeout.
+
+        :yield: None
+        :return: the price vectors and the raw responses of the sources which answered
+        """
+        sources = {source["name"]: source for source in self.params.price_sources}
+        quorum = min(self.params.price_source_quorum, len(sources))
+        query = PriceQuery(deadline=time.time() + self.params.price_source_timeout)
+        for source in sources.values():
+            self._schedule_source_request(source, query)
+
+        def _is_settled() -> bool:
+            """Check whether enough sources have answered."""
+            answered = len(query.prices) + len(query.failed)
+            return len(query.prices) >= quorum or answered == len(sources)
+
+        while not _is_settled():
+            now = time.time()
+            for name, send_at in list(query.scheduled.items()):
+                if send_at <= now:
+                    del query.scheduled[name]
+                    self._send_source_request(sources[name], query)
+            try:
+                yield from self.wait_for_condition(
+                    lambda: _is_settled() or query.has_due_requests(),
+                    timeout=query.deadline - time.time(),
+                )
+            except TimeoutException:
+                pending = sources.keys() - query.prices.keys() - query.failed
+                self.context.logger.warning(
+                    f"Price sources {sorted(pending)} did not answer within {self.params.price_source_timeout}s."
+                )
+                break
+
+        # late answers will still be recorded by the callbacks, but they should not change the result
+        return PriceObservation(
+            token_ids=tuple(self.params.price_token_ids),
+            prices=dict(query.prices),
+            responses=dict(query.responses),
+            observed_at=time.time(),
+        )
+
+    def _schedule_source_request(
+        self, source: Dict[str, str], query: PriceQuery, delay: float = 0.0
+    ) -> Optional[float]:
+        """
+        Schedule the request for a price source within the budget of its host, or give up if it is too late.
+
+        :param source: the price source.
+        :param query: the query of the price sources.
+        :param delay: the minimum delay before sending the request.
+        :return: the delay before the request is sent, or None if the source was given up
+        """
+        name = source["name"]
+        reserved = self.rate_limiter.reserve(source["url"], query.deadline, delay)
+        if reserved is None:
+            self.context.logger.warning(
+                f"Not querying price source {name!r}, as its rate limit would delay it past the timeout."
+            )
+            query.failed.add(name)
+            return None
+        query.scheduled[name] = time.time() + reserved
+        return reserved
+
+    def _send_source_request(self, source: Dict[str, str], query: PriceQuery) -> None:
+        """Send the batched request for a price source, without waiting for the response."""
+        api_key = source.get("api_key") or self.params.coingecko_api_key or ""
+        url = (
+            source["url"]
+            .replace(API_KEY_PLACEHOLDER, api_key)
+            .replace(TOKEN_IDS_PLACEHOLDER, ",".join(self.params.price_token_ids))
+        )
+        http_message, http_dialogue = self._build_http_request_message(
+            method="GET", url=url
+        )
+        self.context.outbox.put_message(message=http_message)
+        request_nonce = self._get_request_nonce_from_dialogue(http_dialogue)
+        cast(Requests, self.context.requests).request_id_to_callback[request_nonce] = (
+            self._get_source_callback(source, query)
+        )
+
+    def _get_source_callback(
+        self, source: Dict[str, str], query: PriceQuery
+    ) -> Callable[[Message, BaseBehaviour], None]:
+        """Get the callback which parses the response of a price source and benchmarks it."""
+        name = source["name"]
+        sent_at = time.time()
+
+        def callback_request(
+            message: Message, _current_behaviour: BaseBehaviour
+        ) -> None:
+            """Record the prices of the source, even if the behaviour has stopped waiting for them."""
+            latency = time.time() - sent_at
+            response = cast(HttpMessage, message)
+            attempt = query.attempts.get(name, 0)
+            if response.status_code in RETRIABLE_STATUS_CODES:
+                retry_after = self.rate_limiter.parse_retry_after(response.headers)
+                delay = self.rate_limiter.backoff(source["url"], attempt, retry_after)
+                self.context.benchmark_tool.measure_source(name, latency, True)
+                if attempt == self.rate_limiter.max_retries:
+                    self.context.logger.warning(
+                        f"Price source {name!r} responded with status {response.status_code}, "
+                        f"giving up after {attempt + 1} attempts."
+                    )
+                    query.failed.add(name)
+                    return
+                query.attempts[name] = attempt + 1
+                retry_in = self._schedule_source_request(source, query, delay)
+                if retry_in is not None:
+                    self.context.logger.warning(
+                        f"Price source {name!r} responded with status {response.status_code}, "
+                        f"retrying in {retry_in:.1f}s."
+                    )
+                return
+
+            source_prices = self._parse_source_prices(source, response)
+            if source_prices is None:
+                query.failed.add(name)
+            else:
+                query.prices[name] = source_prices
+                query.responses[name] = response.body.decode()
+            self.context.benchmark_tool.measure_source(
+                name, latency, source_prices is None
+            )
+
+        return callback_request
+
+    def _parse_source_prices(
+        self, source: Dict[str, str], response: HttpMessage
+    ) -> Optional[PriceVector]:
+        """
+        Parse the prices of all the tokens from the batched response of a price source.
+
+        :param source: the price source.
+        :param response: the response of the source.
+        :return: the prices, with None for the tokens missing from the response, or None if the response is invalid.
+        """
+        name = source["name"]
+        if response.status_code != HTTP_OK:
+            self.context.logger.error(
+                f"Price source {name!r} responded with status {response.status_code}: {response.body!r}"
+            )
+            return None
+        return self._parse_source_body(source, response.body)
+
+    def _parse_source_body(
+        self, source: Dict[str, str], body: Union[bytes, str]
+    ) -> Optional[PriceVector]:
+        """Parse the prices of all the tokens from the body of a batched response of a price source."""
+        name = source["name"]
+        try:
+            response_data = json.loads(body)
+        except json.JSONDecodeError as e:
+            self.context.logger.error(
+                f"Could not decode the response of {name!r}: {e!r}"
+            )
+            return None
+
+        prices = []
+        for token_id in self.params.price_token_ids:
+            response_key = source["response_key"].replace(
+                TOKEN_ID_PLACEHOLDER, token_id
+            )
+            try:
+                price: Optional[float] = float(
+                    get_data_from_nested_dict(response_data, response_key)
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                self.context.logger.warning(
+                    f"Could not parse the price from {name!r} using key {response_key!r}: {e!r}"
+                )
+                price = None
+            prices.append(price)
+
+        if all(price is None for price in prices):
+            return None
+        return tuple(prices)
+
+
+class PricePrefetchBehaviour(PriceSourcesBehaviour):
+    """
+    A behaviour which observes the price sources shortly before the next period, it runs concurrently with other behaviours.
 
-class APICheckBehaviour(VotingBaseBehaviour):
+    This takes the network latency of the price sources off the critical path of the APICheckRound,
+    whose behaviour can use the prefetched observation and send its payload immediately. It is disabled
+    unless `price_prefetch_interval` is positive.
+    """
+
+    matching_round: Type[AbstractRound] = APICheckRound
+
+    @property
+    def synchronized_data(self) -> SynchronizedData:
+        """
+        Return the synchronized data.
+
+        Note: we instantiate here, rather than cast, as this runs
+        concurrently and so the instantiation needs to happen somewhere.
+        """
+        return SynchronizedData(db=super().synchronized_data.db)
+
+    def async_act(self) -> Generator:
+        """Check every `price_prefetch_interval` seconds whether the prices should be prefetched for the next period."""
+        if self.params.price_prefetch_interval <= 0:
+            return
+
+        if self._should_prefetch():
+            observation = yield from self.query_price_sources()
+            if observation.prices:
+                self.local_state.price_observation = observation
+
+        yield from self.sleep(self.params.price_prefetch_interval)
+
+    def _should_prefetch(self) -> bool:
+        """
+        Check whether the prices should be prefetched now.
+
+        The prices are only prefetched once per period, within `price_prefetch_max_age` seconds of the expected
+        start of the next period, and only if this agent may need them then, i.e., unless it is not the keeper in
+        keeper mode, or the agreed prices will still be reused.
+
+        :return: whether to query the price sources now
+        """
+        if self.params.keeper_fetch:
+            period_count = self.synchronized_data.period_count
+            keepers = {
+                self.synchronized_data.get_price_keeper(period_count),
+                self.synchronized_data.get_price_keeper(period_count + 1),
+            }
+            if self.context.agent_address not in keepers:
+                return False
+
+        next_period_at = self.get_next_period_start()
+        if next_period_at is None:
+            return False
+        price_timestamp = self.synchronized_data.price_timestamp
+        if (
+            price_timestamp is not None
+            and next_period_at - price_timestamp <= self.params.price_max_age
+        ):
+            return False
+
+        prefetch_from = next_period_at - self.params.price_prefetch_max_age
+        now = time.time()
+        observation = self.local_state.price_observation
+        if observation is not None and observation.observed_at >= max(
+            now - self.params.price_prefetch_max_age, prefetch_from
+        ):
+            return False
+        return now >= prefetch_from
+
+    def get_next_period_start(self) -> Optional[float]:
+        """Estimate the start of the next period, assuming that the current period lasts as long as the previous one."""
+        started_at = self.synchronized_data.period_started_at
+        db = self.synchronized_data.db
+        if started_at is None or db.reset_index == 0:
+            return None
+        previous_started_at = db.get_latest_from_reset_index(db.reset_index - 1).get(
+            get_name(SynchronizedData.period_started_at), None
+        )
+        if previous_started_at is None or previous_started_at >= started_at:
+            return None
+        return started_at + (started_at - previous_started_at)
+
+
+class APICheckBehaviour(PriceSourcesBehaviour):
     """APICheckBehaviour"""
 
     matching_round: Type[AbstractRound] = APICheckRound
@@ -82,9 +965,12 @@ class APICheckBehaviour(VotingBaseBehaviour):
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
-            sender = self.context.agent_address
-            price = yield from self.get_price()
-            payload = APICheckPayload(sender=sender, price=price)
+            # the history agreed in the previous period has not been synced if its decision was taken here
+            self.update_price_history()
+            payload = yield from self.get_payload()
+            if self.params.decide_in_price_round and payload.prices is not None:
+                payload = replace(payload, event=self.get_event(payload))
+            payload = replace(payload, round_timeout=self.get_round_timeout())
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -92,12 +978,196 @@ class APICheckBehaviour(VotingBaseBehaviour):
 
         self.set_done()
 
-    def get_price(self):
-        """Get token price from Coingecko"""
-        yield
-        price = 1.0
-        self.context.logger.info(f"Price is {price}")
-        return price
+    def get_payload(self) -> Generator[None, None, APICheckPayload]:
+        """
+        Get the payload with the prices of the current period.
+
+        If `keeper_fetch` is enabled, only the keeper of the period queries the price sources, and publishes their
+        raw responses signed with its key. The other agents parse the attested responses instead of querying the
+        sources themselves, and only fall back to querying them if the keeper does not deliver in time.
+
+        :yield: None
+        :return: the payload
+        """
+        sender = self.context.agent_address
+        cached = self.get_cached_prices()
+        if cached is not None:
+            cached_prices, cached_timestamp = cached
+            return APICheckPayload(
+                sender=sender,
+                prices=encode_prices(cached_prices),
+                price_timestamp=cached_timestamp,
+            )
+
+        if not self.params.keeper_fetch:
+            prices, observed_at = yield from self.get_prices()
+        elif sender == self.synchronized_data.price_keeper:
+            payload = yield from self.get_keeper_payload()
+            return payload
+        else:
+            attested = yield from self.get_attested_prices()
+            if attested is None:
+                self.context.logger.warning(
+                    "Could not use the prices of the keeper, querying the price sources instead."
+                )
+                prices, observed_at = yield from self.get_prices()
+            else:
+                prices, observed_at = attested
+
+        if prices is None:
+            return APICheckPayload(sender=sender, prices=None)
+        return APICheckPayload(
+            sender=sender, prices=encode_prices(prices), price_timestamp=observed_at
+        )
+
+    def get_cached_prices(self) -> Optional[Tuple[Tuple[float, ...], float]]:
+        """
+        Get the prices agreed in a previous period, if they are not older than `price_max_age`.
+
+        The agreed prices are persisted across periods, so they are reused if they are still fresh.
+        The round's transition timestamp is used as the current time, so that all the agents take the same decision.
+
+        :return: the prices, one per token in `price_token_ids`, and their timestamp, or None if they are stale
+        """
+        now = self.round_sequence.last_round_transition_timestamp.timestamp()
+        cached_prices = self.synchronized_data.prices
+        cached_timestamp = self.synchronized_data.price_timestamp
+        if (
+            cached_prices is None
+            or cached_timestamp is None
+            or len(cached_prices) != len(self.params.price_token_ids)
+            or now - cached_timestamp > self.params.price_max_age
+        ):
+            return None
+
+        self.context.logger.info(
+            f"Reusing the prices {cached_prices}, observed {now - cached_timestamp:.1f}s ago."
+        )
+        return cached_prices, cached_timestamp
+
+    def get_keeper_payload(self) -> Generator[None, None, APICheckPayload]:
+        """Query the price sources as the keeper, and attest their raw responses."""
+        sender = self.context.agent_address
+        observation = yield from self.observe_price_sources()
+        prices = self.aggregate_prices(observation.prices)
+        if prices is None:
+            return APICheckPayload(sender=sender, prices=None)
+
+        responses = {name: observation.responses[name] for name in observation.prices}
+        raw_response = json.dumps(responses, sort_keys=True)
+        signature = yield from self.get_signature(raw_response.encode())
+        return APICheckPayload(
+            sender=sender,
+            prices=encode_prices(prices),
+            price_timestamp=observation.observed_at,
+            raw_response=raw_response,
+            raw_response_signature=signature,
+        )
+
+    def get_attested_prices(
+        self,
+    ) -> Generator[None, None, Optional[Tuple[PriceVector, float]]]:
+        """
+        Get the prices from the raw responses attested by the keeper of the period.
+
+        :yield: None
+        :return: the prices, and the time at which the keeper observed them, or None if the keeper did not publish
+            valid responses within `keeper_fetch_timeout`
+        """
+        keeper = self.synchronized_data.price_keeper
+
+        def _get_keeper_payload() -> Optional[APICheckPayload]:
+            """Get the payload of the keeper, if it has already been delivered in this round."""
+            current_round = self.round_sequence.current_round
+            if current_round.round_id != self.matching_round.auto_round_id():
+                return None
+            collection = cast(APICheckRound, current_round).collection
+            return cast(Optional[APICheckPayload], collection.get(keeper))
+
+        try:
+            yield from self.wait_for_condition(
+                lambda: _get_keeper_payload() is not None,
+                timeout=self.params.keeper_fetch_timeout,
+            )
+        except TimeoutException:
+            self.context.logger.warning(
+                f"The keeper {keeper} did not deliver the prices within {self.params.keeper_fetch_timeout}s."
+            )
+            return None
+
+        payload = cast(APICheckPayload, _get_keeper_payload())
+        if payload.raw_response is None or not is_attested_by(
+            payload.raw_response,
+            payload.raw_response_signature,
+            keeper,
+            self.context.default_ledger_id,
+        ):
+            self.context.logger.warning(
+                f"The keeper {keeper} did not attest the responses of the price sources."
+            )
+            return None
+
+        try:
+            responses = json.loads(payload.raw_response)
+        except json.JSONDecodeError as e:
+            self.context.logger.error(f"Invalid responses from the keeper: {e!r}")
+            return None
+
+        source_prices = {}
+        for source in self.params.price_sources:
+            body = responses.get(source["name"])
+            if body is None:
+                continue
+            prices = self._parse_source_body(source, body)
+            if prices is not None:
+                source_prices[source["name"]] = prices
+        aggregated = self.aggregate_prices(source_prices)
+        if aggregated is None or payload.price_timestamp is None:
+            return None
+        return aggregated, payload.price_timestamp
+
+    def get_prices(
+        self,
+    ) -> Generator[None, None, Tuple[Optional[PriceVector], float]]:
+        """Get the token prices as the per-token median of the configured price sources, and when they were observed."""
+        observation = yield from self.observe_price_sources()
+        return self.aggregate_prices(observation.prices), observation.observed_at
+
+    def get_round_timeout(self) -> Optional[float]:
+        """Propose a round timeout, as a multiple of a high percentile of the latencies measured by the benchmark tool."""
+        percentile = self.context.benchmark_tool.get_latency_percentile(
+            self.params.round_timeout_percentile,
+            self.params.round_timeout_min_samples,
+        )
+        if percentile is None:
+            return None
+        return percentile * self.params.round_timeout_factor
+
+    def get_event(self, payload: APICheckPayload) -> str:
+        """
+        Get the event voted along with the prices, if `decide_in_price_round` is enabled.
+
+        The decision rules are evaluated on the price history, as if the proposed prices were already agreed.
+        The prices reused from a previous period are already in the history, so they are not added again.
+
+        :param payload: the payload with the prices proposed in this period.
+        :return: the event
+        """
+        strategy = self.local_state.strategy
+        price_history = self.local_state.price_history
+        agreed = self.synchronized_data.price_history
+        is_new = payload.price_timestamp is not None and (
+            not agreed or payload.price_timestamp > agreed[-1][0]
+        )
+        if is_new:
+            history = price_history.latest(strategy.lookback - 1)
+            proposed = np.array(decode_prices(cast(str, payload.prices)), dtype=float)
+            prices = np.vstack([history, proposed])
+        else:
+            prices = price_history.latest(strategy.lookback)
+        event, rule = strategy.decide(prices)
+        self.context.logger.info(f"Voting for the event {event} (rule: {rule})")
+        return event
 
 
 class DecisionMakingBehaviour(VotingBaseBehaviour):
@@ -109,6 +1179,7 @@ class DecisionMakingBehaviour(VotingBaseBehaviour):
         """Do the act, supporting asynchronous execution."""
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
+            self.update_price_history()
             event = self.get_event()
             payload = DecisionMakingPayload(sender=sender, event=event)
 
@@ -118,10 +1189,12 @@ class DecisionMakingBehaviour(VotingBaseBehaviour):
 
         self.set_done()
 
-    def get_event(self):
-        """Get the next event"""
-        event = Event.DONE.value
-        self.context.logger.info(f"Event is {event}")
+    def get_event(self) -> str:
+        """Get the next event, according to the first decision rule which fires on the price history."""
+        strategy = self.local_state.strategy
+        prices = self.local_state.price_history.latest(strategy.lookback)
+        event, rule = strategy.decide(prices)
+        self.context.logger.info(f"Event is {event} (rule: {rule})")
         return event
 
 
@@ -133,35 +1206,99 @@ class TxPreparationBehaviour(VotingBaseBehaviour):
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
-            sender = self.context.agent_address
-            tx_hash = yield from self.get_tx_hash()
-            payload = TxPreparationPayload(sender=sender, tx_submitter=None, tx_hash=tx_hash)
+            payload = yield from self.get_payload()
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
-            yield from self.send_a2a_transaction(payload)
+            if payload is not None:
+                yield from self.send_a2a_transaction(payload)
             yield from self.wait_until_round_end()
 
         self.set_done()
 
-    def get_tx_hash(self):
-        """Get the tx hash"""
-        yield
-        tx_hash = None
-        self.context.logger.info(f"Transaction hash is {tx_hash}")
+    def get_payload(self) -> Generator[None, None, Optional[TxPreparationPayload]]:
+        """
+        Get the payload with the transaction of this period.
+
+        The agent does not vote if the nonce of the Safe cannot be read, so that the round times out and the
+        transaction is prepared again, instead of being dropped.
+
+        :yield: None
+        :return: the payload, or None if the transaction could not be prepared
+        """
+        sender = self.context.agent_address
+        yield from self.get_fee_quote()
+        nonce = yield from self.get_safe_nonce()
+        if nonce is None:
+            return None
+
+        tx_hash = self.get_tx_hash(nonce)
+        return TxPreparationPayload(
+            sender=sender, tx_submitter=None, tx_hash=tx_hash, safe_nonce=nonce
+        )
+
+    def get_tx_hash(self, nonce: int) -> str:
+        """
+        Get the tx hash of a native transfer from the Safe to `transfer_target_address`.
+
+        :param nonce: the Safe nonce of the transaction.
+        :return: the tx hash
+        """
+        tx_hash = self.get_settlement_tx_hash(
+            to_address=self.params.transfer_target_address,
+            value=TRANSFER_VALUE,
+            data=TX_DATA,
+            nonce=nonce,
+        )
+        self.context.logger.info(f"Transaction hash is {tx_hash} (nonce {nonce})")
         return tx_hash
 
 
 class IPFSStorageBehaviour(VotingBaseBehaviour):
-    """IPFSStorageBehaviour"""
+    """
+    IPFSStorageBehaviour
 
-    matching_round: Type[AbstractRound] = IPFSStorageRound
+    The report of each period is added to the agreed pending reports. Once `ipfs_batch_size` reports are pending,
+    or the oldest has waited for `ipfs_batch_max_wait` seconds, they are linked into a directory, whose CID
+    the agents compute locally and agree on. Only the keeper of the period uploads the directory, before
+    voting on its CID, and votes for no CID if the upload fails. The reports stay pending until the batch
+    has been retrieved.
+    The datasets attached to the reports are referenced by the CIDs of their manifests, and are uploaded
+    by the keeper in chunks, before the reports.
+    """
+
+    matching_round: Type[AbstractRound] = IPFSStoreRound
 
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
             sender = self.context.agent_address
-            data_hash = yield from self.store_data_on_ipfs()
-            payload = IPFSStoragePayload(sender=sender, data_hash=data_hash)
+            is_keeper = sender == self.synchronized_data.price_keeper
+            if is_keeper:
+                yield from self.upload_datasets()
+            reports = self.get_pending_reports()
+            now = cast(float, self.synchronized_data.period_started_at)
+            cid = None
+            if is_batch_due(
+                reports,
+                self.params.ipfs_batch_size,
+                self.params.ipfs_batch_max_wait,
+                now,
+            ):
+                batch = build_batch(reports)
+                cid = get_directory_cid(*batch)
+                self.context.logger.info(
+                    f"The batch of the reports of {len(reports)} periods has CID {cid}"
+                )
+                if is_keeper:
+                    stored = yield from self.store_batch_on_ipfs(batch, cid)
+                    cid = cid if stored else None
+            else:
+                self.context.logger.info(
+                    f"{len(reports)} period reports are waiting to be stored."
+                )
+            payload = IPFSPayload(
+                sender=sender, ipfs_hash=cid, reports=encode_reports(reports)
+            )
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -169,25 +1306,166 @@ class IPFSStorageBehaviour(VotingBaseBehaviour):
 
         self.set_done()
 
-    def store_data_on_ipfs(self):
-        """Store voting data on IPFS and return the hash."""
-        yield
-        data_hash = "Qm..."  # Simulate storing data on IPFS and getting the hash
-        self.context.logger.info(f"Data stored on IPFS with hash: {data_hash}")
-        return data_hash
+    def get_pending_reports(self) -> List[Dict[str, Any]]:
+        """Get the agreed pending reports, followed by the report of this period."""
+        data = self.synchronized_data
+        report = {
+            "period": data.period_count,
+            "created_at": cast(float, data.period_started_at),
+            "report": encode_report(self.get_period_report()),
+        }
+        pending = [
+            pending_report
+            for pending_report in data.pending_reports
+            if pending_report["period"] < data.period_count
+        ]
+        return pending + [report]
+
+    def get_period_report(self) -> Dict[str, Any]:
+        """
+        Get the report of the period, as a single row.
+
+        The report is built only from the agreed data, so that all the agents build the same. Each token
+        has a price column, and each dataset a column with the CID of its manifest.
+
+        :return: the value of each column
+        """
+        data = self.synchronized_data
+        report: Dict[str, Any] = {
+            "period": data.period_count,
+            "price_timestamp": data.price_timestamp,
+            "price_volatility": data.price_volatility,
+            "tx_hash": data.most_voted_tx_hash,
+        }
+        prices = data.prices
+        for index, token in enumerate(self.params.price_token_ids):
+            price = None if prices is None else prices[index]
+            report[PRICE_COLUMN_PREFIX + token] = (
+                None if price is None or math.isnan(price) else price
+            )
+        for name, cid in self.get_dataset_cids().items():
+            report[DATASET_COLUMN_PREFIX + name] = cid
+        return report
+
+    def get_dataset_cids(self) -> Dict[str, Optional[str]]:
+        """Get the CIDs of the manifests of the datasets, computed locally, or None for the unreadable datasets."""
+        cids: Dict[str, Optional[str]] = {}
+        for name, path in sorted(self.params.ipfs_datasets.items()):
+            manifest = self.get_file_manifest(self.get_dataset_path(path), name)
+            cids[name] = None if manifest is None else get_manifest_cid(manifest)
+        return cids
+
+    def upload_datasets(self) -> Generator:
+        """Upload the datasets, which are only uploaded again once they have changed."""
+        for name, path in sorted(self.params.ipfs_datasets.items()):
+            yield from self.upload_file(self.get_dataset_path(path), name)
+
+    def store_batch_on_ipfs(
+        self, batch: Tuple[str, Dict[str, bytes]], cid: str
+    ) -> Generator[None, None, bool]:
+        """Upload the directory of a batch of reports to IPFS, and check that it was stored under the agreed CID."""
+        dirname, files = batch
+        path = os.path.join(self.context.data_dir, dirname)
+        ipfs_message, ipfs_dialogue = self._build_ipfs_message(
+            performative=IpfsMessage.Performative.STORE_FILES,  # type: ignore
+            files={
+                os.path.join(path, name): data.decode() for name, data in files.items()
+            },
+            timeout=self.params.ipfs_timeout,
+        )
+        stored = yield from self._store_ipfs_file(ipfs_message, ipfs_dialogue, cid)
+        if stored:
+            self.context.logger.info(f"The batch of reports {cid} was uploaded.")
+        return stored
+
+
+class IPFSRetrieveBehaviour(VotingBaseBehaviour):
+    """
+    IPFSRetrieveBehaviour
+
+    Before voting, the datasets attached to the agreed report which differ from the local ones are downloaded.
+    """
+
+    matching_round: Type[AbstractRound] = IPFSRetrieveRound
+
+    def async_act(self) -> Generator:
+        """Do the act, supporting asynchronous execution."""
+        with self.context.benchmark_tool.measure(self.behaviour_id).local():
+            sender = self.context.agent_address
+            cid = yield from self.retrieve_data_from_ipfs()
+            payload = IPFSPayload(sender=sender, ipfs_hash=cid)
+
+        with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
+            yield from self.send_a2a_transaction(payload)
+            yield from self.wait_until_round_end()
+
+        self.set_done()
+
+    def retrieve_data_from_ipfs(self) -> Generator[None, None, Optional[str]]:
+        """
+        Retrieve the files of the batch stored in the period, and download the datasets attached to its reports.
+
+        :yield: None
+        :return: the CID if its files were retrieved, otherwise None
+        """
+        cid = self.synchronized_data.stored_ipfs_hash
+        if cid is None:
+            self.context.logger.info("There is no stored CID to retrieve.")
+            return None
+        files = yield from self.get_ipfs_files(cid)
+        if files is None:
+            return None
+        sizes = {name: len(data) for name, data in files.items()}
+        self.context.logger.info(f"Retrieved {cid}: {sizes}")
+        yield from self.download_datasets(cid, files)
+        return cid
+
+    def download_datasets(
+        self, cid: str, files: Dict[str, Union[bytes, mmap.mmap]]
+    ) -> Generator:
+        """Download the datasets referenced by the latest report of a batch, unless the local ones are the same."""
+        data = files.get(INDEX_FILENAME)
+        if data is None:
+            return
+        try:
+            table = decode_binary(data)
+            header, _, _ = read_header(table)
+            columns = [
+                column["name"]
+                for column in header["columns"]
+                if column["name"].startswith(DATASET_COLUMN_PREFIX)
+            ]
+            datasets = {
+                column.removeprefix(DATASET_COLUMN_PREFIX): values[-1]
+                for column, values in decode_table(table, columns).items()
+            }
+        except ValueError as e:
+            self.context.logger.error(f"{cid} is not a batch of reports: {e}")
+            return
+
+        for name, manifest_cid in sorted(datasets.items()):
+            path = self.params.ipfs_datasets.get(name)
+            if manifest_cid is None or path is None:
+                continue
+            path = self.get_dataset_path(path)
+            if os.path.exists(path):
+                manifest = self.get_file_manifest(path, name)
+                if manifest is not None and is_same_cid(
+                    get_manifest_cid(manifest), manifest_cid
+                ):
+                    continue
+            yield from self.download_file(manifest_cid, path)
 
 
 class MultisendTxPreparationBehaviour(VotingBaseBehaviour):
     """MultisendTxPreparationBehaviour"""
 
-    matching_round: Type[AbstractRound] = MultisendTxPreparationRound
+    matching_round: Type[AbstractRound] = MultisendTxRound
 
     def async_act(self) -> Generator:
         """Do the act, supporting asynchronous execution."""
         with self.context.benchmark_tool.measure(self.behaviour_id).local():
-            sender = self.context.agent_address
-            tx_hash = yield from self.prepare_multisend_tx()
-            payload = MultisendTxPayload(sender=sender, tx_hash=tx_hash)
+            payload = yield from self.prepare_multisend_tx()
 
         with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
             yield from self.send_a2a_transaction(payload)
@@ -195,12 +1473,120 @@ class MultisendTxPreparationBehaviour(VotingBaseBehaviour):
 
         self.set_done()
 
-    def prepare_multisend_tx(self):
-        """Prepare and return a multisend transaction hash."""
-        yield
-        tx_hash = "0xMultiSendTxHash"  # Simulate multisend transaction preparation
-        self.context.logger.info(f"Multisend transaction prepared with hash: {tx_hash}")
-        return tx_hash
+    def prepare_multisend_tx(self) -> Generator[None, None, MultisendTxPayload]:
+        """
+        Queue the transfer of this period, and prepare a multisend transaction if the queue is due.
+
+        The queue is flushed once it holds `multisend_batch_size` transfers, or once its oldest transfer has waited
+        for `multisend_max_wait` seconds. The time is the agreed start of the period, so that all the agents
+        flush the same queue. The flushed transfers are packed under `multisend_gas_limit`, and the batch with
+        the oldest transfer is settled first.
+
+        :yield: None
+        :return: the payload
+        """
+        sender = self.context.agent_address
+        now = cast(float, self.synchronized_data.period_started_at)
+        queue = MultisendQueue(
+            self.synchronized_data.multisend_queue,
+            self.params.multisend_batch_size,
+            self.params.multisend_max_wait,
+            self.params.multisend_gas_limit,
+        )
+        queue.push(
+            to=self.params.transfer_target_address,
+            value=TRANSFER_VALUE,
+            data=TX_DATA.hex(),
+            queued_at=now,
+        )
+        if not queue.is_due(now):
+            self.context.logger.info(
+                f"{len(queue.transfers)} transfers are waiting for a multisend transaction."
+            )
+            return MultisendTxPayload(
+                sender=sender, queue=encode_transfers(queue.transfers)
+            )
+
+        yield from self.get_fee_quote()
+        nonce = yield from self.get_safe_nonce()
+        if nonce is None:
+            # the queue is only flushed once the nonce is known, so it is kept as is for the next period
+            return MultisendTxPayload(
+                sender=sender, queue=encode_transfers(queue.transfers)
+            )
+
+        batch = cast(List[Dict[str, Any]], queue.flush(now))
+        tx_hash = self.get_settlement_tx_hash(
+            to_address=self.params.multisend_contract_address,
+            value=0,
+            data=get_multisend_data(batch),
+            nonce=nonce,
+            operation=SafeOperation.DELEGATE_CALL.value,
+            gas_limit=self.params.multisend_gas_limit,
+        )
+        self.context.logger.info(
+            f"Multisend transaction of {len(batch)} transfers prepared with hash {tx_hash} (nonce {nonce}), "
+            f"{len(queue.transfers)} transfers are still waiting."
+        )
+        return MultisendTxPayload(
+            sender=sender,
+            multisend_tx_hash=tx_hash,
+            transactions=encode_transfers(batch),
+            queue=encode_transfers(queue.transfers),
+            safe_nonce=nonce,
+        )
+
+
+class CustomContractBehaviour(VotingBaseBehaviour):
+    """CustomContractBehaviour"""
+
+    matching_round: Type[AbstractRound] = CustomContractRound
+
+    def async_act(self) -> Generator:
+        """Do the act, supporting asynchronous execution."""
+        with self.context.benchmark_tool.measure(self.behaviour_id).local():
+            payload = yield from self.get_payload()
+
+        with self.context.benchmark_tool.measure(self.behaviour_id).consensus():
+            if payload is not None:
+                yield from self.send_a2a_transaction(payload)
+            yield from self.wait_until_round_end()
+
+        self.set_done()
+
+    def get_payload(self) -> Generator[None, None, Optional[CustomContractPayload]]:
+        """
+        Get the payload with the Safe transaction calling `custom_contract_address` with `custom_contract_data`.
+
+        As for the TxPreparationBehaviour, the agent does not vote if the nonce of the Safe cannot be read.
+
+        :yield: None
+        :return: the payload, without a transaction if no custom contract is configured, or None if the
+            transaction could not be prepared
+        """
+        sender = self.context.agent_address
+        contract_address = self.params.custom_contract_address
+        if contract_address is None:
+            self.context.logger.info("No custom contract is configured.")
+            return CustomContractPayload(sender=sender)
+
+        yield from self.get_fee_quote()
+        nonce = yield from self.get_safe_nonce()
+        if nonce is None:
+            return None
+
+        tx_hash = self.get_settlement_tx_hash(
+            to_address=contract_address,
+            value=0,
+            data=bytes.fromhex(self.params.custom_contract_data.removeprefix("0x")),
+            nonce=nonce,
+        )
+        self.context.logger.info(
+            f"Transaction hash of the call to {contract_address} is {tx_hash} (nonce {nonce})"
+        )
+        return CustomContractPayload(
+            sender=sender, tx_submitter=None, tx_hash=tx_hash, safe_nonce=nonce
+        )
 
 
 class VotingRoundBehaviour(AbstractRoundBehaviour):
@@ -213,5 +1599,7 @@ class VotingRoundBehaviour(AbstractRoundBehaviour):
         DecisionMakingBehaviour,
         TxPreparationBehaviour,
         IPFSStorageBehaviour,
+        IPFSRetrieveBehaviour,
         MultisendTxPreparationBehaviour,
+        CustomContractBehaviour,
     }
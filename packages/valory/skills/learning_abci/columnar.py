@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+A compressed columnar format for the tables which are stored on IPFS.
+
+A table is split into groups of rows, and each column of a group is compressed separately, so that
+selected columns can be read without decompressing the others. The header records the range of the
+index column in each group, so that a range of the index, e.g. of periods, only decompresses the groups
+which overlap it.
+
+The layout is the magic, the version, the codec and the length of the header, followed by the header,
+in JSON, and by the compressed columns of each group. Numbers are stored as little-endian 8-byte values,
+with the bytes of the values transposed, so that the similar high-order bytes of successive values
+compress well, and integers are delta-encoded first. Strings are stored as their lengths, followed
+by their UTF-8 content.
+"""
+
+import json
+import lzma
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+MAGIC = b"LCOL"
+TABLE_VERSION = 1
+# magic, version, codec, length of the header
+TABLE_PREAMBLE = struct.Struct(">4sBBI")
+CODECS = {"zlib": 1, "lzma": 2}
+FLOAT = "f8"
+INT = "i8"
+STR = "str"
+# the length of a missing string
+NULL_LENGTH = 0xFFFFFFFF
+
+Column = Union[np.ndarray, List[Optional[str]]]
+
+
+class TableDecodingError(ValueError):
+    """Error raised when a table cannot be decoded."""
+
+
+def get_dtype(values: Sequence[Any]) -> str:
+    """
+    Get the type of a column from its values.
+
+    :param values: the values, where None stands for a missing value.
+    :return: `str` if any value is a string, `i8` if all the values are integers, otherwise `f8`
+    """
+    if any(isinstance(value, str) for value in values):
+        return STR
+    if all(
+        isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+        for value in values
+    ):
+        return INT
+    return FLOAT
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    """Compress the data with a codec."""
+    if codec == CODECS["lzma"]:
+        return lzma.compress(data, preset=9)
+    return zlib.compress(data, 9)
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    """Decompress the data with a codec."""
+    try:
+        if codec == CODECS["lzma"]:
+            return lzma.decompress(data)
+        return zlib.decompress(data)
+    except (lzma.LZMAError, zlib.error) as e:
+        raise TableDecodingError(f"Invalid column: {e}") from e
+
+
+def _encode_column(values: Sequence[Any], dtype: str) -> bytes:
+    """Encode the values of a column in a group."""
+    if dtype == STR:
+        encoded = [None if value is None else value.encode() for value in values]
+        lengths = np.array(
+            [NULL_LENGTH if value is None else len(value) for value in encoded],
+            dtype="<u4",
+        )
+        return lengths.tobytes() + b"".join(value or b"" for value in encoded)
+
+    if dtype == INT:
+        array = np.diff(np.asarray(values, dtype="<i8"), prepend=0).astype("<i8")
+    else:
+        array = np.array(
+            [np.nan if value is None else value for value in values], dtype="<f8"
+        )
+    return array.view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _decode_column(data: bytes, dtype: str, rows: int) -> Column:
+    """Decode the values of a column in a group."""
+    if dtype == STR:
+        lengths_size = rows * 4
+        if len(data) < lengths_size:
+            raise TableDecodingError("Invalid string column: truncated lengths.")
+        lengths = np.frombuffer(data[:lengths_size], dtype="<u4").tolist()
+        values: List[Optional[str]] = []
+        offset = lengths_size
+        for length in lengths:
+            if length == NULL_LENGTH:
+                values.append(None)
+                continue
+            if offset + length > len(data):
+                raise TableDecodingError("Invalid string column: truncated content.")
+            values.append(data[offset : offset + length].decode())
+            offset += length
+        return values
+
+    if len(data) != rows * 8:
+        raise TableDecodingError(
+            f"Invalid numeric column: expected {rows * 8} bytes, got {len(data)}."
+        )
+    transposed = np.frombuffer(data, dtype=np.uint8).reshape(8, rows)
+    array = transposed.T.copy().view("<" + dtype).ravel()
+    if dtype == INT:
+        return np.cumsum(array)
+    return array
+
+
+def encode_table(  # pylint: disable=too-many-locals
+    table: Dict[str, Sequence[Any]],
+    index: str,
+    dtypes: Optional[Dict[str, str]] = None,
+    group_size: int = 4096,
+    codec: str = "zlib",
+) -> bytes:
+    """
+    Encode a table in the columnar format.
+
+    The encoding is deterministic, so that the agents which encode the same table compute the same CID.
+
+    :param table: the values of each column, in order, which must all have the same length.
+    :param index: the column by which ranges of rows are read, whose values must be numbers, in ascending order.
+    :param dtypes: the types of some columns, `f8`, `i8` or `str`, which are otherwise inferred from their values.
+    :param group_size: the number of rows of each group.
+    :param codec: the compression of the columns, `zlib` or `lzma`.
+    :return: the encoded table
+    """
+    lengths = {len(values) for values in table.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"The columns have different lengths: {sorted(lengths)}.")
+    rows = lengths.pop() if lengths else 0
+    explicit_dtypes = dtypes or {}
+    dtypes = {
+        name: explicit_dtypes.get(name) or get_dtype(values)
+        for name, values in table.items()
+    }
+    if dtypes.get(index) not in (INT, FLOAT) or any(
+        value is None or value != value for value in table[index]
+    ):
+        raise ValueError(f"The index {index!r} must be a column of numbers.")
+    index_type = int if dtypes[index] == INT else float
+    index_values = [index_type(value) for value in table[index]]
+    if index_values != sorted(index_values):
+        raise ValueError(f"The index {index!r} must be in ascending order.")
+    codec_id = CODECS[codec]
+
+    groups = []
+    body = bytearray()
+    for start in range(0, rows, group_size):
+        stop = min(start + group_size, rows)
+        chunks = []
+        for name, values in table.items():
+            compressed = _compress(
+                _encode_column(values[start:stop], dtypes[name]), codec_id
+            )
+            chunks.append([len(body), len(compressed)])
+            body += compressed
+        groups.append(
+            {
+                "rows": stop - start,
+                "min": index_values[start],
+                "max": index_values[stop - 1],
+                "chunks": chunks,
+            }
+        )
+
+    header = {
+        "rows": rows,
+        "index": index,
+        "columns": [{"name": name, "dtype": dtypes[name]} for name in table],
+        "groups": groups,
+    }
+    encoded_header = json.dumps(header, separators=(",", ":")).encode()
+    preamble = TABLE_PREAMBLE.pack(MAGIC, TABLE_VERSION, codec_id, len(encoded_header))
+    return preamble + encoded_header + bytes(body)
+
+
+def read_header(data: bytes) -> Tuple[Dict[str, Any], int, int]:
+    """
+    Read the header of a table, without decoding its columns.
+
+    :param data: the encoded table.
+    :return: the header, the codec, and the offset of the columns
+    """
+    if len(data) < TABLE_PREAMBLE.size:
+        raise TableDecodingError("Invalid table: truncated preamble.")
+    magic, version, codec, header_size = TABLE_PREAMBLE.unpack_from(data)
+    if magic != MAGIC or version != TABLE_VERSION:
+        raise TableDecodingError(f"Unsupported table: {magic!r}, version {version}.")
+    if codec not in CODECS.values():
+        raise TableDecodingError(f"Unsupported codec {codec}.")
+    offset = TABLE_PREAMBLE.size + header_size
+    try:
+        header = json.loads(bytes(data[TABLE_PREAMBLE.size : offset]))
+    except ValueError as e:
+        raise TableDecodingError(f"Invalid header: {e}") from e
+    return header, codec, offset
+
+
+def decode_table(
+    data: bytes,
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Dict[str, Column]:
+    """
+    Decode a table, or only some of its columns and rows.
+
+    Only the columns which are selected, in the groups of rows which overlap the range, are decompressed.
+
+    :param data: the encoded table.
+    :param columns: the columns to decode, by default all of them.
+    :param start: the first value of the index to decode, inclusive.
+    :param end: the last value of the index to decode, exclusive.
+    :return: the values of each selected column, as arrays of numbers or lists of strings
+    """
+    header, codec, offset = read_header(data)
+    names = [column["name"] for column in header["columns"]]
+    dtypes = {column["name"]: column["dtype"] for column in header["columns"]}
+    selected = names if columns is None else list(columns)
+    unknown = set(selected) - set(names)
+    if unknown:
+        raise TableDecodingError(f"Unknown columns {sorted(unknown)}.")
+    index = header["index"]
+    # the index is decoded to select the rows in the range, even if it was not selected
+    decoded = selected if index in selected else selected + [index]
+
+    parts: Dict[str, List[Column]] = {name: [] for name in decoded}
+    for group in header["groups"]:
+        if (start is not None and group["max"] < start) or (
+            end is not None and group["min"] >= end
+        ):
+            continue
+        for name in decoded:
+            chunk_offset, chunk_size = group["chunks"][names.index(name)]
+            chunk_start = offset + chunk_offset
+            chunk = bytes(data[chunk_start : chunk_start + chunk_size])
+            if len(chunk) != chunk_size:
+                raise TableDecodingError("Invalid table: truncated column.")
+            parts[name].append(
+                _decode_column(_decompress(chunk, codec), dtypes[name], group["rows"])
+            )
+
+    index_values = np.asarray(_concatenate(parts[index], dtypes[index]))
+    mask = np.ones(len(index_values), dtype=bool)
+    if start is not None:
+        mask &= index_values >= start
+    if end is not None:
+        mask &= index_values < end
+
+    table: Dict[str, Column] = {}
+    for name in selected:
+        values = _concatenate(parts[name], dtypes[name])
+        if dtypes[name] == STR:
+            table[name] = [value for value, keep in zip(values, mask) if keep]
+        else:
+            table[name] = np.asarray(values)[mask]
+    return table
+
+
+def _concatenate(parts: List[Column], dtype: str) -> Column:
+    """Concatenate the values of a column over the decoded groups."""
+    if dtype == STR:
+        return [value for part in parts for value in part]
+    if not parts:
+        return np.array([], dtype="<" + dtype)
+    return np.concatenate(parts)
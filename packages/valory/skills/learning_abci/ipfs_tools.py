@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tools for the data which is stored on IPFS."""
+
+import base64
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from typing import Any, Dict, Iterator, Union
+
+from aea.helpers.cid import CID
+from aea.helpers.ipfs.base import IPFSHashOnly
+
+
+def serialize_json(obj: Any) -> bytes:
+    """
+    Serialize an object to JSON, as the `JSONStorer` of the IPFS interactions does.
+
+    The bytes are then exactly the ones which the IPFS connection uploads for the object.
+
+    :param obj: the object, whose dicts should be built in a deterministic order.
+    :return: the serialized object
+    """
+    return json.dumps(obj, ensure_ascii=False, indent=4).encode()
+
+
+def get_cid(filename: str, data: bytes) -> str:
+    """
+    Compute the CIDv1 of a file locally, without an IPFS node.
+
+    The file is wrapped in a directory, as the IPFS connection adds it, so the CID is the one it reports.
+
+    :param filename: the name of the file.
+    :param data: the content of the file.
+    :return: the CID
+    """
+    return IPFSHashOnly.hash_bytes(
+        data, wrap=True, cid_v1=True, file_name_if_wrap=filename
+    )
+
+
+def get_directory_cid(dirname: str, files: Dict[str, bytes]) -> str:
+    """
+    Compute the CIDv1 of a directory of files locally, without an IPFS node.
+
+    The directory is wrapped in another one, as the IPFS connection adds it, so the CID is the one it reports.
+
+    :param dirname: the name of the directory.
+    :param files: the content of each file of the directory, by name.
+    :return: the CID
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, dirname)
+        os.mkdir(path)
+        for name, data in files.items():
+            with open(os.path.join(path, name), "wb") as file:
+                file.write(data)
+        return IPFSHashOnly.hash_directory(path, wrap=True, cid_v1=True)
+
+
+def is_same_cid(cid: str, other: str) -> bool:
+    """Check whether two CIDs, of any version, address the same content."""
+    return CID.from_string(cid).multihash == CID.from_string(other).multihash
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[bytes]:
+    """Read a file chunk by chunk, so that only one chunk is held in memory."""
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def get_chunk_name(name: str, index: int) -> str:
+    """Get the name of a chunk of a file."""
+    return f"{name}.{index:06d}"
+
+
+def get_manifest_name(name: str) -> str:
+    """Get the name of the manifest of a chunked file."""
+    return f"{name}.manifest.json"
+
+
+def encode_binary(data: bytes) -> bytes:
+    """
+    Encode binary data as text.
+
+    The IPFS connection exchanges the files as text, so binary files, and the chunks of binary files, are stored in base64.
+
+    :param data: the binary data.
+    :return: the encoded data
+    """
+    return base64.b64encode(data)
+
+
+def decode_binary(data: Union[bytes, mmap.mmap]) -> bytes:
+    """Decode binary data, which was encoded by `encode_binary`."""
+    return base64.b64decode(data, validate=True)
+
+
+def build_manifest(path: str, name: str, chunk_size: int) -> Dict[str, Any]:
+    """
+    Build the manifest of a file which is stored on IPFS in chunks, reading the file chunk by chunk.
+
+    The manifest lists the CIDs of the chunks, in order, which are computed locally, as well as
+    the size and the SHA-256 digest of the whole file, to check it once it has been reassembled.
+
+    :param path: the path of the file.
+    :param name: the name under which the file is stored.
+    :param chunk_size: the size of the chunks, in bytes.
+    :return: the manifest
+    """
+    digest = hashlib.sha256()
+    size = 0
+    chunks = []
+    for index, chunk in enumerate(read_chunks(path, chunk_size)):
+        digest.update(chunk)
+        size += len(chunk)
+        chunks.append(get_cid(get_chunk_name(name, index), encode_binary(chunk)))
+    return {
+        "name": name,
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "chunk_size": chunk_size,
+        "encoding": "base64",
+        "chunks": chunks,
+    }
+
+
+def get_manifest_cid(manifest: Dict[str, Any]) -> str:
+    """Compute the CID of the manifest of a chunked file locally."""
+    return get_cid(get_manifest_name(manifest["name"]), serialize_json(manifest))
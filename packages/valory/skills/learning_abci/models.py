@@ -19,8 +19,23 @@
 
 """This module contains the shared state for the abci skill of VotingAbciApp."""
 
-from typing import Any
+import math
+import mmap
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union, cast
+from urllib.parse import urlparse
 
+from aea.exceptions import enforce
+from aea.skills.base import Model
+
+from packages.valory.skills.abstract_round_abci.base import EventToTimeout
 from packages.valory.skills.abstract_round_abci.models import BaseParams
 from packages.valory.skills.abstract_round_abci.models import (
     BenchmarkTool as BaseBenchmarkTool,
@@ -29,7 +44,53 @@ from packages.valory.skills.abstract_round_abci.models import Requests as BaseRe
 from packages.valory.skills.abstract_round_abci.models import (
     SharedState as BaseSharedState,
 )
-from packages.valory.skills.learning_abci.rounds import VotingAbciApp
+from packages.valory.skills.learning_abci.ipfs_tools import get_cid, is_same_cid
+from packages.valory.skills.learning_abci.price_history import PriceHistory
+from packages.valory.skills.learning_abci.rounds import (
+    DECISION_EVENTS,
+    Event,
+    VotingAbciApp,
+)
+from packages.valory.skills.learning_abci.safe_tx import get_domain_separator
+from packages.valory.skills.learning_abci.strategy import Strategy
+
+
+PriceVector = Tuple[Optional[float], ...]
+# the time left to the agents, beyond the longest wait within a round, before the round times out
+ROUND_TIMEOUT_MARGIN = 5.0
+
+
+@dataclass(frozen=True)
+class PriceObservation:
+    """An observation of the price sources."""
+
+    token_ids: Tuple[str, ...]
+    prices: Dict[str, PriceVector]
+    responses: Dict[str, str]
+    observed_at: float
+
+
+class AgreedTimeouts(dict):
+    """
+    The timeouts of the events of an app, where the round timeout agreed in the synchronized data overrides the
+    configured one.
+
+    The timeouts are read when each round is scheduled, once the previous round has ended, so the rounds are scheduled
+    with the round timeout agreed up to then, without the rounds changing the timeouts of the app.
+    """
+
+    def __init__(self, timeouts: EventToTimeout, state: BaseSharedState) -> None:
+        """Initialize the timeouts."""
+        super().__init__(timeouts)
+        self._state = state
+
+    def get(self, event: Any, default: Any = None) -> Any:
+        """Get the timeout of an event."""
+        if event == Event.ROUND_TIMEOUT:
+            round_timeout = self._state.synchronized_data.db.get("round_timeout", None)
+            if round_timeout is not None:
+                return round_timeout
+        return super().get(event, default)
 
 
 class SharedState(BaseSharedState):
@@ -37,9 +98,631 @@ class SharedState(BaseSharedState):
 
     abci_app_cls = VotingAbciApp
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the state."""
+        super().__init__(*args, **kwargs)
+        self.price_observation: Optional[PriceObservation] = None
+        self._price_history: Optional[PriceHistory] = None
+        self._price_history_timestamp: Optional[float] = None
+        self._strategy: Optional[Strategy] = None
+        self._safe_domain: Optional[Tuple[int, str, bytes]] = None
+        self.safe_nonce: Optional[int] = None
+        self.safe_nonce_reset_index: int = 0
+        # the manifests of the chunked files, by path, with the size and the modification time they were built for
+        self.file_manifests: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        self.uploaded_cids: Set[str] = set()
+
+    def setup(self) -> None:
+        """Set up the model."""
+        super().setup()
+        params = cast(Params, self.context.params)
+        abci_app_cls = self.abci_app_cls
+        abci_app_cls.event_to_timeout = AgreedTimeouts(
+            {
+                **abci_app_cls.event_to_timeout,
+                Event.ROUND_TIMEOUT: max(
+                    params.round_timeout_seconds, params.min_round_timeout
+                ),
+            },
+            self,
+        )
+        self._price_history = PriceHistory(
+            params.price_history_size, len(params.price_token_ids)
+        )
+        self._strategy = Strategy(
+            params.decision_rules,
+            params.price_token_ids,
+            default_event=Event.DONE.value,
+            allowed_events=DECISION_EVENTS,
+        )
+
+    @property
+    def price_history(self) -> PriceHistory:
+        """Get the history of the agreed prices."""
+        if self._price_history is None:
+            raise ValueError("price history not available")
+        return self._price_history
+
+    @property
+    def strategy(self) -> Strategy:
+        """Get the compiled decision strategy."""
+        if self._strategy is None:
+            raise ValueError("strategy not available")
+        return self._strategy
+
+    def sync_price_history(
+        self, observations: Sequence[Tuple[float, Sequence[float]]]
+    ) -> None:
+        """
+        Sync the price history with the agreed price history.
+
+        Only the observations newer than the last one of the local history are pushed. If the last one is no
+        longer agreed, e.g. after a restart, the local history is built again from the agreed observations.
+
+        :param observations: the agreed prices, oldest first, with the timestamp of their observation.
+        """
+        n_tokens = self.price_history.n_tokens
+        observations = [
+            (timestamp, prices)
+            for timestamp, prices in observations
+            if len(prices) == n_tokens
+        ]
+        timestamps = [timestamp for timestamp, _ in observations]
+        if self._price_history_timestamp in timestamps:
+            observations = observations[
+                timestamps.index(self._price_history_timestamp) + 1 :
+            ]
+        else:
+            self._price_history = PriceHistory(self.price_history.capacity, n_tokens)
+            self._price_history_timestamp = None
+        for timestamp, prices in observations:
+            self.price_history.push(prices)
+            self._price_history_timestamp = timestamp
+
+    def get_safe_domain_separator(self, chain_id: int, safe_address: str) -> bytes:
+        """Get the EIP-712 domain separator of the Safe, only computing it again if the chain or the Safe change."""
+        if self._safe_domain is None or self._safe_domain[:2] != (
+            chain_id,
+            safe_address,
+        ):
+            domain_separator = get_domain_separator(chain_id, safe_address)
+            self._safe_domain = (chain_id, safe_address, domain_separator)
+        return self._safe_domain[2]
+
 
 Requests = BaseRequests
-BenchmarkTool = BaseBenchmarkTool
+
+
+@dataclass
+class SourceBenchmark:
+    """Request statistics of an external data source."""
+
+    requests: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        """Get the mean latency of the requests."""
+        if self.requests == 0:
+            return 0.0
+        return self.total_latency / self.requests
+
+
+@dataclass
+class LatencyHistogram:
+    """A histogram of latencies, in buckets whose upper bounds grow geometrically from `min_latency`."""
+
+    min_latency: float = 0.01
+    growth: float = 1.1
+    counts: Dict[int, int] = field(default_factory=dict)
+    count: int = 0
+
+    def add(self, latency: float) -> None:
+        """Add a latency to the histogram."""
+        bucket = 0
+        if latency > self.min_latency:
+            bucket = math.ceil(math.log(latency / self.min_latency, self.growth))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Get the q-th percentile of the latencies.
+
+        :param q: the percentile, between 0 and 100.
+        :return: the upper bound of the bucket of the percentile, or None if the histogram is empty
+        """
+        if self.count == 0:
+            return None
+        rank = max(math.ceil(q / 100 * self.count), 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return self.min_latency * self.growth**bucket
+        return None  # pragma: nocover
+
+
+@dataclass
+class TransferBenchmark:
+    """Progress and throughput of a chunked transfer to or from IPFS."""
+
+    size: int
+    transferred: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def progress(self) -> float:
+        """Get the share of the bytes which have been transferred."""
+        if self.size == 0:
+            return 1.0
+        return self.transferred / self.size
+
+    @property
+    def throughput(self) -> float:
+        """Get the throughput of the transfer, in bytes per second."""
+        if self.elapsed == 0:
+            return 0.0
+        return self.transferred / self.elapsed
+
+
+class BenchmarkTool(BaseBenchmarkTool):
+    """Benchmark tool which also keeps per-source statistics of the external data sources, and latency histograms."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the benchmark tool."""
+        self.source_data: Dict[str, SourceBenchmark] = {}
+        self.latency_histograms: Dict[str, LatencyHistogram] = {}
+        self.transfer_data: Dict[str, TransferBenchmark] = {}
+        super().__init__(*args, **kwargs)
+
+    def measure_source(self, source: str, latency: float, error: bool) -> None:
+        """Record the latency and the outcome of a request to an external data source."""
+        data = self.source_data.setdefault(source, SourceBenchmark())
+        data.requests += 1
+        data.errors += int(error)
+        data.total_latency += latency
+        data.max_latency = max(data.max_latency, latency)
+
+    def start_transfer(self, transfer: str, size: int) -> TransferBenchmark:
+        """Start measuring a chunked transfer of the given size, in bytes."""
+        data = self.transfer_data[transfer] = TransferBenchmark(size)
+        return data
+
+    def measure_transfer(self, transfer: str, size: int, elapsed: float) -> None:
+        """Record a chunk of the given size, transferred after the given time since the start of the transfer."""
+        data = self.transfer_data[transfer]
+        data.transferred += size
+        data.chunks += 1
+        data.elapsed = elapsed
+
+    @property
+    def data(self) -> List:
+        """Returns formatted data, including the statistics of the external data sources and of the transfers."""
+        source_data = [
+            {
+                "source": source,
+                "data": {
+                    "requests": data.requests,
+                    "errors": data.errors,
+                    "mean_latency": data.mean_latency,
+                    "max_latency": data.max_latency,
+                },
+            }
+            for source, data in self.source_data.items()
+        ]
+        transfer_data = [
+            {
+                "transfer": transfer,
+                "data": {
+                    "size": data.size,
+                    "transferred": data.transferred,
+                    "chunks": data.chunks,
+                    "progress": data.progress,
+                    "throughput": data.throughput,
+                },
+            }
+            for transfer, data in self.transfer_data.items()
+        ]
+        return super().data + source_data + transfer_data
+
+    def record_latencies(self) -> None:
+        """Add the local and consensus time measured for each behaviour in this period to its latency histogram."""
+        for behaviour, tool in self.benchmark_data.items():
+            latency = sum(block.total_time for block in tool.local_data.values())
+            histogram = self.latency_histograms.setdefault(
+                behaviour, LatencyHistogram()
+            )
+            histogram.add(latency)
+
+    def get_latency_percentile(self, q: float, min_samples: int) -> Optional[float]:
+        """
+        Get the q-th percentile of the latency of the slowest behaviour.
+
+        :param q: the percentile, between 0 and 100.
+        :param min_samples: the number of periods a behaviour must have been measured in to be taken into account.
+        :return: the percentile, or None if no behaviour has been measured enough yet
+        """
+        percentiles = [
+            histogram.percentile(q)
+            for histogram in self.latency_histograms.values()
+            if histogram.count >= min_samples
+        ]
+        return max(
+            (percentile for percentile in percentiles if percentile is not None),
+            default=None,
+        )
+
+    def reset(self) -> None:
+        """Reset benchmark data, after recording the latencies of this period."""
+        self.record_latencies()
+        super().reset()
+        self.source_data.clear()
+        self.transfer_data.clear()
+
+
+@dataclass
+class TokenBucket:
+    """A token bucket, refilled with `rate` tokens per second up to `burst` tokens."""
+
+    rate: float
+    burst: float
+    tokens: float
+    updated_at: float
+
+    def reserve(self, now: float, max_delay: float = math.inf) -> Optional[float]:
+        """
+        Reserve a token, going into debt if the bucket is empty.
+
+        :param now: the current time.
+        :param max_delay: the delay from which the token is not reserved.
+        :return: the delay after which the reserved token is available, or None if it was not reserved.
+        """
+        elapsed = max(now - self.updated_at, 0.0)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+        delay = max(1 - self.tokens, 0.0) / self.rate
+        if delay >= max_delay:
+            return None
+        self.tokens -= 1
+        return delay
+
+
+class RateLimiter(Model):
+    """
+    Rate limiter shared by all the outbound HTTP requests of the skill.
+
+    Each host has a token bucket, which spaces out the requests according to its budget.
+    When a host answers that it is overloaded, it is blocked for a jittered exponential backoff,
+    or for the delay requested by its `Retry-After` header if that is longer.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the rate limiter."""
+        self.default_rate: float = kwargs.pop("default_rate", 1.0)
+        self.default_burst: int = kwargs.pop("default_burst", 5)
+        self.host_budgets: Dict[str, Dict[str, float]] = kwargs.pop("host_budgets", {})
+        self.backoff_factor: float = kwargs.pop("backoff_factor", 1.0)
+        self.max_backoff: float = kwargs.pop("max_backoff", 30.0)
+        self.max_retries: int = kwargs.pop("max_retries", 3)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._blocked_until: Dict[str, float] = {}
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        """Get the host of a url."""
+        return urlparse(url).netloc
+
+    def _get_bucket(self, host: str, now: float) -> TokenBucket:
+        """Get the token bucket of a host, creating it from its budget if needed."""
+        if host not in self._buckets:
+            budget = self.host_budgets.get(host, {})
+            burst = budget.get("burst", self.default_burst)
+            self._buckets[host] = TokenBucket(
+                rate=budget.get("rate", self.default_rate),
+                burst=burst,
+                tokens=burst,
+                updated_at=now,
+            )
+        return self._buckets[host]
+
+    def reserve(
+        self, url: str, deadline: Optional[float] = None, min_delay: float = 0.0
+    ) -> Optional[float]:
+        """
+        Reserve a request to the host of the given url, unless it could not be sent before the deadline.
+
+        The deadline is checked before the budget of the host is taken, so that the requests which are given up
+        do not delay the next ones.
+
+        :param url: the url of the request.
+        :param deadline: the time before which the request must be sent, if any.
+        :param min_delay: the minimum delay before sending the request.
+        :return: the delay to wait before sending the request, or None if it could not be sent in time.
+        """
+        host = self.get_host(url)
+        now = time.time()
+        max_delay = math.inf if deadline is None else deadline - now
+        blocked_for = max(self._blocked_until.get(host, now) - now, min_delay, 0.0)
+        if blocked_for >= max_delay:
+            return None
+        delay = self._get_bucket(host, now).reserve(now, max_delay)
+        if delay is None:
+            return None
+        return max(delay, blocked_for)
+
+    def backoff(self, url: str, attempt: int, retry_after: Optional[float]) -> float:
+        """
+        Block the host of the given url after it rejected a request.
+
+        :param url: the url of the rejected request.
+        :param attempt: the number of attempts made so far, starting from 0.
+        :param retry_after: the delay requested by the host, if any.
+        :return: the delay to wait before retrying the request.
+        """
+        backoff = min(self.max_backoff, self.backoff_factor * 2**attempt)
+        # half-jitter, so that the agents do not retry in lockstep
+        delay = backoff * random.uniform(0.5, 1.0)  # nosec
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        host = self.get_host(url)
+        now = time.time()
+        self._blocked_until[host] = max(self._blocked_until.get(host, now), now + delay)
+        return delay
+
+    @staticmethod
+    def parse_retry_after(headers: str) -> Optional[float]:
+        """
+        Parse the `Retry-After` header, given either in seconds or as an HTTP date.
+
+        :param headers: the headers of the response, one `name: value` per line.
+        :return: the delay in seconds, or None if the header is missing or invalid.
+        """
+        for line in headers.splitlines():
+            name, _, value = line.partition(":")
+            if name.strip().lower() != "retry-after":
+                continue
+            value = value.strip()
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                pass
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                return None
+        return None
+
+
+@dataclass(frozen=True)
+class FeeQuote:
+    """An EIP-1559 fee quote."""
+
+    max_fee_per_gas: int
+    max_priority_fee_per_gas: int
+
+
+@dataclass
+class FeeHistory:
+    """The fee history of a chain, cached per block."""
+
+    base_fees: Dict[int, int] = field(default_factory=dict)
+    rewards: Dict[int, List[int]] = field(default_factory=dict)
+    next_base_fee: Optional[int] = None
+    updated_at: float = 0.0
+
+    def update(self, fee_history: Dict[str, Any], window: int, now: float) -> None:
+        """
+        Merge a response of `eth_feeHistory` in the cache, and evict the blocks which are out of the window.
+
+        :param fee_history: the fee history, with the `oldestBlock`, `baseFeePerGas` and `reward` fields.
+        :param window: the number of most recent blocks to keep.
+        :param now: the time of the update.
+        """
+        # the base fees include the one of the block following the newest one
+        *base_fees, next_base_fee = fee_history["baseFeePerGas"]
+        rewards = fee_history.get("reward") or []
+        oldest_block = int(fee_history["oldestBlock"])
+        for offset, base_fee in enumerate(base_fees):
+            self.base_fees[oldest_block + offset] = int(base_fee)
+        for offset, block_rewards in enumerate(rewards):
+            self.rewards[oldest_block + offset] = [
+                int(reward) for reward in block_rewards
+            ]
+        self.next_base_fee = int(next_base_fee)
+        self.updated_at = now
+
+        if not self.base_fees:
+            return
+        first_block = max(self.base_fees) - window + 1
+        for block in [block for block in self.base_fees if block < first_block]:
+            del self.base_fees[block]
+            self.rewards.pop(block, None)
+
+
+class FeeOracle(Model):
+    """
+    EIP-1559 fee oracle, shared by the behaviours which prepare transactions.
+
+    The base fees and the priority fee percentiles of the recent blocks are cached per chain.
+    While the cache is fresh, a quote is given instantly; otherwise, only the blocks produced since the last update
+    are sampled from `eth_feeHistory`.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the fee oracle."""
+        self.block_window: int = kwargs.pop("block_window", 20)
+        self.block_time: float = kwargs.pop("block_time", 5.0)
+        self.max_age: float = kwargs.pop("max_age", 10.0)
+        self.reward_percentiles: List[float] = kwargs.pop(
+            "reward_percentiles", [10.0, 50.0, 90.0]
+        )
+        self.priority_percentile: float = kwargs.pop("priority_percentile", 50.0)
+        self.base_fee_multiplier: float = kwargs.pop("base_fee_multiplier", 2.0)
+        if self.priority_percentile not in self.reward_percentiles:
+            raise ValueError(
+                f"The priority percentile {self.priority_percentile} is not one of "
+                f"the sampled reward percentiles {self.reward_percentiles}."
+            )
+        self._histories: Dict[str, FeeHistory] = {}
+        super().__init__(*args, **kwargs)
+
+    def get_block_count(self, chain_id: str) -> int:
+        """
+        Get the number of blocks which need to be sampled before quoting on the given chain.
+
+        :param chain_id: the id of the chain.
+        :return: 0 if the cache is fresh, the number of blocks produced since the last update otherwise.
+        """
+        history = self._histories.get(chain_id)
+        if history is None or not history.base_fees:
+            return self.block_window
+
+        elapsed = time.time() - history.updated_at
+        if elapsed < self.max_age:
+            return 0
+        # one more block, in case the newest one at the last update was not final yet
+        return min(self.block_window, math.ceil(elapsed / self.block_time) + 1)
+
+    def update(self, chain_id: str, fee_history: Dict[str, Any]) -> None:
+        """Cache a response of `eth_feeHistory` for the given chain."""
+        history = self._histories.setdefault(chain_id, FeeHistory())
+        history.update(fee_history, self.block_window, time.time())
+
+    def quote(self, chain_id: str) -> Optional[FeeQuote]:
+        """
+        Quote the fees of a transaction on the given chain, from the cached fee history.
+
+        The priority fee is the median, over the cached blocks, of the priority fee percentile.
+        The max fee leaves room for the base fee to grow by `base_fee_multiplier` before the transaction is included.
+
+        :param chain_id: the id of the chain.
+        :return: the quote, or None if the fee history of the chain has never been sampled.
+        """
+        history = self._histories.get(chain_id)
+        if history is None or history.next_base_fee is None:
+            return None
+
+        index = self.reward_percentiles.index(self.priority_percentile)
+        priority_fees = sorted(
+            rewards[index]
+            for rewards in history.rewards.values()
+            if len(rewards) > index
+        )
+        max_priority_fee_per_gas = (
+            priority_fees[len(priority_fees) // 2] if priority_fees else 0
+        )
+        max_fee_per_gas = (
+            int(history.next_base_fee * self.base_fee_multiplier)
+            + max_priority_fee_per_gas
+        )
+        return FeeQuote(
+            max_fee_per_gas=max_fee_per_gas,
+            max_priority_fee_per_gas=max_priority_fee_per_gas,
+        )
+
+
+class IPFSCache(Model):
+    """
+    Size-bounded, on-disk cache of the files retrieved from IPFS, keyed by CID.
+
+    The content addressed by a CID never changes, so the entries never need to be invalidated,
+    only evicted, least recently used first, when the cache grows over `max_size` bytes.
+    Each entry is a directory holding the files of the CID, which are read through memory maps.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the cache."""
+        self.cache_dir: str = kwargs.pop("cache_dir", "ipfs_cache")
+        self.max_size: int = kwargs.pop("max_size", 512 * 1024 * 1024)
+        self._path = ""
+        # the size of each entry, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def size(self) -> int:
+        """Get the total size of the cached files."""
+        return sum(self._entries.values())
+
+    def setup(self) -> None:
+        """Load the entries which were cached by a previous run, in the order in which they were last used."""
+        super().setup()
+        self._path = os.path.join(self.context.data_dir, self.cache_dir)
+        os.makedirs(self._path, exist_ok=True)
+        entries = []
+        for cid in os.listdir(self._path):
+            entry_path = os.path.join(self._path, cid)
+            if cid.startswith("."):
+                # an entry which was being written when the previous run stopped
+                shutil.rmtree(entry_path, ignore_errors=True)
+                continue
+            if not os.path.isdir(entry_path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(entry_path, name))
+                for name in os.listdir(entry_path)
+            )
+            entries.append((os.path.getmtime(entry_path), cid, size))
+        for _, cid, size in sorted(entries):
+            self._entries[cid] = size
+
+    def get(self, cid: str) -> Optional[Dict[str, Union[bytes, mmap.mmap]]]:
+        """
+        Get the files of a CID from the cache.
+
+        :param cid: the CID.
+        :return: the memory-mapped content of each file, by name, or None if the CID is not cached
+        """
+        if cid not in self._entries:
+            return None
+        entry_path = os.path.join(self._path, cid)
+        files: Dict[str, Union[bytes, mmap.mmap]] = {}
+        for name in os.listdir(entry_path):
+            with open(os.path.join(entry_path, name), "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    # empty files cannot be memory-mapped
+                    files[name] = b""
+                    continue
+                files[name] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._entries.move_to_end(cid)
+        os.utime(entry_path)
+        return files
+
+    def put(self, cid: str, files: Dict[str, bytes]) -> bool:
+        """
+        Cache the files of a CID, evicting the least recently used entries if needed.
+
+        Only a single file, whose CID can be verified locally, is cached, so that the cache never serves
+        content which does not match its CID.
+
+        :param cid: the CID.
+        :param files: the content of each file, by name.
+        :return: whether the files were cached
+        """
+        if cid in self._entries or len(files) != 1:
+            return False
+        ((name, data),) = files.items()
+        size = len(data)
+        if size > self.max_size or not is_same_cid(get_cid(name, data), cid):
+            return False
+
+        while self._entries and self.size + size > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            shutil.rmtree(os.path.join(self._path, evicted), ignore_errors=True)
+
+        # write the entry aside, then move it in place, so that a partial entry is never read
+        staging_path = tempfile.mkdtemp(dir=self._path, prefix=".")
+        with open(os.path.join(staging_path, name), "wb") as file:
+            file.write(data)
+        os.replace(staging_path, os.path.join(self._path, cid))
+        self._entries[cid] = size
+        return True
 
 
 class Params(BaseParams):
@@ -51,23 +734,84 @@ class Params(BaseParams):
             "coingecko_price_template", kwargs, str
         )
         self.coingecko_api_key = kwargs.get("coingecko_api_key", None)
+        self.price_token_ids: List[str] = self._ensure(
+            "price_token_ids", kwargs, List[str]
+        )
+        self.price_sources: List[Dict[str, str]] = self._ensure(
+            "price_sources", kwargs, List[Dict[str, str]]
+        )
+        self.price_source_quorum = self._ensure("price_source_quorum", kwargs, int)
+        self.price_source_timeout = self._ensure("price_source_timeout", kwargs, float)
+        self.price_max_age = self._ensure("price_max_age", kwargs, float)
+        self.price_tolerance = self._ensure("price_tolerance", kwargs, float)
+        self.keeper_fetch = self._ensure("keeper_fetch", kwargs, bool)
+        self.keeper_fetch_timeout = self._ensure("keeper_fetch_timeout", kwargs, float)
+        self.price_prefetch_interval = self._ensure(
+            "price_prefetch_interval", kwargs, float
+        )
+        self.price_prefetch_max_age = self._ensure(
+            "price_prefetch_max_age", kwargs, float
+        )
+        self.price_history_size = self._ensure("price_history_size", kwargs, int)
+        self.decision_rules: List[Dict[str, Any]] = self._ensure(
+            "decision_rules", kwargs, List[Dict[str, Any]]
+        )
+        self.decide_in_price_round = self._ensure("decide_in_price_round", kwargs, bool)
+        self.min_reset_pause_duration = self._ensure(
+            "min_reset_pause_duration", kwargs, float
+        )
+        self.max_reset_pause_duration = self._ensure(
+            "max_reset_pause_duration", kwargs, float
+        )
+        self.volatility_decay = self._ensure("volatility_decay", kwargs, float)
+        self.volatility_reference = self._ensure("volatility_reference", kwargs, float)
+        self.round_timeout_percentile = self._ensure(
+            "round_timeout_percentile", kwargs, float
+        )
+        self.round_timeout_factor = self._ensure("round_timeout_factor", kwargs, float)
+        self.round_timeout_min_samples = self._ensure(
+            "round_timeout_min_samples", kwargs, int
+        )
+        self.min_round_timeout = self._ensure("min_round_timeout", kwargs, float)
+        self.max_round_timeout = self._ensure("max_round_timeout", kwargs, float)
         self.transfer_target_address = self._ensure(
             "transfer_target_address", kwargs, str
         )
+        self.safe_chain_id = self._ensure("safe_chain_id", kwargs, int)
 
         # New parameters for IPFS storage
-        self.ipfs_api_endpoint = self._ensure("ipfs_api_endpoint", kwargs, str)
-        self.ipfs_timeout = self._ensure("ipfs_timeout", kwargs, int, default=60)
+        self.ipfs_timeout = self._ensure("ipfs_timeout", kwargs, int)
+        self.ipfs_chunk_size = self._ensure("ipfs_chunk_size", kwargs, int)
+        self.ipfs_datasets: Dict[str, str] = self._ensure(
+            "ipfs_datasets", kwargs, Dict[str, str]
+        )
+        self.ipfs_batch_size = self._ensure("ipfs_batch_size", kwargs, int)
+        self.ipfs_batch_max_wait = self._ensure("ipfs_batch_max_wait", kwargs, float)
 
         # New parameters for Multisend transactions
         self.multisend_contract_address = self._ensure(
             "multisend_contract_address", kwargs, str
         )
-        self.multisend_gas_limit = self._ensure(
-            "multisend_gas_limit", kwargs, int, default=300000
-        )
+        self.multisend_gas_limit = self._ensure("multisend_gas_limit", kwargs, int)
+        self.multisend_batch_size = self._ensure("multisend_batch_size", kwargs, int)
+        self.multisend_max_wait = self._ensure("multisend_max_wait", kwargs, float)
 
         # Custom contract parameters (if needed)
         self.custom_contract_address = kwargs.get("custom_contract_address", None)
+        self.custom_contract_data = self._ensure("custom_contract_data", kwargs, str)
+
+        # the round timeout must leave time for the longest wait within a round, that is for the keeper
+        # to query the price sources and for the others to fetch its responses, or for an IPFS request
+        longest_round_wait = max(
+            self.price_source_timeout + self.keeper_fetch_timeout, self.ipfs_timeout
+        )
+        self.min_round_timeout = max(
+            self.min_round_timeout, longest_round_wait + ROUND_TIMEOUT_MARGIN
+        )
+        enforce(
+            self.max_round_timeout >= self.min_round_timeout,
+            f"max_round_timeout must be at least {self.min_round_timeout}s, "
+            f"the longest wait within a round plus a margin of {ROUND_TIMEOUT_MARGIN}s.",
+        )
 
         super().__init__(*args, **kwargs)
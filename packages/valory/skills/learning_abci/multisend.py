@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Accumulation of the transfers which are settled together in multisend transactions."""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from eth_abi import encode
+from eth_utils import keccak
+
+from packages.valory.contracts.multisend.contract import (
+    MultiSendOperation,
+    encode_data,
+    to_bytes,
+)
+
+
+MULTISEND_SELECTOR = keccak(text="multiSend(bytes)")[:4]
+# the base cost of the transaction, the checks of the signatures, and the delegate call to the MultiSend contract
+SAFE_TX_GAS_OVERHEAD = 80_000
+# the cold access to the recipient, the transfer of value, and the decoding loop of the MultiSend contract
+CALL_GAS = 2_600 + 9_000 + 1_500
+ZERO_BYTE_GAS = 4
+NON_ZERO_BYTE_GAS = 16
+
+
+def _to_multisend_tx(tx: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a queued transaction to the format of the MultiSend contract package."""
+    return {
+        "operation": MultiSendOperation(tx["operation"]),
+        "to": tx["to"],
+        "value": tx["value"],
+        "data": bytes.fromhex(tx["data"].removeprefix("0x")),
+    }
+
+
+def get_multisend_data(transactions: Sequence[Dict[str, Any]]) -> bytes:
+    """
+    Get the calldata of a `multiSend` call of the MultiSend contract, as `get_tx_data` of the contract does.
+
+    :param transactions: the transactions, with their `operation`, `to`, `value` and hex `data`.
+    :return: the calldata
+    """
+    encoded = to_bytes([_to_multisend_tx(tx) for tx in transactions])
+    return MULTISEND_SELECTOR + encode(["bytes"], [encoded])
+
+
+def estimate_call_gas(tx: Dict[str, Any]) -> int:
+    """
+    Estimate the gas used by a call within a multisend transaction, without executing it.
+
+    The estimate covers the call itself and its share of the calldata. A call to a contract
+    spends more gas on its execution, so its `gas` may be given explicitly, and is then added.
+
+    :param tx: the transaction, with its `operation`, `to`, `value`, hex `data` and optional `gas`.
+    :return: the estimated gas
+    """
+    encoded = encode_data(_to_multisend_tx(tx))
+    zero_bytes = encoded.count(0)
+    calldata_gas = (
+        zero_bytes * ZERO_BYTE_GAS + (len(encoded) - zero_bytes) * NON_ZERO_BYTE_GAS
+    )
+    return CALL_GAS + calldata_gas + tx.get("gas", 0)
+
+
+def pack_batches(
+    transactions: Sequence[Dict[str, Any]], gas_limit: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Pack transactions into as few multisend transactions as fit under the gas limit.
+
+    The packing is first-fit decreasing: the most expensive calls are placed first, each in the first batch
+    with room for it. A call which does not fit in an empty batch is placed alone in a batch.
+
+    :param transactions: the transactions, oldest first.
+    :param gas_limit: the gas limit of a multisend transaction.
+    :return: the batches, each in the order of the given transactions, the one with the oldest transaction first
+    """
+    capacity = gas_limit - SAFE_TX_GAS_OVERHEAD
+    costs = [estimate_call_gas(tx) for tx in transactions]
+    batches: List[List[int]] = []
+    used: List[int] = []
+    for index in sorted(range(len(transactions)), key=lambda i: (-costs[i], i)):
+        for batch, batch_used in enumerate(used):
+            if batch_used + costs[index] <= capacity:
+                batches[batch].append(index)
+                used[batch] += costs[index]
+                break
+        else:
+            batches.append([index])
+            used.append(costs[index])
+
+    return [
+        [transactions[index] for index in sorted(batch)]
+        for batch in sorted(batches, key=min)
+    ]
+
+
+class MultisendQueue:
+    """
+    Queue of the transfers waiting to be settled in a multisend transaction.
+
+    The queue is flushed into a batch once it holds `batch_size` transfers, or once its oldest transfer
+    has waited for `max_wait` seconds, so that the overhead of a Safe transaction is amortised over many transfers.
+    The flushed transfers are packed into batches under `gas_limit`, which are settled one after the other.
+    """
+
+    def __init__(
+        self,
+        transfers: Sequence[Dict[str, Any]],
+        batch_size: int,
+        max_wait: float,
+        gas_limit: int,
+    ) -> None:
+        """
+        Initialize the queue.
+
+        :param transfers: the queued transfers, oldest first, with the time at which they were queued in `queued_at`.
+        :param batch_size: the number of transfers which triggers a flush.
+        :param max_wait: the time after which the oldest transfer triggers a flush, in seconds.
+        :param gas_limit: the gas limit of a multisend transaction.
+        """
+        self.transfers: List[Dict[str, Any]] = list(transfers)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.gas_limit = gas_limit
+
+    def push(self, to: str, value: int, data: str, queued_at: float) -> None:
+        """Queue a call of the Safe."""
+        self.transfers.append(
+            {
+                "operation": MultiSendOperation.CALL.value,
+                "to": to,
+                "value": value,
+                "data": data,
+                "queued_at": queued_at,
+            }
+        )
+
+    def is_due(self, now: float) -> bool:
+        """Check whether the queue should be flushed at the given time."""
+        if not self.transfers:
+            return False
+        if self.transfers[0].get("flushed", False):
+            return True
+        if len(self.transfers) >= self.batch_size:
+            return True
+        return now - self.transfers[0]["queued_at"] >= self.max_wait
+
+    def flush(self, now: float) -> Optional[List[Dict[str, Any]]]:
+        """
+        Take a batch of the oldest transfers out of the queue, if it is due.
+
+        At most `batch_size` of the oldest transfers are packed under the gas limit. The batch with the oldest
+        transfer is taken, and the transfers of the other batches are left at the head of the queue, marked as
+        `flushed`, so that they are settled in the next periods without waiting again.
+
+        :param now: the current time.
+        :return: the batch, oldest first, or None if the queue is not due
+        """
+        if not self.is_due(now):
+            return None
+        candidates = self.transfers[: self.batch_size]
+        batch, *_ = pack_batches(candidates, self.gas_limit)
+        taken = {id(transfer) for transfer in batch}
+        for transfer in candidates:
+            if id(transfer) not in taken:
+                transfer["flushed"] = True
+        self.transfers = [
+            transfer for transfer in self.transfers if id(transfer) not in taken
+        ]
+        return batch
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tools for payload serialization and deserialization."""
+
+import base64
+import binascii
+import json
+import math
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aea.crypto.ledger_apis import LedgerApis
+from eth_utils import to_checksum_address
+
+
+PRICE_SIZE = struct.calcsize("<d")
+
+TRANSFERS_VERSION = 1
+# version, number of addresses, number of transfers
+TRANSFERS_HEADER = struct.Struct(">BHI")
+ADDRESS_SIZE = 20
+# operation, flags, address index, gas, queued at
+TRANSFER_HEAD = struct.Struct(">BBHId")
+LENGTH = struct.Struct(">I")
+FLUSHED_FLAG = 1
+
+
+class PayloadDecodingError(ValueError):
+    """Error raised when a payload field cannot be decoded."""
+
+
+def encode_prices(prices: Sequence[Optional[float]]) -> str:
+    """
+    Encode a price vector compactly, as the base64 of little-endian doubles.
+
+    Missing prices are encoded as NaN, so that the position of each token in the vector is preserved.
+
+    :param prices: the prices, one per token.
+    :return: the encoded price vector.
+    """
+    values = [math.nan if price is None else float(price) for price in prices]
+    packed = struct.pack(f"<{len(values)}d", *values)
+    return base64.b64encode(packed).decode()
+
+
+def decode_prices(encoded: str) -> Tuple[float, ...]:
+    """
+    Decode a price vector encoded with `encode_prices`.
+
+    :param encoded: the encoded price vector.
+    :return: the prices, one per token, with NaN for the missing ones.
+    """
+    try:
+        packed = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, TypeError) as e:
+        raise PayloadDecodingError(f"Invalid price vector {encoded!r}: {e}") from e
+
+    if len(packed) % PRICE_SIZE != 0:
+        raise PayloadDecodingError(
+            f"Invalid price vector {encoded!r}: {len(packed)} bytes is not a multiple of {PRICE_SIZE}."
+        )
+    return struct.unpack(f"<{len(packed) // PRICE_SIZE}d", packed)
+
+
+def encode_transfers(transfers: Sequence[Dict[str, Any]]) -> str:
+    """
+    Encode the transfers of a multisend queue or batch compactly, as the base64 of a versioned binary layout.
+
+    The recipients are stored once, in a table which the transfers refer to, and the values are stored
+    in as few bytes as they need, so that a batch of transfers to a few recipients takes a few dozen bytes each.
+
+    :param transfers: the transfers, with their `operation`, `to`, `value`, hex `data`, `queued_at`,
+        and optional `gas` and `flushed`.
+    :return: the encoded transfers.
+    """
+    addresses: Dict[bytes, int] = {}
+    records = []
+    for transfer in transfers:
+        address = bytes.fromhex(transfer["to"].removeprefix("0x"))
+        index = addresses.setdefault(address, len(addresses))
+        value = int(transfer["value"])
+        value_bytes = value.to_bytes((value.bit_length() + 7) // 8, "big")
+        data = bytes.fromhex(transfer["data"].removeprefix("0x"))
+        flags = FLUSHED_FLAG if transfer.get("flushed", False) else 0
+        records.append(
+            TRANSFER_HEAD.pack(
+                transfer["operation"],
+                flags,
+                index,
+                transfer.get("gas", 0),
+                transfer["queued_at"],
+            )
+            + bytes([len(value_bytes)])
+            + value_bytes
+            + LENGTH.pack(len(data))
+            + data
+        )
+
+    header = TRANSFERS_HEADER.pack(TRANSFERS_VERSION, len(addresses), len(records))
+    packed = header + b"".join(addresses) + b"".join(records)
+    return base64.b64encode(packed).decode()
+
+
+def decode_transfers(encoded: str) -> List[Dict[str, Any]]:
+    """
+    Decode the transfers encoded with `encode_transfers`.
+
+    :param encoded: the encoded transfers.
+    :return: the transfers, with checksummed recipients.
+    """
+    try:
+        packed = base64.b64decode(encoded, validate=True)
+        version, n_addresses, n_transfers = TRANSFERS_HEADER.unpack_from(packed)
+        if version != TRANSFERS_VERSION:
+            raise PayloadDecodingError(
+                f"Unsupported version {version} of the encoded transfers."
+            )
+        offset = TRANSFERS_HEADER.size
+        addresses = []
+        for _ in range(n_addresses):
+            address = packed[offset : offset + ADDRESS_SIZE]
+            if len(address) != ADDRESS_SIZE:
+                raise PayloadDecodingError("Truncated address table.")
+            addresses.append(to_checksum_address(address))
+            offset += ADDRESS_SIZE
+
+        transfers = []
+        for _ in range(n_transfers):
+            operation, flags, index, gas, queued_at = TRANSFER_HEAD.unpack_from(
+                packed, offset
+            )
+            offset += TRANSFER_HEAD.size
+            value_size = packed[offset]
+            value_bytes = packed[offset + 1 : offset + 1 + value_size]
+            if len(value_bytes) != value_size:
+                raise PayloadDecodingError("Truncated transfer value.")
+            offset += 1 + value_size
+            (data_size,) = LENGTH.unpack_from(packed, offset)
+            offset += LENGTH.size
+            data = packed[offset : offset + data_size]
+            if len(data) != data_size:
+                raise PayloadDecodingError("Truncated transfer data.")
+            offset += data_size
+
+            transfer = {
+                "operation": operation,
+                "to": addresses[index],
+                "value": int.from_bytes(value_bytes, "big"),
+                "data": data.hex(),
+                "queued_at": queued_at,
+            }
+            if gas:
+                transfer["gas"] = gas
+            if flags & FLUSHED_FLAG:
+                transfer["flushed"] = True
+            transfers.append(transfer)
+    except (binascii.Error, TypeError, struct.error, IndexError) as e:
+        raise PayloadDecodingError(f"Invalid transfers {encoded!r}: {e}") from e
+
+    if offset != len(packed):
+        raise PayloadDecodingError(
+            f"Invalid transfers {encoded!r}: {len(packed) - offset} trailing bytes."
+        )
+    return transfers
+
+
+def encode_reports(reports: Sequence[Dict[str, Any]]) -> str:
+    """
+    Encode the period reports waiting to be stored in a batch.
+
+    :param reports: the reports, oldest first, with their `period`, `created_at` and encoded `report`.
+    :return: the encoded reports.
+    """
+    return json.dumps(
+        [
+            {
+                "period": report["period"],
+                "created_at": report["created_at"],
+                "report": report["report"],
+            }
+            for report in reports
+        ],
+        separators=(",", ":"),
+    )
+
+
+def decode_reports(encoded: str) -> List[Dict[str, Any]]:
+    """
+    Decode the reports encoded with `encode_reports`.
+
+    :param encoded: the encoded reports.
+    :return: the reports, oldest first.
+    """
+    try:
+        reports = json.loads(encoded)
+    except (json.JSONDecodeError, TypeError) as e:
+        raise PayloadDecodingError(f"Invalid reports {encoded!r}: {e}") from e
+
+    if not isinstance(reports, list) or not all(
+        isinstance(report, dict)
+        and isinstance(report.get("period"), int)
+        and isinstance(report.get("created_at"), (int, float))
+        and isinstance(report.get("report"), str)
+        for report in reports
+    ):
+        raise PayloadDecodingError(f"Invalid reports {encoded!r}.")
+    periods = [report["period"] for report in reports]
+    if periods != sorted(set(periods)):
+        raise PayloadDecodingError(
+            f"Invalid reports {encoded!r}: the periods are not increasing."
+        )
+    return reports
+
+
+def is_attested_by(
+    message: str, signature: Optional[str], address: str, ledger_id: str
+) -> bool:
+    """
+    Check whether a message has been signed by the given address.
+
+    :param message: the signed message.
+    :param signature: the signature of the message.
+    :param address: the address which is expected to have signed the message.
+    :param ledger_id: the ledger id of the address.
+    :return: whether the signature is valid and recovers the address.
+    """
+    if signature is None:
+        return False
+    try:
+        addresses = LedgerApis.recover_message(
+            identifier=ledger_id, message=message.encode(), signature=signature
+        )
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return address in addresses
@@ -29,7 +29,12 @@ from packages.valory.skills.abstract_round_abci.base import BaseTxPayload
 class APICheckPayload(BaseTxPayload):
     """Represent a transaction payload for the APICheckRound."""
 
-    price: Optional[float]
+    prices: Optional[str]
+    price_timestamp: Optional[float] = None
+    raw_response: Optional[str] = None
+    raw_response_signature: Optional[str] = None
+    event: Optional[str] = None
+    round_timeout: Optional[float] = None
 
 
 @dataclass(frozen=True)
@@ -45,6 +50,7 @@ class TxPreparationPayload(BaseTxPayload):
 
     tx_submitter: Optional[str] = None
     tx_hash: Optional[str] = None
+    safe_nonce: Optional[int] = None
 
 
 @dataclass(frozen=True)
@@ -52,7 +58,8 @@ class IPFSPayload(BaseTxPayload):
     """Represent a transaction payload for storing/retrieving data from IPFS."""
 
     ipfs_hash: Optional[str] = None
-    data: Optional[str] = None
+    # the encoded reports waiting to be stored in a batch, in the store round
+    reports: Optional[str] = None
 
 
 @dataclass(frozen=True)
@@ -61,13 +68,15 @@ class MultisendTxPayload(BaseTxPayload):
 
     tx_submitter: Optional[str] = None
     multisend_tx_hash: Optional[str] = None
-    transactions: Optional[str] = None  # JSON string or similar representation of the transactions
+    transactions: Optional[str] = None  # encoded with `encode_transfers`
+    queue: Optional[str] = None  # encoded with `encode_transfers`
+    safe_nonce: Optional[int] = None
 
 
 @dataclass(frozen=True)
 class CustomContractPayload(BaseTxPayload):
     """Represent a transaction payload for interacting with a custom contract."""
 
-    contract_address: str
-    function_name: str
-    function_args: str  # Arguments can be serialized to a string or use a more appropriate data structure
+    tx_submitter: Optional[str] = None
+    tx_hash: Optional[str] = None
+    safe_nonce: Optional[int] = None
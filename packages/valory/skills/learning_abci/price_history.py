@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""This module contains the price history of the VotingAbciApp."""
+
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class PriceHistory:
+    """
+    Fixed-capacity ring buffer of price vectors, with rolling statistics over its content.
+
+    The sums used by the mean and the variance are updated incrementally, and the min/max
+    are tracked with monotonic queues, so that every statistic costs O(1) amortized per token
+    and per push, regardless of the capacity. NaN prices, i.e., prices which could not be observed,
+    are stored but ignored by the statistics. The sums are accumulated over the prices shifted by
+    a recent mean, to limit the loss of precision of the variance.
+    """
+
+    def __init__(self, capacity: int, n_tokens: int) -> None:
+        """Initialize the price history."""
+        if capacity <= 0:
+            raise ValueError(f"The capacity must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.n_tokens = n_tokens
+        self._buffer = np.full((capacity, n_tokens), np.nan)
+        self._pushes = 0
+        self._shift = np.full(n_tokens, np.nan)
+        self._sum = np.zeros(n_tokens)
+        self._sum_sq = np.zeros(n_tokens)
+        self._n_valid = np.zeros(n_tokens, dtype=np.int64)
+        # the monotonic queues hold (push number, price) pairs
+        self._max_queues: List[Deque[Tuple[int, float]]] = [
+            deque() for _ in range(n_tokens)
+        ]
+        self._min_queues: List[Deque[Tuple[int, float]]] = [
+            deque() for _ in range(n_tokens)
+        ]
+
+    def __len__(self) -> int:
+        """Get the number of price vectors in the history."""
+        return min(self._pushes, self.capacity)
+
+    def push(self, prices: Sequence[float]) -> None:
+        """
+        Append a price vector, evicting the oldest one if the history is full.
+
+        :param prices: the prices, one per token, with NaN for the missing ones.
+        """
+        values = np.asarray(prices, dtype=np.float64)
+        if values.shape != (self.n_tokens,):
+            raise ValueError(
+                f"Expected {self.n_tokens} prices, got an array of shape {values.shape}."
+            )
+
+        index = self._pushes % self.capacity
+        if self._pushes >= self.capacity:
+            evicted = self._buffer[index] - self._shift
+            evicted_valid = ~np.isnan(evicted)
+            self._sum[evicted_valid] -= evicted[evicted_valid]
+            self._sum_sq[evicted_valid] -= evicted[evicted_valid] ** 2
+            self._n_valid -= evicted_valid
+
+        self._buffer[index] = values
+        valid = ~np.isnan(values)
+        # the first price of a token is its shift, until the next resync
+        unshifted = valid & np.isnan(self._shift)
+        self._shift[unshifted] = values[unshifted]
+        shifted = values - self._shift
+        self._sum[valid] += shifted[valid]
+        self._sum_sq[valid] += shifted[valid] ** 2
+        self._n_valid += valid
+
+        push_number = self._pushes
+        self._pushes += 1
+        self._update_extrema(push_number, values)
+        if self._pushes % self.capacity == 0:
+            self._resync()
+
+    def _update_extrema(self, push_number: int, values: np.ndarray) -> None:
+        """Update the monotonic queues of the min/max with a new price vector."""
+        oldest = push_number - self.capacity
+        for token, value in enumerate(values.tolist()):
+            for queue, dominates in (
+                (self._max_queues[token], value.__ge__),
+                (self._min_queues[token], value.__le__),
+            ):
+                while queue and queue[0][0] <= oldest:
+                    queue.popleft()
+                if value != value:  # NaN
+                    continue
+                while queue and dominates(queue[-1][1]):
+                    queue.pop()
+                queue.append((push_number, value))
+
+    def _resync(self) -> None:
+        """Recompute the sums from the buffer, to bound the floating point drift of the incremental updates."""
+        valid = ~np.isnan(self._buffer)
+        self._n_valid = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(valid, self._buffer, 0.0).sum(axis=0) / self._n_valid
+        self._shift = np.where(self._n_valid > 0, means, self._shift)
+        shifted = np.where(valid, self._buffer - self._shift, 0.0)
+        self._sum = shifted.sum(axis=0)
+        self._sum_sq = (shifted**2).sum(axis=0)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Get a copy of the price vectors, from the oldest to the newest, as an array of shape (len, n_tokens)."""
+        return self.latest(len(self))
+
+    def latest(self, n: int) -> np.ndarray:
+        """Get a copy of the newest `n` price vectors, from the oldest to the newest."""
+        n = min(max(n, 0), len(self))
+        indices = np.arange(self._pushes - n, self._pushes) % self.capacity
+        return self._buffer[indices]
+
+    @property
+    def last(self) -> Optional[np.ndarray]:
+        """Get the newest price vector."""
+        if self._pushes == 0:
+            return None
+        return self._buffer[(self._pushes - 1) % self.capacity].copy()
+
+    @property
+    def mean(self) -> np.ndarray:
+        """Get the moving average of each token, NaN if it has no price in the history."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self._shift + self._sum / self._n_valid
+        return np.where(self._n_valid > 0, means, np.nan)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Get the moving (population) variance of each token, NaN if it has no price in the history."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shifted_mean = self._sum / self._n_valid
+            variance = np.maximum(self._sum_sq / self._n_valid - shifted_mean**2, 0.0)
+        return np.where(self._n_valid > 0, variance, np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        """Get the moving standard deviation of each token."""
+        return np.sqrt(self.variance)
+
+    @property
+    def min(self) -> np.ndarray:
+        """Get the moving minimum of each token, NaN if it has no price in the history."""
+        return np.array(
+            [queue[0][1] if queue else np.nan for queue in self._min_queues]
+        )
+
+    @property
+    def max(self) -> np.ndarray:
+        """Get the moving maximum of each token, NaN if it has no price in the history."""
+        return np.array(
+            [queue[0][1] if queue else np.nan for queue in self._max_queues]
+        )
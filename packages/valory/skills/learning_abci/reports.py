@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+Batches of period reports, which are stored on IPFS as a single directory.
+
+The reports of the periods are accumulated until a batch is due, and are then linked into a directory,
+with a file per period and an index. Only the CID of the directory is agreed on and pinned, and each
+period stays addressable by path under it, as `<root>/<batch>/<period file>`.
+
+The report of a period is a single row, which is stored as compact JSON. The index has all the rows
+of the batch, and is stored in the columnar format, so that its columns and ranges of periods can be
+read without decoding the others.
+"""
+
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+from packages.valory.skills.learning_abci.columnar import STR, encode_table, get_dtype
+from packages.valory.skills.learning_abci.ipfs_tools import encode_binary
+
+
+INDEX_FILENAME = "index.col"
+PATH_COLUMN = "path"
+PERIOD_COLUMN = "period"
+TX_HASH_COLUMN = "tx_hash"
+PRICE_COLUMN_PREFIX = "price."
+DATASET_COLUMN_PREFIX = "dataset."
+
+
+def get_report_filename(period: int) -> str:
+    """Get the name of the file of the report of a period, within its batch."""
+    return f"period_{period:09d}.json"
+
+
+def encode_report(row: Dict[str, Any]) -> str:
+    """
+    Encode the report of a period.
+
+    :param row: the value of each column of the report, in order, with the `period` first.
+    :return: the encoded report, in compact JSON
+    """
+    return json.dumps(row, separators=(",", ":"))
+
+
+def decode_report(encoded: str) -> Dict[str, Any]:
+    """
+    Decode a report encoded with `encode_report`.
+
+    :param encoded: the encoded report.
+    :return: the value of each column of the report, in order
+    """
+    row = json.loads(encoded)
+    if not isinstance(row, dict) or not isinstance(row.get(PERIOD_COLUMN), int):
+        raise ValueError(f"Invalid report {encoded!r}.")
+    return row
+
+
+def get_column_dtype(name: str, values: Sequence[Any]) -> str:
+    """
+    Get the type of a column of the index.
+
+    The hash of the transaction and the CIDs of the datasets are strings, even when they are missing
+    in every row, and the type of the other columns is inferred from their values.
+
+    :param name: the name of the column.
+    :param values: the values of the column, where None stands for a missing value.
+    :return: the type of the column
+    """
+    if name == TX_HASH_COLUMN or name.startswith(DATASET_COLUMN_PREFIX):
+        return STR
+    return get_dtype(values)
+
+
+def get_batch_dirname(reports: Sequence[Dict[str, Any]]) -> str:
+    """Get the name of the directory of a batch, from the first and the last of its periods."""
+    return f"reports_{reports[0]['period']:09d}_{reports[-1]['period']:09d}"
+
+
+def is_batch_due(
+    reports: Sequence[Dict[str, Any]],
+    batch_size: int,
+    max_wait: float,
+    now: float,
+) -> bool:
+    """
+    Check whether the accumulated reports should be stored as a batch.
+
+    :param reports: the accumulated reports, oldest first, with the time at which they were created in `created_at`.
+    :param batch_size: the number of reports which triggers a batch.
+    :param max_wait: the time after which the oldest report triggers a batch, in seconds.
+    :param now: the current time.
+    :return: whether the batch is due
+    """
+    if not reports:
+        return False
+    if len(reports) >= batch_size:
+        return True
+    return now - reports[0]["created_at"] >= max_wait
+
+
+def build_index(reports: Sequence[Dict[str, Any]]) -> bytes:
+    """
+    Build the index of a batch, as a table of all the rows of its reports, with the path of the report of each row.
+
+    The columns of all the reports are kept, in the order in which they first appear, so that the reports
+    of periods with different tokens or datasets can be batched together, with missing values where they differ.
+
+    :param reports: the reports, oldest first, with their `period` and their encoded `report`.
+    :return: the encoded index
+    """
+    rows = [decode_report(report["report"]) for report in reports]
+    names: Dict[str, None] = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    columns: Dict[str, List[Any]] = {
+        name: [row.get(name) for row in rows] for name in names
+    }
+    # integers cannot be missing, so an integer column with missing values is inferred as floats
+    dtypes = {name: get_column_dtype(name, values) for name, values in columns.items()}
+    columns[PATH_COLUMN] = [get_report_filename(row[PERIOD_COLUMN]) for row in rows]
+    return encode_table(columns, PERIOD_COLUMN, dtypes)
+
+
+def build_batch(reports: Sequence[Dict[str, Any]]) -> Tuple[str, Dict[str, bytes]]:
+    """
+    Build the directory of a batch of reports.
+
+    :param reports: the reports, oldest first, with their `period` and their encoded `report`.
+    :return: the name of the directory, and the content of each of its files, as stored on IPFS
+    """
+    files = {
+        get_report_filename(report["period"]): report["report"].encode()
+        for report in reports
+    }
+    files[INDEX_FILENAME] = encode_binary(build_index(reports))
+    return get_batch_dirname(reports), files
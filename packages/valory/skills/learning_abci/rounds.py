@@ -19,19 +19,36 @@
 
 """This package contains the rounds of VotingAbciApp."""
 
+import math
+import statistics
+from abc import ABC
+from collections import Counter
 from enum import Enum
-from typing import Dict, FrozenSet, Optional, Set, Tuple
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
 from packages.valory.skills.abstract_round_abci.base import (
     AbciApp,
     AbciAppTransitionFunction,
     AppState,
     BaseSynchronizedData,
+    BaseTxPayload,
     CollectSameUntilThresholdRound,
     CollectionRound,
     DegenerateRound,
     DeserializedCollection,
     EventToTimeout,
+    TransactionNotValidError,
     get_name,
 )
 from packages.valory.skills.learning_abci.payloads import (
@@ -42,6 +59,14 @@ from packages.valory.skills.learning_abci.payloads import (
     MultisendTxPayload,
     CustomContractPayload,
 )
+from packages.valory.skills.learning_abci.payload_tools import (
+    PayloadDecodingError,
+    decode_prices,
+    decode_reports,
+    decode_transfers,
+    encode_prices,
+    is_attested_by,
+)
 
 
 class Event(Enum):
@@ -56,6 +81,8 @@ class Event(Enum):
     IPFS_RETRIEVED = "ipfs_retrieved"
     MULTISEND_DONE = "multisend_done"
     CONTRACT_INTERACTED = "contract_interacted"
+    NO_ACTION = "no_action"
+    NO_TX = "no_tx"
 
 
 class SynchronizedData(BaseSynchronizedData):
@@ -70,10 +97,67 @@ class SynchronizedData(BaseSynchronizedData):
         serialized = self.db.get_strict(key)
         return CollectionRound.deserialize_collection(serialized)
 
+    @property
+    def prices(self) -> Optional[Tuple[float, ...]]:
+        """Get the price vector, indexed as `price_token_ids`, with NaN for the prices which could not be fetched."""
+        prices = self.db.get("prices", None)
+        if prices is None:
+            return None
+        return decode_prices(prices)
+
     @property
     def price(self) -> Optional[float]:
-        """Get the token price."""
-        return self.db.get("price", None)
+        """Get the price of the first token."""
+        prices = self.prices
+        if not prices or math.isnan(prices[0]):
+            return None
+        return prices[0]
+
+    @property
+    def price_timestamp(self) -> Optional[float]:
+        """Get the timestamp at which the token price was observed."""
+        return self.db.get("price_timestamp", None)
+
+    @property
+    def price_history(self) -> List[Tuple[float, Tuple[float, ...]]]:
+        """Get the agreed prices which were observed anew, oldest first, with the timestamp of their observation."""
+        return [
+            (timestamp, decode_prices(prices))
+            for timestamp, prices in self.db.get("price_history", None) or []
+        ]
+
+    @property
+    def price_variance(self) -> Optional[float]:
+        """Get the exponentially weighted moving average of the squared log returns of the agreed prices."""
+        return self.db.get("price_variance", None)
+
+    @property
+    def price_volatility(self) -> Optional[float]:
+        """Get the volatility of the agreed prices per period."""
+        variance = self.price_variance
+        if variance is None:
+            return None
+        return math.sqrt(variance)
+
+    @property
+    def round_timeout(self) -> Optional[float]:
+        """Get the agreed timeout of the rounds of the VotingAbciApp."""
+        return self.db.get("round_timeout", None)
+
+    @property
+    def period_started_at(self) -> Optional[float]:
+        """Get the consensus timestamp at which the prices of the current period started being agreed."""
+        return self.db.get("period_started_at", None)
+
+    def get_price_keeper(self, period_count: int) -> str:
+        """Get the agent which queries the price sources for the others in the given period, if enabled."""
+        participants = sorted(self.participants)
+        return participants[period_count % len(participants)]
+
+    @property
+    def price_keeper(self) -> str:
+        """Get the agent which queries the price sources for the others in the current period, if enabled."""
+        return self.get_price_keeper(self.period_count)
 
     @property
     def participant_to_price_round(self) -> DeserializedCollection:
@@ -85,6 +169,11 @@ class SynchronizedData(BaseSynchronizedData):
         """Get the token most_voted_tx_hash."""
         return self.db.get("most_voted_tx_hash", None)
 
+    @property
+    def tx_safe_nonce(self) -> Optional[int]:
+        """Get the Safe nonce of the agreed transaction."""
+        return self.db.get("tx_safe_nonce", None)
+
     @property
     def participant_to_tx_round(self) -> DeserializedCollection:
         """Get the participants to the tx round."""
@@ -95,23 +184,173 @@ class SynchronizedData(BaseSynchronizedData):
         """Get the round that submitted a tx to transaction_settlement_abci."""
         return str(self.db.get_strict("tx_submitter"))
 
+    @property
+    def participant_to_ipfs_round(self) -> DeserializedCollection:
+        """Get the participants to the IPFS rounds."""
+        return self._get_deserialized("participant_to_ipfs_round")
+
     @property
     def ipfs_hash(self) -> Optional[str]:
         """Get the IPFS hash."""
         return self.db.get("ipfs_hash", None)
 
+    @property
+    def stored_ipfs_hash(self) -> Optional[str]:
+        """Get the CID of the batch of reports stored in the current period, which is yet to be retrieved."""
+        return self.db.get("stored_ipfs_hash", None)
+
     @property
     def multisend_tx_hash(self) -> Optional[str]:
         """Get the multisend transaction hash."""
         return self.db.get("multisend_tx_hash", None)
 
     @property
-    def contract_interaction_result(self) -> Optional[str]:
-        """Get the contract interaction result."""
-        return self.db.get("contract_interaction_result", None)
+    def participant_to_multisend_round(self) -> DeserializedCollection:
+        """Get the participants to the multisend round."""
+        return self._get_deserialized("participant_to_multisend_round")
+
+    @property
+    def multisend_transactions(self) -> List[Dict[str, Any]]:
+        """Get the transfers batched in the agreed multisend transaction."""
+        return self.db.get("multisend_transactions", None) or []
+
+    @property
+    def multisend_queue(self) -> List[Dict[str, Any]]:
+        """Get the transfers waiting to be batched in a multisend transaction, oldest first."""
+        return self.db.get("multisend_queue", None) or []
+
+    @property
+    def pending_reports(self) -> List[Dict[str, Any]]:
+        """Get the period reports waiting to be stored on IPFS in a batch, oldest first."""
+        return self.db.get("pending_reports", None) or []
+
+
+def nan_median(values: Iterable[float]) -> float:
+    """Get the median of the values which are not NaN, or NaN if there are none."""
+    present = [value for value in values if not math.isnan(value)]
+    if not present:
+        return math.nan
+    return statistics.median(present)
+
+
+class CollectMedianUntilThresholdRound(CollectionRound, ABC):
+    """
+    CollectMedianUntilThresholdRound
+
+    This class represents logic for rounds where a round needs to collect
+    vectors of numeric values from k of n agents, which are not necessarily identical,
+    e.g., prices observed at slightly different moments.
+
+    The medians are taken element-wise, and NaN elements, i.e., values which an agent
+    could not observe, are ignored.
+
+    `done_event` is emitted when k of the collected vectors are within `tolerance`
+    of the median vector on every element, relative to the median. In this case all payloads
+    are saved under `collection_key` and the median of the vectors within tolerance
+    is saved under `selection_key`.
+
+    `no_majority_event` is emitted when all the agents have sent their values,
+    and less than k of them are within tolerance.
+    """
+
+    done_event: Any
+    no_majority_event: Any
+    collection_key: str
+    selection_key: str
+    payload_attribute: str
+
+    @property
+    def tolerance(self) -> float:
+        """Get the maximum relative distance of a value from the median."""
+        return 0.0
+
+    def decode_value(self, value: Any) -> Sequence[float]:
+        """Decode the value of a payload into a vector."""
+        return tuple(value)
+
+    def encode_value(self, vector: Sequence[float]) -> Any:
+        """Encode a vector into the value to store."""
+        return list(vector)
+
+    def check_payload(self, payload: BaseTxPayload) -> None:
+        """Check that the value of the payload can be decoded."""
+        super().check_payload(payload)
+        value = getattr(payload, self.payload_attribute)
+        if value is None:
+            return
+        try:
+            self.decode_value(value)
+        except (TypeError, ValueError) as e:
+            raise TransactionNotValidError(
+                f"Invalid {self.payload_attribute} {value!r} from sender {payload.sender}: {e}"
+            ) from e
+
+    @property
+    def values(self) -> Dict[str, Sequence[float]]:
+        """Get the decoded vectors of the collected payloads which are not entirely empty, keyed by sender."""
+        values = {}
+        for sender, payload in self.collection.items():
+            value = getattr(payload, self.payload_attribute)
+            if value is None:
+                continue
+            vector = self.decode_value(value)
+            if all(math.isnan(element) for element in vector):
+                continue
+            values[sender] = vector
+        return values
+
+    @property
+    def senders_within_tolerance(self) -> List[str]:
+        """Get the senders of the vectors which are within tolerance of the median on every element."""
+        values = self.values
+        if len(values) == 0:
+            return []
+        medians = [nan_median(column) for column in zip(*values.values())]
+        return [
+            sender
+            for sender, vector in values.items()
+            if all(
+                math.isnan(value)
+                or math.isnan(median)
+                or abs(value - median) <= self.tolerance * abs(median)
+                for value, median in zip(vector, medians)
+            )
+        ]
+
+    def get_selection(self, senders: List[str]) -> Dict[str, Any]:
+        """Get the data to store for the vectors of the given senders."""
+        values = self.values
+        medians = [
+            nan_median(column)
+            for column in zip(*(values[sender] for sender in senders))
+        ]
+        return {self.selection_key: self.encode_value(medians)}
+
+    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
+        """Process the end of the block."""
+        threshold = self.synchronized_data.consensus_threshold
+        if len(self.collection) < threshold:
+            return None
+
+        senders = self.senders_within_tolerance
+        if len(senders) >= threshold:
+            synchronized_data = self.synchronized_data.update(
+                synchronized_data_class=self.synchronized_data_class,
+                **{
+                    self.collection_key: self.serialized_collection,
+                    **self.get_selection(senders),
+                },
+            )
+            return synchronized_data, self.done_event
+
+        if len(self.collection) == self.synchronized_data.nb_participants:
+            return self.synchronized_data, self.no_majority_event
+
+        # the values are too far apart, but the remaining agents may still bring the majority within tolerance
+        return None
 
 
-class APICheckRound(CollectSameUntilThresholdRound):
+class APICheckRound(CollectMedianUntilThresholdRound):
     """APICheckRound"""
 
     payload_class = APICheckPayload
@@ -119,9 +358,192 @@ class APICheckRound(CollectSameUntilThresholdRound):
     done_event = Event.DONE
     no_majority_event = Event.NO_MAJORITY
     collection_key = get_name(SynchronizedData.participant_to_price_round)
-    selection_key = get_name(SynchronizedData.price)
+    selection_key = get_name(SynchronizedData.prices)
+    payload_attribute = "prices"
 
-    # Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
+    @property
+    def tolerance(self) -> float:
+        """Get the maximum relative distance of a price from the median."""
+        return self.context.params.price_tolerance
+
+    def decode_value(self, value: Any) -> Sequence[float]:
+        """Decode a price vector, which must have one price per configured token."""
+        prices = decode_prices(value)
+        n_tokens = len(self.context.params.price_token_ids)
+        if len(prices) != n_tokens:
+            raise PayloadDecodingError(
+                f"Expected {n_tokens} prices, got {len(prices)}."
+            )
+        return prices
+
+    def encode_value(self, vector: Sequence[float]) -> Any:
+        """Encode the agreed price vector."""
+        return encode_prices(vector)
+
+    def check_payload(self, payload: BaseTxPayload) -> None:
+        """Check the voted event, and that raw responses are only published by the keeper, with a valid signature."""
+        super().check_payload(payload)
+        payload = cast(APICheckPayload, payload)
+        if payload.event is not None and payload.event not in DECISION_EVENTS:
+            raise TransactionNotValidError(
+                f"{payload.event!r} is not a decision event."
+            )
+        if payload.raw_response is None:
+            return
+        if payload.sender != self.synchronized_data.price_keeper:
+            raise TransactionNotValidError(
+                f"{payload.sender} is not the price keeper of this period."
+            )
+        if not is_attested_by(
+            payload.raw_response,
+            payload.raw_response_signature,
+            payload.sender,
+            self.context.default_ledger_id,
+        ):
+            raise TransactionNotValidError(
+                f"Invalid signature of the raw response from {payload.sender}."
+            )
+
+    def get_selection(self, senders: List[str]) -> Dict[str, Any]:
+        """Get the median prices, and the timestamp of the oldest observation."""
+        selection = super().get_selection(senders)
+        timestamps = [
+            cast(APICheckPayload, self.collection[sender]).price_timestamp
+            for sender in senders
+        ]
+        timestamp = min(
+            (timestamp for timestamp in timestamps if timestamp is not None),
+            default=None,
+        )
+        prices = decode_prices(selection[self.selection_key])
+        round_sequence = self.context.state.round_sequence
+        selection[get_name(SynchronizedData.price_timestamp)] = timestamp
+        selection[get_name(SynchronizedData.price_variance)] = self.get_price_variance(
+            prices, timestamp
+        )
+        selection[get_name(SynchronizedData.price_history)] = self.get_price_history(
+            selection[self.selection_key], timestamp
+        )
+        selection[get_name(SynchronizedData.period_started_at)] = (
+            round_sequence.last_round_transition_timestamp.timestamp()
+        )
+        selection[get_name(SynchronizedData.round_timeout)] = self.get_round_timeout(
+            senders
+        )
+        return selection
+
+    def get_round_timeout(self, senders: List[str]) -> Optional[float]:
+        """Get the median of the round timeouts proposed by the given senders, clamped to the configured bounds."""
+        proposals = [
+            cast(APICheckPayload, self.collection[sender]).round_timeout
+            for sender in senders
+        ]
+        proposals = [proposal for proposal in proposals if proposal is not None]
+        if not proposals:
+            return self.synchronized_data.round_timeout
+        params = self.context.params
+        return min(
+            max(statistics.median(proposals), params.min_round_timeout),
+            params.max_round_timeout,
+        )
+
+    def get_price_variance(
+        self, prices: Sequence[float], timestamp: Optional[float]
+    ) -> Optional[float]:
+        """
+        Update the moving average of the squared log returns with the agreed prices.
+
+        The returns are averaged over the tokens, and the average is only updated when the prices were observed
+        anew, since the prices reused from a previous period carry no information on the volatility.
+
+        :param prices: the agreed prices.
+        :param timestamp: the timestamp at which the agreed prices were observed.
+        :return: the updated moving average, or None if it cannot be computed yet
+        """
+        variance = self.synchronized_data.price_variance
+        previous = self.synchronized_data.prices
+        if (
+            previous is None
+            or len(previous) != len(prices)
+            or timestamp == self.synchronized_data.price_timestamp
+        ):
+            return variance
+
+        squared_returns = [
+            math.log(price / previous_price) ** 2
+            for price, previous_price in zip(prices, previous)
+            if price > 0 and previous_price > 0
+        ]
+        if not squared_returns:
+            return variance
+
+        observed = statistics.fmean(squared_returns)
+        if variance is None:
+            return observed
+        decay = self.context.params.volatility_decay
+        return decay * variance + (1 - decay) * observed
+
+    def get_price_history(
+        self, prices: str, timestamp: Optional[float]
+    ) -> List[List[Any]]:
+        """
+        Append the agreed prices to the agreed price history, if they were observed anew.
+
+        The prices reused from a previous period are already in the history, so the history only grows when
+        the timestamp of the observation advances, and keeps the latest `price_history_size` observations.
+
+        :param prices: the encoded agreed prices.
+        :param timestamp: the timestamp at which the agreed prices were observed.
+        :return: the agreed price history, as the timestamp and the encoded prices of each observation
+        """
+        history = self.synchronized_data.db.get("price_history", None) or []
+        if timestamp is None or (history and timestamp <= history[-1][0]):
+            return history
+        history.append([timestamp, prices])
+        return history[-self.context.params.price_history_size :]
+
+    def get_decision(self, senders: List[str]) -> Optional[Event]:
+        """
+        Get the event voted by at least the threshold of the given senders.
+
+        The decision `done` of the rules is mapped to `no_action`, since `done` moves on to the `DecisionMakingRound`.
+
+        :param senders: the senders whose prices were agreed.
+        :return: the agreed event, or None if the senders did not agree on one
+        """
+        votes = Counter(
+            cast(APICheckPayload, self.collection[sender]).event for sender in senders
+        )
+        votes.pop(None, None)
+        if not votes:
+            return None
+        event, count = votes.most_common(1)[0]
+        if count < self.synchronized_data.consensus_threshold:
+            return None
+        return Event.NO_ACTION if event == Event.DONE.value else Event(event)
+
+    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
+        """
+        Process the end of the block.
+
+        If `decide_in_price_round` is enabled, and the agents which agreed on the prices also agreed on an event,
+        the round transitions directly on that event, skipping the `DecisionMakingRound`.
+
+        :return: the synchronized data and the event, or None if the round has not ended yet
+        """
+        result = super().end_block()
+        if result is None or result[1] != self.done_event:
+            return result
+
+        synchronized_data, event = result
+        if self.context.params.decide_in_price_round:
+            decision = self.get_decision(self.senders_within_tolerance)
+            if decision is not None:
+                event = decision
+        return synchronized_data, event
+
+    # Event.NO_ACTION, Event.ERROR, Event.TRANSACT, Event.IPFS_STORED, Event.MULTISEND_DONE,
+    # Event.CONTRACT_INTERACTED, Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
 
 class DecisionMakingRound(CollectSameUntilThresholdRound):
@@ -144,7 +566,7 @@ class DecisionMakingRound(CollectSameUntilThresholdRound):
 
         return None
 
-    # Event.DONE, Event.ERROR, Event.TRANSACT, Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
+    # Event.DONE, Event.ERROR, Event.TRANSACT, Event.CONTRACT_INTERACTED, Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
 
 class TxPreparationRound(CollectSameUntilThresholdRound):
@@ -153,60 +575,208 @@ class TxPreparationRound(CollectSameUntilThresholdRound):
     payload_class = TxPreparationPayload
     synchronized_data_class = SynchronizedData
     done_event = Event.DONE
+    none_event = Event.NO_TX
     no_majority_event = Event.NO_MAJORITY
     collection_key = get_name(SynchronizedData.participant_to_tx_round)
     selection_key = (
         get_name(SynchronizedData.tx_submitter),
         get_name(SynchronizedData.most_voted_tx_hash),
+        get_name(SynchronizedData.tx_safe_nonce),
     )
 
     # Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
 
 class IPFSStoreRound(CollectSameUntilThresholdRound):
-    """Round to store data in IPFS"""
+    """
+    Round to agree on the CID of the data stored in IPFS, which the agents compute locally
+
+    The agents agree on the period reports waiting to be stored in a batch, and, when the batch is due,
+    on the CID of the directory which links them, which is then retrieved. The reports are kept pending,
+    and the CID of the previous batch is kept, until the new batch has been retrieved.
+    """
 
     payload_class = IPFSPayload
     synchronized_data_class = SynchronizedData
     done_event = Event.IPFS_STORED
     no_majority_event = Event.NO_MAJORITY
-    collection_key = get_name(SynchronizedData.ipfs_hash)
+    collection_key = get_name(SynchronizedData.participant_to_ipfs_round)
+    selection_key = (
+        get_name(SynchronizedData.stored_ipfs_hash),
+        get_name(SynchronizedData.pending_reports),
+    )
+
+    def check_payload(self, payload: BaseTxPayload) -> None:
+        """Check that the pending reports of the payload can be decoded."""
+        super().check_payload(payload)
+        reports = cast(IPFSPayload, payload).reports
+        if reports is None:
+            return
+        try:
+            decode_reports(reports)
+        except PayloadDecodingError as e:
+            raise TransactionNotValidError(str(e)) from e
+
+    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
+        """
+        Process the end of the block.
+
+        The agreed pending reports are persisted across the periods. If the batch was not due, there is
+        nothing to retrieve.
+
+        :return: the synchronized data and the event, or None if the round has not ended yet
+        """
+        result = super().end_block()
+        if result is None or result[1] != self.done_event:
+            return result
+
+        synchronized_data = cast(SynchronizedData, result[0])
+        reports = synchronized_data.db.get(
+            get_name(SynchronizedData.pending_reports), None
+        )
+        synchronized_data = cast(
+            SynchronizedData,
+            synchronized_data.update(
+                synchronized_data_class=self.synchronized_data_class,
+                **{
+                    get_name(SynchronizedData.pending_reports): (
+                        [] if reports is None else decode_reports(reports)
+                    ),
+                },
+            ),
+        )
+        if synchronized_data.stored_ipfs_hash is None:
+            return synchronized_data, Event.NO_ACTION
+        return synchronized_data, self.done_event
 
     # Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
 
 class IPFSRetrieveRound(CollectSameUntilThresholdRound):
-    """Round to retrieve data from IPFS"""
+    """
+    Round to retrieve data from IPFS
+
+    The agents vote on the CID of the stored batch which they retrieved, or on None if there was none to retrieve
+    or it could not be retrieved. Once the batch has been retrieved, it replaces the agreed CID, and the reports
+    which it links are no longer pending.
+    """
 
     payload_class = IPFSPayload
     synchronized_data_class = SynchronizedData
     done_event = Event.IPFS_RETRIEVED
+    none_event = Event.NO_ACTION
     no_majority_event = Event.NO_MAJORITY
-    collection_key = get_name(SynchronizedData.ipfs_hash)
+    collection_key = get_name(SynchronizedData.participant_to_ipfs_round)
+    selection_key = get_name(SynchronizedData.ipfs_hash)
+
+    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
+        """Process the end of the block, and clear the pending reports once their batch has been retrieved."""
+        result = super().end_block()
+        if result is None or result[1] != self.done_event:
+            return result
+
+        synchronized_data = result[0].update(
+            synchronized_data_class=self.synchronized_data_class,
+            **{get_name(SynchronizedData.pending_reports): []},
+        )
+        return synchronized_data, self.done_event
 
     # Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
 
 class MultisendTxRound(CollectSameUntilThresholdRound):
-    """Round for preparing and executing multisend transactions"""
+    """
+    Round for preparing and executing multisend transactions
+
+    The agents agree on the queue of the transfers waiting to be batched, and, when the queue is flushed,
+    on the multisend transaction settling the oldest of them.
+    """
 
     payload_class = MultisendTxPayload
     synchronized_data_class = SynchronizedData
     done_event = Event.MULTISEND_DONE
     no_majority_event = Event.NO_MAJORITY
-    collection_key = get_name(SynchronizedData.multisend_tx_hash)
+    collection_key = get_name(SynchronizedData.participant_to_multisend_round)
+    selection_key = (
+        get_name(SynchronizedData.tx_submitter),
+        get_name(SynchronizedData.multisend_tx_hash),
+        get_name(SynchronizedData.multisend_transactions),
+        get_name(SynchronizedData.multisend_queue),
+        get_name(SynchronizedData.tx_safe_nonce),
+    )
+
+    def check_payload(self, payload: BaseTxPayload) -> None:
+        """Check that the transfers of the payload can be decoded."""
+        super().check_payload(payload)
+        payload = cast(MultisendTxPayload, payload)
+        for transfers in (payload.transactions, payload.queue):
+            if transfers is None:
+                continue
+            try:
+                decode_transfers(transfers)
+            except PayloadDecodingError as e:
+                raise TransactionNotValidError(str(e)) from e
+
+    def end_block(self) -> Optional[Tuple[BaseSynchronizedData, Enum]]:
+        """
+        Process the end of the block.
+
+        The agreed queue is persisted across the periods. If the queue was not flushed, there is nothing to settle,
+        otherwise the multisend transaction is handed over to the transaction settlement.
+
+        :return: the synchronized data and the event, or None if the round has not ended yet
+        """
+        result = super().end_block()
+        if result is None or result[1] != self.done_event:
+            return result
+
+        synchronized_data = cast(SynchronizedData, result[0])
+        db = synchronized_data.db
+        transactions = db.get(get_name(SynchronizedData.multisend_transactions), None)
+        queue = db.get(get_name(SynchronizedData.multisend_queue), None)
+        synchronized_data = cast(
+            SynchronizedData,
+            synchronized_data.update(
+                synchronized_data_class=self.synchronized_data_class,
+                **{
+                    get_name(SynchronizedData.multisend_transactions): (
+                        None if transactions is None else decode_transfers(transactions)
+                    ),
+                    get_name(SynchronizedData.multisend_queue): (
+                        [] if queue is None else decode_transfers(queue)
+                    ),
+                    get_name(
+                        SynchronizedData.most_voted_tx_hash
+                    ): synchronized_data.multisend_tx_hash,
+                },
+            ),
+        )
+        if synchronized_data.multisend_tx_hash is None:
+            return synchronized_data, Event.NO_TX
+        return synchronized_data, self.done_event
 
     # Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
 
 class CustomContractRound(CollectSameUntilThresholdRound):
-    """Round for interacting with a custom contract"""
+    """
+    Round for interacting with a custom contract
+
+    The agents agree on the Safe transaction calling `custom_contract_address` with `custom_contract_data`,
+    which is then settled, or on None if no custom contract is configured.
+    """
 
     payload_class = CustomContractPayload
     synchronized_data_class = SynchronizedData
     done_event = Event.CONTRACT_INTERACTED
+    none_event = Event.NO_TX
     no_majority_event = Event.NO_MAJORITY
-    collection_key = get_name(SynchronizedData.contract_interaction_result)
+    collection_key = get_name(SynchronizedData.participant_to_tx_round)
+    selection_key = (
+        get_name(SynchronizedData.tx_submitter),
+        get_name(SynchronizedData.most_voted_tx_hash),
+        get_name(SynchronizedData.tx_safe_nonce),
+    )
 
     # Event.ROUND_TIMEOUT  # this needs to be referenced for static checkers
 
@@ -219,6 +789,10 @@ class FinishedTxPreparationRound(DegenerateRound):
     """FinishedTxPreparationRound"""
 
 
+class FinishedWithoutTxRound(DegenerateRound):
+    """FinishedWithoutTxRound"""
+
+
 class FinishedIPFSRound(DegenerateRound):
     """FinishedIPFSRound"""
 
@@ -243,6 +817,12 @@ class VotingAbciApp(AbciApp[Event]):
             Event.NO_MAJORITY: APICheckRound,
             Event.ROUND_TIMEOUT: APICheckRound,
             Event.DONE: DecisionMakingRound,
+            Event.NO_ACTION: FinishedDecisionMakingRound,
+            Event.ERROR: FinishedDecisionMakingRound,
+            Event.TRANSACT: TxPreparationRound,
+            Event.IPFS_STORED: IPFSStoreRound,
+            Event.MULTISEND_DONE: MultisendTxRound,
+            Event.CONTRACT_INTERACTED: CustomContractRound,
         },
         DecisionMakingRound: {
             Event.NO_MAJORITY: DecisionMakingRound,
@@ -250,7 +830,7 @@ class VotingAbciApp(AbciApp[Event]):
             Event.DONE: FinishedDecisionMakingRound,
             Event.ERROR: FinishedDecisionMakingRound,
             Event.TRANSACT: TxPreparationRound,
-            Event.IPFS_STORED: IPFSRetrieveRound,
+            Event.IPFS_STORED: IPFSStoreRound,
             Event.MULTISEND_DONE: MultisendTxRound,
             Event.CONTRACT_INTERACTED: CustomContractRound,
         },
@@ -258,29 +838,35 @@ class VotingAbciApp(AbciApp[Event]):
             Event.NO_MAJORITY: TxPreparationRound,
             Event.ROUND_TIMEOUT: TxPreparationRound,
             Event.DONE: FinishedTxPreparationRound,
+            Event.NO_TX: FinishedWithoutTxRound,
         },
         IPFSStoreRound: {
             Event.NO_MAJORITY: IPFSStoreRound,
             Event.ROUND_TIMEOUT: IPFSStoreRound,
-            Event.IPFS_STORED: FinishedIPFSRound,
+            Event.IPFS_STORED: IPFSRetrieveRound,
+            Event.NO_ACTION: FinishedIPFSRound,
         },
         IPFSRetrieveRound: {
             Event.NO_MAJORITY: IPFSRetrieveRound,
             Event.ROUND_TIMEOUT: IPFSRetrieveRound,
             Event.IPFS_RETRIEVED: FinishedIPFSRound,
+            Event.NO_ACTION: FinishedIPFSRound,
         },
         MultisendTxRound: {
             Event.NO_MAJORITY: MultisendTxRound,
             Event.ROUND_TIMEOUT: MultisendTxRound,
             Event.MULTISEND_DONE: FinishedMultisendRound,
+            Event.NO_TX: FinishedWithoutTxRound,
         },
         CustomContractRound: {
             Event.NO_MAJORITY: CustomContractRound,
             Event.ROUND_TIMEOUT: CustomContractRound,
             Event.CONTRACT_INTERACTED: FinishedContractInteractionRound,
+            Event.NO_TX: FinishedWithoutTxRound,
         },
         FinishedDecisionMakingRound: {},
         FinishedTxPreparationRound: {},
+        FinishedWithoutTxRound: {},
         FinishedIPFSRound: {},
         FinishedMultisendRound: {},
         FinishedContractInteractionRound: {},
@@ -288,19 +874,44 @@ class VotingAbciApp(AbciApp[Event]):
     final_states: Set[AppState] = {
         FinishedDecisionMakingRound,
         FinishedTxPreparationRound,
+        FinishedWithoutTxRound,
         FinishedIPFSRound,
         FinishedMultisendRound,
         FinishedContractInteractionRound,
     }
     event_to_timeout: EventToTimeout = {}
-    cross_period_persisted_keys: FrozenSet[str] = frozenset()
+    cross_period_persisted_keys: FrozenSet[str] = frozenset(
+        {
+            get_name(SynchronizedData.prices),
+            get_name(SynchronizedData.price_timestamp),
+            get_name(SynchronizedData.price_variance),
+            get_name(SynchronizedData.price_history),
+            get_name(SynchronizedData.round_timeout),
+            get_name(SynchronizedData.multisend_queue),
+            get_name(SynchronizedData.pending_reports),
+            get_name(SynchronizedData.ipfs_hash),
+        }
+    )
     db_pre_conditions: Dict[AppState, Set[str]] = {
         APICheckRound: set(),
     }
     db_post_conditions: Dict[AppState, Set[str]] = {
         FinishedDecisionMakingRound: set(),
         FinishedTxPreparationRound: {get_name(SynchronizedData.most_voted_tx_hash)},
+        FinishedWithoutTxRound: set(),
         FinishedIPFSRound: {get_name(SynchronizedData.ipfs_hash)},
-        FinishedMultisendRound: {get_name(SynchronizedData.multisend_tx_hash)},
-        FinishedContractInteractionRound: {get_name(SynchronizedData.contract_interaction_result)},
+        FinishedMultisendRound: {
+            get_name(SynchronizedData.multisend_tx_hash),
+            get_name(SynchronizedData.most_voted_tx_hash),
+        },
+        FinishedContractInteractionRound: {
+            get_name(SynchronizedData.most_voted_tx_hash)
+        },
     }
+
+
+DECISION_EVENTS: FrozenSet[str] = frozenset(
+    event.value
+    for event in VotingAbciApp.transition_function[DecisionMakingRound]
+    if event not in (Event.NO_MAJORITY, Event.ROUND_TIMEOUT)
+)
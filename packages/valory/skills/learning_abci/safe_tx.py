@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Local computation of the EIP-712 hashes of the Safe transactions."""
+
+from eth_abi import encode
+from eth_utils import keccak
+
+from packages.valory.contracts.gnosis_safe.contract import SafeOperation
+
+
+NULL_ADDRESS = "0x" + "0" * 40
+
+# EIP712Domain(uint256 chainId,address verifyingContract), as used by the Safes >= 1.3.0
+DOMAIN_SEPARATOR_TYPEHASH = keccak(
+    text="EIP712Domain(uint256 chainId,address verifyingContract)"
+)
+SAFE_TX_TYPEHASH = keccak(
+    text="SafeTx(address to,uint256 value,bytes data,uint8 operation,uint256 safeTxGas,uint256 baseGas,"
+    "uint256 gasPrice,address gasToken,address refundReceiver,uint256 nonce)"
+)
+
+
+def get_domain_separator(chain_id: int, safe_address: str) -> bytes:
+    """
+    Get the EIP-712 domain separator of a Safe.
+
+    It only depends on the chain and on the address of the Safe, so it can be computed once and cached.
+
+    :param chain_id: the id of the chain the Safe is deployed on.
+    :param safe_address: the address of the Safe.
+    :return: the domain separator
+    """
+    return keccak(
+        encode(
+            ["bytes32", "uint256", "address"],
+            [DOMAIN_SEPARATOR_TYPEHASH, chain_id, safe_address],
+        )
+    )
+
+
+def get_safe_tx_hash(  # pylint: disable=too-many-arguments
+    domain_separator: bytes,
+    to_address: str,
+    value: int,
+    data: bytes,
+    nonce: int,
+    operation: int = SafeOperation.CALL.value,
+    safe_tx_gas: int = 0,
+    base_gas: int = 0,
+    gas_price: int = 0,
+    gas_token: str = NULL_ADDRESS,
+    refund_receiver: str = NULL_ADDRESS,
+) -> str:
+    """
+    Get the EIP-712 hash of a Safe transaction, as `get_raw_safe_transaction_hash` of the Safe contract does.
+
+    :param domain_separator: the domain separator of the Safe.
+    :param to_address: the tx recipient address.
+    :param value: the ETH value of the transaction.
+    :param data: the data of the transaction.
+    :param nonce: the nonce of the Safe the transaction is executed with.
+    :param operation: the operation type of the Safe transaction.
+    :param safe_tx_gas: the gas that should be used for the Safe transaction.
+    :param base_gas: the gas costs which are independent of the transaction execution.
+    :param gas_price: the gas price that should be used for the payment calculation.
+    :param gas_token: the token used for the payment, or the null address for ETH.
+    :param refund_receiver: the receiver of the gas payment, or the null address for tx.origin.
+    :return: the hash, as a hex string without the `0x` prefix
+    """
+    struct_hash = keccak(
+        encode(
+            [
+                "bytes32",
+                "address",
+                "uint256",
+                "bytes32",
+                "uint8",
+                "uint256",
+                "uint256",
+                "uint256",
+                "address",
+                "address",
+                "uint256",
+            ],
+            [
+                SAFE_TX_TYPEHASH,
+                to_address,
+                value,
+                keccak(data),
+                operation,
+                safe_tx_gas,
+                base_gas,
+                gas_price,
+                gas_token,
+                refund_receiver,
+                nonce,
+            ],
+        )
+    )
+    return keccak(b"\x19\x01" + domain_separator + struct_hash).hex()
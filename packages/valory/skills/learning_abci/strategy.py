@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""
+This module contains the decision strategy of the VotingAbciApp.
+
+A strategy is an ordered list of rules, compiled once into numpy arrays, so that all the rules
+are evaluated over a whole price series with a handful of vectorized operations.
+The first rule which fires at a step decides the event of that step; if none fires, the default event is used.
+
+The supported rules are:
+- `threshold`: the price of `token` is `above` or `below` a level.
+- `crossover`: the moving average over the last `fast` steps crosses the one over the last `slow` steps,
+  `up` or `down`, at this step.
+- `band`: the price of `token` is outside of its moving average over the last `window` steps
+  by more than `width` moving standard deviations, on the given `side` (`above` or `below`).
+
+This module only depends on numpy, so that it can be shared with the offline tools, e.g., the backtester.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+THRESHOLD_RULE = "threshold"
+CROSSOVER_RULE = "crossover"
+BAND_RULE = "band"
+UP = "up"
+DOWN = "down"
+ABOVE = "above"
+BELOW = "below"
+
+
+class InvalidRuleError(ValueError):
+    """Error raised when a rule cannot be compiled."""
+
+
+@dataclass(frozen=True)
+class _RuleGroup:
+    """The compiled rules of a type, as arrays with one element per rule."""
+
+    rule_index: np.ndarray
+    token_index: np.ndarray
+    sign: np.ndarray
+    level: np.ndarray
+    window: np.ndarray
+    slow_window: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls, rows: List[Tuple[int, int, float, float, int, int]]
+    ) -> "_RuleGroup":
+        """Build a group from rows of (rule index, token index, sign, level, window, slow window)."""
+        columns = list(zip(*rows)) if rows else [()] * 6
+        return cls(
+            rule_index=np.array(columns[0], dtype=np.int64),
+            token_index=np.array(columns[1], dtype=np.int64),
+            sign=np.array(columns[2], dtype=np.float64),
+            level=np.array(columns[3], dtype=np.float64),
+            window=np.array(columns[4], dtype=np.int64),
+            slow_window=np.array(columns[5], dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        """Get the number of rules in the group."""
+        return len(self.rule_index)
+
+
+class RollingWindows:
+    """Moving averages and standard deviations over a price series, for any window, in O(1) per value."""
+
+    def __init__(self, prices: np.ndarray) -> None:
+        """
+        Precompute the cumulative sums of a price series.
+
+        The prices are shifted by their mean before being accumulated, to limit the loss of precision
+        of the variances over long series.
+
+        :param prices: the price series, of shape (steps, tokens), with NaN for the missing prices.
+        """
+        valid = ~np.isnan(prices)
+        n_valid = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self._shift = np.where(
+                n_valid > 0, np.where(valid, prices, 0.0).sum(axis=0) / n_valid, 0.0
+            )
+        shifted = np.where(valid, prices - self._shift, 0.0)
+        zeros = np.zeros((1, prices.shape[1]))
+        self._sum = np.concatenate([zeros, np.cumsum(shifted, axis=0)])
+        self._sum_sq = np.concatenate([zeros, np.cumsum(shifted**2, axis=0)])
+        self._count = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+        self.steps = prices.shape[0]
+
+    def _window_sums(
+        self, token_index: np.ndarray, window: np.ndarray, lag: int = 0
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get the sums, sums of squares and counts of the windows ending at each step minus `lag`."""
+        end = np.arange(self.steps)[:, None] + 1 - lag
+        start = end - window[None, :]
+        complete = start >= 0
+        end = np.clip(end, 0, None)
+        start = np.clip(start, 0, None)
+        sums = self._sum[end, token_index] - self._sum[start, token_index]
+        sums_sq = self._sum_sq[end, token_index] - self._sum_sq[start, token_index]
+        counts = self._count[end, token_index] - self._count[start, token_index]
+        counts = np.where(complete, counts, 0)
+        return sums, sums_sq, counts
+
+    def mean(
+        self, token_index: np.ndarray, window: np.ndarray, lag: int = 0
+    ) -> np.ndarray:
+        """Get the moving averages, of shape (steps, rules), NaN where the window is incomplete or empty."""
+        sums, _, counts = self._window_sums(token_index, window, lag)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return np.where(counts > 0, means + self._shift[token_index], np.nan)
+
+    def std(
+        self, token_index: np.ndarray, window: np.ndarray, lag: int = 0
+    ) -> np.ndarray:
+        """Get the moving (population) standard deviations, of shape (steps, rules)."""
+        sums, sums_sq, counts = self._window_sums(token_index, window, lag)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+            variances = np.maximum(sums_sq / counts - means**2, 0.0)
+        return np.where(counts > 0, np.sqrt(variances), np.nan)
+
+
+class Strategy:
+    """An ordered list of decision rules, compiled into numpy arrays."""
+
+    def __init__(
+        self,
+        rules: Sequence[Dict[str, Any]],
+        token_ids: Sequence[str],
+        default_event: str,
+        allowed_events: Optional[Collection[str]] = None,
+    ) -> None:
+        """
+        Compile the rules.
+
+        :param rules: the rules, in decreasing priority.
+        :param token_ids: the ids of the tokens, in the order of the columns of the price series.
+        :param default_event: the event to use when no rule fires.
+        :param allowed_events: the events which the rules may emit, if restricted.
+        """
+        self.token_ids = tuple(token_ids)
+        self.default_event = default_event
+        self.names: List[str] = []
+        self.events: List[str] = []
+        rows: Dict[str, List[Tuple[int, int, float, float, int, int]]] = {
+            THRESHOLD_RULE: [],
+            CROSSOVER_RULE: [],
+            BAND_RULE: [],
+        }
+        for rule_index, rule in enumerate(rules):
+            name = str(rule.get("name", f"rule_{rule_index}"))
+            event = rule.get("event")
+            if event is None or (
+                allowed_events is not None and event not in allowed_events
+            ):
+                raise InvalidRuleError(f"Rule {name!r} has an invalid event {event!r}.")
+            rule_type, row = self._compile_rule(rule_index, name, rule)
+            rows[rule_type].append(row)
+            self.names.append(name)
+            self.events.append(event)
+
+        self._thresholds = _RuleGroup.from_rows(rows[THRESHOLD_RULE])
+        self._crossovers = _RuleGroup.from_rows(rows[CROSSOVER_RULE])
+        self._bands = _RuleGroup.from_rows(rows[BAND_RULE])
+        # the default event is last, so that it is selected by the index -1
+        self._event_lookup = np.array([*self.events, default_event], dtype=object)
+        windows = [1, *self._crossovers.slow_window, *self._crossovers.window]
+        windows.extend(self._bands.window)
+        # the crossovers also look at the previous step
+        self.lookback = int(max(windows)) + 1
+
+    def _compile_rule(
+        self, rule_index: int, name: str, rule: Dict[str, Any]
+    ) -> Tuple[str, Tuple[int, int, float, float, int, int]]:
+        """Compile a rule into its type and its row of (rule index, token index, sign, level, window, slow window)."""
+        token = rule.get("token", self.token_ids[0] if self.token_ids else None)
+        if token not in self.token_ids:
+            raise InvalidRuleError(f"Rule {name!r} has an unknown token {token!r}.")
+        token_index = self.token_ids.index(token)
+        rule_type = rule.get("type")
+        window, slow_window, level = 1, 1, 0.0
+        try:
+            if rule_type == THRESHOLD_RULE:
+                sign = 1.0 if ABOVE in rule else -1.0
+                level = float(rule[ABOVE] if ABOVE in rule else rule[BELOW])
+            elif rule_type == CROSSOVER_RULE:
+                window, slow_window = int(rule["fast"]), int(rule["slow"])
+                sign = self._get_sign(name, rule.get("direction", UP), UP, DOWN)
+            elif rule_type == BAND_RULE:
+                window, level = int(rule["window"]), float(rule["width"])
+                sign = self._get_sign(name, rule.get("side", ABOVE), ABOVE, BELOW)
+            else:
+                raise InvalidRuleError(
+                    f"Rule {name!r} has an unknown type {rule_type!r}."
+                )
+        except InvalidRuleError:
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidRuleError(f"Rule {name!r} is invalid: {e!r}") from e
+
+        if rule_type == CROSSOVER_RULE and not 0 < window < slow_window:
+            raise InvalidRuleError(
+                f"Rule {name!r} needs 0 < fast < slow, got {window} and {slow_window}."
+            )
+        if rule_type == BAND_RULE and window < 2:
+            raise InvalidRuleError(
+                f"Rule {name!r} needs a window of at least 2, got {window}."
+            )
+        return rule_type, (rule_index, token_index, sign, level, window, slow_window)
+
+    @staticmethod
+    def _get_sign(name: str, value: str, positive: str, negative: str) -> float:
+        """Get the sign corresponding to a direction or a side of a rule."""
+        if value not in (positive, negative):
+            raise InvalidRuleError(
+                f"Rule {name!r} expects {positive!r} or {negative!r}, got {value!r}."
+            )
+        return 1.0 if value == positive else -1.0
+
+    def __len__(self) -> int:
+        """Get the number of rules."""
+        return len(self.events)
+
+    def evaluate(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Evaluate all the rules at every step of a price series.
+
+        :param prices: the price series, of shape (steps, tokens), with NaN for the missing prices.
+        :return: whether each rule fires at each step, of shape (steps, rules).
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        fired = np.zeros((prices.shape[0], len(self)), dtype=bool)
+        if len(self) == 0 or prices.shape[0] == 0:
+            return fired
+
+        group = self._thresholds
+        if len(group):
+            distance = prices[:, group.token_index] - group.level
+            fired[:, group.rule_index] = group.sign * distance > 0
+
+        windows = RollingWindows(prices)
+        group = self._crossovers
+        if len(group):
+            spread = windows.mean(group.token_index, group.window) - windows.mean(
+                group.token_index, group.slow_window
+            )
+            previous_spread = windows.mean(
+                group.token_index, group.window, lag=1
+            ) - windows.mean(group.token_index, group.slow_window, lag=1)
+            fired[:, group.rule_index] = (group.sign * spread > 0) & (
+                group.sign * previous_spread <= 0
+            )
+
+        group = self._bands
+        if len(group):
+            distance = prices[:, group.token_index] - windows.mean(
+                group.token_index, group.window
+            )
+            band = group.level * windows.std(group.token_index, group.window)
+            fired[:, group.rule_index] = group.sign * distance > band
+
+        return fired
+
+    def first_rules(
+        self, prices: np.ndarray, chunk_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Get the index of the first rule which fires at every step of a price series.
+
+        Long series can be evaluated in chunks, to bound the memory used by the intermediate arrays.
+        Each chunk is extended backwards by `lookback` steps, so that the result does not depend on the chunking.
+
+        :param prices: the price series, of shape (steps, tokens).
+        :param chunk_size: the number of steps to evaluate at once, all of them by default.
+        :return: the rule indices, of shape (steps,), with -1 where no rule fires.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        steps = prices.shape[0]
+        chunk_size = steps if chunk_size is None else max(chunk_size, 1)
+        first = np.full(steps, -1, dtype=np.int64)
+        if len(self) == 0:
+            return first
+
+        for start in range(0, steps, chunk_size):
+            end = min(start + chunk_size, steps)
+            context_start = max(start - self.lookback, 0)
+            fired = self.evaluate(prices[context_start:end])[start - context_start :]
+            first[start:end] = np.where(fired.any(axis=1), fired.argmax(axis=1), -1)
+        return first
+
+    def decide_series(
+        self, prices: np.ndarray, chunk_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Decide the event at every step of a price series.
+
+        :param prices: the price series, of shape (steps, tokens).
+        :param chunk_size: the number of steps to evaluate at once, all of them by default.
+        :return: the events, of shape (steps,).
+        """
+        return self._event_lookup[self.first_rules(prices, chunk_size)]
+
+    def decide(self, prices: np.ndarray) -> Tuple[str, Optional[str]]:
+        """
+        Decide the event at the last step of a price series.
+
+        Only the last `lookback` steps are evaluated, as the rules do not look further back.
+
+        :param prices: the price series, of shape (steps, tokens).
+        :return: the event, and the name of the rule which fired, if any.
+        """
+        prices = np.asarray(prices, dtype=np.float64)[-self.lookback :]
+        if len(self) == 0 or prices.shape[0] == 0:
+            return self.default_event, None
+        fired = self.evaluate(prices)[-1]
+        if not fired.any():
+            return self.default_event, None
+        first = int(fired.argmax())
+        return self.events[first], self.names[first]
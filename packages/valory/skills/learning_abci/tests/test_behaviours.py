@@ -0,0 +1,768 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's behaviours."""
+
+# pylint: skip-file
+
+import datetime
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, List, Optional, Type, cast
+from unittest import mock
+
+import pytest
+from aea.configurations.data_types import PublicId
+from aea.helpers.transaction.base import State
+
+from packages.valory.contracts.gnosis_safe.contract import GnosisSafeContract
+from packages.valory.protocols.contract_api import ContractApiMessage
+from packages.valory.protocols.ipfs import IpfsMessage
+from packages.valory.protocols.ledger_api import LedgerApiMessage
+from packages.valory.skills.abstract_round_abci.base import (
+    AbciAppDB,
+    BaseTxPayload,
+    RoundSequence,
+)
+from packages.valory.skills.abstract_round_abci.behaviour_utils import BaseBehaviour
+from packages.valory.skills.abstract_round_abci.test_tools.base import (
+    FSMBehaviourBaseCase,
+)
+from packages.valory.skills.learning_abci import PUBLIC_ID
+from packages.valory.skills.learning_abci.behaviours import (
+    APICheckBehaviour,
+    CustomContractBehaviour,
+    DecisionMakingBehaviour,
+    IPFSRetrieveBehaviour,
+    IPFSStorageBehaviour,
+    MultisendTxPreparationBehaviour,
+    PricePrefetchBehaviour,
+    TRANSFER_VALUE,
+    TxPreparationBehaviour,
+    VotingRoundBehaviour,
+)
+from packages.valory.skills.learning_abci.ipfs_tools import (
+    build_manifest,
+    get_directory_cid,
+    get_manifest_cid,
+)
+from packages.valory.skills.learning_abci.models import PriceObservation
+from packages.valory.skills.learning_abci.payload_tools import (
+    decode_prices,
+    decode_reports,
+    decode_transfers,
+    encode_prices,
+)
+from packages.valory.skills.learning_abci.payloads import (
+    APICheckPayload,
+    CustomContractPayload,
+    DecisionMakingPayload,
+    IPFSPayload,
+    MultisendTxPayload,
+    TxPreparationPayload,
+)
+from packages.valory.skills.learning_abci.reports import build_batch
+from packages.valory.skills.learning_abci.rounds import (
+    Event,
+    SynchronizedData,
+    VotingAbciApp,
+)
+
+
+PACKAGE_DIR = Path(__file__).parent.parent
+SAFE_ADDRESS = "0x5C5b146905c11Ee1fE7260c0338b52DCA9582a13"
+PRICE_URL = "https://api.coingecko.com/api/v3/simple/price?ids=autonolas&vs_currencies=usd&x_cg_demo_api_key="
+PERIOD_STARTED_AT = 1_700_000_000.0
+NOW = PERIOD_STARTED_AT + 10
+IPFS_CONNECTION_ID = PublicId.from_str("valory/ipfs:0.1.0")
+
+
+def run_generator(generator: Generator) -> Any:
+    """Run a generator to completion, and get its return value."""
+    try:
+        while True:
+            next(generator)
+    except StopIteration as e:
+        return e.value
+
+
+def test_skill_public_id() -> None:
+    """Test skill module public ID"""
+
+    assert PUBLIC_ID.name == Path(__file__).parents[1].name
+    assert PUBLIC_ID.author == Path(__file__).parents[3].name
+
+
+def test_round_behaviour() -> None:
+    """Test that the round behaviour matches a behaviour to each round of the app."""
+
+    assert VotingRoundBehaviour.abci_app_cls is VotingAbciApp
+    matched = {
+        behaviour.matching_round for behaviour in VotingRoundBehaviour.behaviours
+    }
+    assert matched == VotingAbciApp.get_all_rounds() - VotingAbciApp.final_states
+
+
+class LearningAbciFSMBehaviourBaseCase(FSMBehaviourBaseCase):
+    """Base case for testing the behaviours of the LearningAbci skill."""
+
+    path_to_skill = PACKAGE_DIR
+
+    def setup(self, **kwargs: Any) -> None:
+        """Set up the test method."""
+        super().setup(**kwargs)
+        self.payloads: List[BaseTxPayload] = []
+        self.skill.skill_context.state.price_observation = None
+        self.skill.skill_context.state.safe_nonce = None
+        self.timestamp_patcher = mock.patch.object(
+            RoundSequence,
+            "last_round_transition_timestamp",
+            new_callable=mock.PropertyMock,
+            return_value=datetime.datetime.fromtimestamp(NOW),
+        )
+        self.timestamp_patcher.start()
+
+    def teardown(self, **kwargs: Any) -> None:
+        """Tear down the test method."""
+        self.timestamp_patcher.stop()
+        super().teardown(**kwargs)
+
+    def fast_forward(
+        self, behaviour_cls: Type[BaseBehaviour], **data: Any
+    ) -> BaseBehaviour:
+        """Fast forward to a behaviour, with the given data in the db."""
+        agent_address = self.skill.skill_context.agent_address
+        setup_data = {
+            "all_participants": [agent_address],
+            "participants": [agent_address],
+            "consensus_threshold": 1,
+            "safe_contract_address": SAFE_ADDRESS,
+            "period_started_at": PERIOD_STARTED_AT,
+            **data,
+        }
+        self.fast_forward_to_behaviour(
+            self.behaviour,
+            behaviour_cls.auto_behaviour_id(),
+            SynchronizedData(AbciAppDB(setup_data=AbciAppDB.data_to_lists(setup_data))),
+        )
+        behaviour = cast(BaseBehaviour, self.behaviour.current_behaviour)
+        assert behaviour.behaviour_id == behaviour_cls.auto_behaviour_id()
+        return behaviour
+
+    @contextmanager
+    def record_payloads(self) -> Generator[None, None, None]:
+        """Record the payloads sent by the behaviours, instead of sending them to the other agents."""
+
+        def send_a2a_transaction(
+            _behaviour: BaseBehaviour, payload: BaseTxPayload, *_args: Any
+        ) -> Generator:
+            self.payloads.append(payload)
+            yield from ()
+
+        with mock.patch.object(
+            BaseBehaviour, "send_a2a_transaction", send_a2a_transaction
+        ):
+            yield
+
+    @contextmanager
+    def mock_round(
+        self, agreed: Optional[Callable[[Any], Dict[str, Any]]] = None
+    ) -> Generator[None, None, None]:
+        """
+        Record the payloads sent by the behaviours, and end their rounds immediately.
+
+        :param agreed: gets the data agreed in the round from the payload, which is written to the db when it ends.
+        :yield: None
+        """
+
+        def wait_until_round_end(behaviour: BaseBehaviour, *_args: Any) -> Generator:
+            if agreed is not None:
+                behaviour.synchronized_data.db.update(**agreed(self.payloads[-1]))
+            yield from ()
+
+        with self.record_payloads(), mock.patch.object(
+            BaseBehaviour, "wait_until_round_end", wait_until_round_end
+        ):
+            yield
+
+    def mock_ipfs_request(self, request_kwargs: Dict, response_kwargs: Dict) -> None:
+        """Mock a request to the IPFS connection."""
+        self.assert_quantity_in_outbox(1)
+        actual_ipfs_message = self.get_message_from_outbox()
+        assert actual_ipfs_message is not None, "No message in outbox."
+        has_attributes, error_str = self.message_has_attributes(
+            actual_message=actual_ipfs_message,
+            message_type=IpfsMessage,
+            to=str(IPFS_CONNECTION_ID),
+            sender=str(self.skill.skill_context.skill_id),
+            **request_kwargs,
+        )
+        assert has_attributes, error_str
+        incoming_message = self.build_incoming_message(
+            message_type=IpfsMessage,
+            dialogue_reference=(actual_ipfs_message.dialogue_reference[0], "stub"),
+            target=actual_ipfs_message.message_id,
+            message_id=-1,
+            to=str(self.skill.skill_context.skill_id),
+            sender=str(IPFS_CONNECTION_ID),
+            **response_kwargs,
+        )
+        self.skill.skill_context.handlers.ipfs.handle(incoming_message)
+        self.behaviour.act_wrapper()
+
+    def mock_fee_history_error(self) -> None:
+        """Mock a failed request for the fee history."""
+        self.mock_ledger_api_request(
+            request_kwargs=dict(performative=LedgerApiMessage.Performative.GET_STATE),
+            response_kwargs=dict(
+                performative=LedgerApiMessage.Performative.ERROR,
+                code=1,
+                message="unavailable",
+                data=b"",
+            ),
+        )
+
+    def mock_safe_nonce(self, nonce: Optional[int]) -> None:
+        """Mock the request for the nonce of the Safe, which fails if no nonce is given."""
+        response_kwargs: Dict[str, Any] = (
+            dict(
+                performative=ContractApiMessage.Performative.ERROR,
+                code=1,
+                message="unavailable",
+                data=b"",
+            )
+            if nonce is None
+            else dict(
+                performative=ContractApiMessage.Performative.STATE,
+                state=State(ledger_id="ethereum", body={"safe_nonce": nonce}),
+            )
+        )
+        self.mock_contract_api_request(
+            contract_id=str(GnosisSafeContract.contract_id),
+            request_kwargs=dict(
+                performative=ContractApiMessage.Performative.GET_STATE,
+                contract_address=SAFE_ADDRESS,
+            ),
+            response_kwargs=response_kwargs,
+        )
+
+    @contextmanager
+    def override_params(self, **params: Any) -> Generator[None, None, None]:
+        """Override some params for the duration of a test."""
+        params_dict = self.skill.skill_context.params.__dict__
+        original = {name: params_dict[name] for name in params}
+        params_dict.update(params)
+        try:
+            yield
+        finally:
+            params_dict.update(original)
+
+
+class TestAPICheckBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the APICheckBehaviour."""
+
+    def test_reuses_fresh_prices(self) -> None:
+        """The prices agreed in a previous period are reused while they are fresh."""
+        behaviour = self.fast_forward(
+            APICheckBehaviour, prices=encode_prices([1.5]), price_timestamp=NOW - 1
+        )
+        with self.override_params(price_max_age=60.0), self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        payload = cast(APICheckPayload, self.payloads[0])
+        assert decode_prices(cast(str, payload.prices)) == (1.5,)
+        assert payload.price_timestamp == NOW - 1
+        self.assert_quantity_in_outbox(0)
+
+    def test_queries_price_sources(self) -> None:
+        """The prices are queried from the sources, and stamped with the time at which they were observed."""
+        behaviour = self.fast_forward(APICheckBehaviour)
+        started_at = time.time()
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_http_request(
+                request_kwargs=dict(method="GET", url=PRICE_URL),
+                response_kwargs=dict(
+                    version="",
+                    status_code=200,
+                    status_text="",
+                    headers="",
+                    body=json.dumps({"autonolas": {"usd": 1.5}}).encode(),
+                ),
+            )
+
+        assert behaviour.is_done()
+        payload = cast(APICheckPayload, self.payloads[0])
+        assert decode_prices(cast(str, payload.prices)) == (1.5,)
+        assert started_at <= cast(float, payload.price_timestamp) <= time.time()
+
+    def test_source_gives_up_on_last_attempt(self) -> None:
+        """A price source which is still overloaded on the last attempt is given up, without announcing a retry."""
+        rate_limiter = self.skill.skill_context.rate_limiter
+        max_retries = rate_limiter.max_retries
+        rate_limiter.max_retries = 0
+        behaviour = self.fast_forward(APICheckBehaviour)
+        try:
+            with self.mock_round(), mock.patch.object(
+                self.skill.skill_context.logger, "warning"
+            ) as warning:
+                self.behaviour.act_wrapper()
+                self.mock_http_request(
+                    request_kwargs=dict(method="GET", url=PRICE_URL),
+                    response_kwargs=dict(
+                        version="",
+                        status_code=429,
+                        status_text="",
+                        headers="",
+                        body=b"",
+                    ),
+                )
+        finally:
+            rate_limiter.max_retries = max_retries
+
+        assert behaviour.is_done()
+        assert cast(APICheckPayload, self.payloads[0]).prices is None
+        messages = [call.args[0] for call in warning.call_args_list]
+        assert any("giving up after 1 attempts" in message for message in messages)
+        assert not any("retrying" in message for message in messages)
+        self.assert_quantity_in_outbox(0)
+
+    def test_rate_limited_http_response(self) -> None:
+        """An overloaded host is retried, and given up on the last attempt."""
+        behaviour = cast(APICheckBehaviour, self.fast_forward(APICheckBehaviour))
+        response = mock.MagicMock(status_code=503, headers="")
+        attempts = []
+
+        def get_http_response(*_args: Any, **_kwargs: Any) -> Generator:
+            attempts.append(response)
+            yield
+            return response
+
+        def sleep(_seconds: float) -> Generator:
+            yield
+
+        with mock.patch.object(
+            behaviour, "get_http_response", get_http_response
+        ), mock.patch.object(behaviour, "sleep", sleep), mock.patch.object(
+            self.skill.skill_context.logger, "warning"
+        ) as warning:
+            result = run_generator(
+                behaviour.get_rate_limited_http_response(
+                    "GET", "https://prices.example.com/"
+                )
+            )
+
+        max_retries = self.skill.skill_context.rate_limiter.max_retries
+        assert result is response
+        assert len(attempts) == max_retries + 1
+        messages = [call.args[0] for call in warning.call_args_list]
+        assert sum("retrying" in message for message in messages) == max_retries
+        assert f"giving up after {max_retries + 1} attempts" in messages[-1]
+
+    def test_rate_limited_http_response_after_deadline(self) -> None:
+        """An overloaded host which responds after the deadline is not retried, and its budget is left untouched."""
+        behaviour = cast(APICheckBehaviour, self.fast_forward(APICheckBehaviour))
+        rate_limiter = self.skill.skill_context.rate_limiter
+        url = "https://late.example.com/"
+        response = mock.MagicMock(status_code=429, headers="")
+        clock = [time.time()]
+        attempts = []
+
+        def get_http_response(*_args: Any, **_kwargs: Any) -> Generator:
+            attempts.append(response)
+            clock[0] += 10.0
+            yield
+            return response
+
+        with mock.patch.object(
+            behaviour, "get_http_response", get_http_response
+        ), mock.patch("time.time", lambda: clock[0]):
+            result = run_generator(
+                behaviour.get_rate_limited_http_response("GET", url, timeout=5.0)
+            )
+            tokens = rate_limiter._get_bucket(rate_limiter.get_host(url), clock[0])
+            assert rate_limiter.reserve(url, deadline=clock[0] + 0.25) is None
+
+        assert result is response
+        assert len(attempts) == 1
+        # only the request which was sent took a token, and the refused reservation took none
+        assert tokens.tokens == pytest.approx(rate_limiter.default_burst - 1)
+
+    def test_uses_prefetched_prices(self) -> None:
+        """The prices prefetched in the background are stamped with the time at which they were observed."""
+        observed_at = time.time() - 3
+        self.skill.skill_context.state.price_observation = PriceObservation(
+            token_ids=("autonolas",),
+            prices={"coingecko": (1.5,)},
+            responses={"coingecko": json.dumps({"autonolas": {"usd": 1.5}})},
+            observed_at=observed_at,
+        )
+        behaviour = self.fast_forward(APICheckBehaviour)
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        payload = cast(APICheckPayload, self.payloads[0])
+        assert decode_prices(cast(str, payload.prices)) == (1.5,)
+        assert payload.price_timestamp == observed_at
+        self.assert_quantity_in_outbox(0)
+
+
+class TestPricePrefetchBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the PricePrefetchBehaviour."""
+
+    @pytest.mark.parametrize(
+        "elapsed, price_age, observation_age, expected",
+        (
+            # the next period starts in 10s, without fresh prices
+            (290.0, None, None, True),
+            # the next period starts in 200s
+            (100.0, None, None, False),
+            # the agreed prices will still be fresh in the next period
+            (290.0, 30.0, None, False),
+            # the prices were already prefetched for the next period
+            (290.0, None, 3.0, False),
+            # the prefetched prices have expired
+            (290.0, None, 20.0, True),
+        ),
+    )
+    def test_prefetches_before_next_period(
+        self,
+        elapsed: float,
+        price_age: Optional[float],
+        observation_age: Optional[float],
+        expected: bool,
+    ) -> None:
+        """The prices are only prefetched shortly before the next period, if they will be needed then."""
+        now = time.time()
+        agent_address = self.skill.skill_context.agent_address
+        db = AbciAppDB(
+            setup_data=AbciAppDB.data_to_lists(
+                {
+                    "all_participants": [agent_address],
+                    "participants": [agent_address],
+                    "consensus_threshold": 1,
+                    "safe_contract_address": SAFE_ADDRESS,
+                    "period_started_at": now - elapsed - 300,
+                }
+            )
+        )
+        db.create(
+            period_started_at=now - elapsed,
+            price_timestamp=None if price_age is None else now - price_age,
+        )
+        if observation_age is not None:
+            self.skill.skill_context.state.price_observation = PriceObservation(
+                token_ids=("autonolas",),
+                prices={"coingecko": (1.5,)},
+                responses={},
+                observed_at=now - observation_age,
+            )
+        behaviour = PricePrefetchBehaviour(
+            name=PricePrefetchBehaviour.auto_behaviour_id(),
+            skill_context=self.skill.skill_context,
+        )
+        with self.override_params(
+            price_max_age=60.0, price_prefetch_max_age=15.0
+        ), mock.patch.object(
+            PricePrefetchBehaviour,
+            "synchronized_data",
+            new_callable=mock.PropertyMock,
+            return_value=SynchronizedData(db),
+        ):
+            assert behaviour._should_prefetch() is expected
+
+
+class TestDecisionMakingBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the DecisionMakingBehaviour."""
+
+    def test_decides_default_event(self) -> None:
+        """Without decision rules, the default event is voted."""
+        behaviour = self.fast_forward(
+            DecisionMakingBehaviour, prices=encode_prices([1.5])
+        )
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        assert cast(DecisionMakingPayload, self.payloads[0]).event == "done"
+
+    def test_syncs_price_history(self) -> None:
+        """The local price history is synced with the agreed one before deciding."""
+        behaviour = self.fast_forward(
+            DecisionMakingBehaviour,
+            prices=encode_prices([1.5]),
+            price_history=[
+                [NOW - 60, encode_prices([1.0])],
+                [NOW, encode_prices([1.5])],
+            ],
+        )
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        history = self.skill.skill_context.state.price_history
+        assert history.values.ravel().tolist() == [1.0, 1.5]
+
+
+class TestTxPreparationBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the TxPreparationBehaviour."""
+
+    def test_prepares_transfer(self) -> None:
+        """The transfer takes the nonce of the Safe on chain."""
+        behaviour = self.fast_forward(TxPreparationBehaviour)
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_fee_history_error()
+            self.mock_safe_nonce(3)
+
+        assert behaviour.is_done()
+        payload = cast(TxPreparationPayload, self.payloads[0])
+        assert payload.tx_hash is not None
+        assert payload.safe_nonce == 3
+
+    def test_without_nonce(self) -> None:
+        """The agent does not vote if the nonce of the Safe cannot be read, so that the round is retried."""
+        behaviour = self.fast_forward(TxPreparationBehaviour)
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_fee_history_error()
+            self.mock_safe_nonce(None)
+
+        assert behaviour.is_done()
+        assert self.payloads == []
+
+
+class TestCustomContractBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the CustomContractBehaviour."""
+
+    def test_prepares_call(self) -> None:
+        """The call to the custom contract takes the nonce of the Safe on chain."""
+        behaviour = self.fast_forward(CustomContractBehaviour)
+        with self.override_params(
+            custom_contract_address=SAFE_ADDRESS, custom_contract_data="0x12345678"
+        ), self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_fee_history_error()
+            self.mock_safe_nonce(3)
+
+        assert behaviour.is_done()
+        payload = cast(CustomContractPayload, self.payloads[0])
+        assert payload.tx_hash is not None
+        assert payload.safe_nonce == 3
+
+    def test_without_nonce(self) -> None:
+        """The agent does not vote if the nonce of the Safe cannot be read, so that the round is retried."""
+        behaviour = self.fast_forward(CustomContractBehaviour)
+        with self.override_params(
+            custom_contract_address=SAFE_ADDRESS, custom_contract_data="0x12345678"
+        ), self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_fee_history_error()
+            self.mock_safe_nonce(None)
+
+        assert behaviour.is_done()
+        assert self.payloads == []
+
+    def test_without_contract(self) -> None:
+        """Without a custom contract, no call is prepared."""
+        behaviour = self.fast_forward(CustomContractBehaviour)
+        with self.override_params(custom_contract_address=None), self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        assert cast(CustomContractPayload, self.payloads[0]).tx_hash is None
+        self.assert_quantity_in_outbox(0)
+
+
+class TestIPFSStorageBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the IPFSStorageBehaviour."""
+
+    def test_accumulates_reports(self) -> None:
+        """The report of the period is added to the pending reports until a batch is due."""
+        behaviour = self.fast_forward(IPFSStorageBehaviour, pending_reports=[])
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        payload = cast(IPFSPayload, self.payloads[0])
+        assert payload.ipfs_hash is None
+        reports = decode_reports(cast(str, payload.reports))
+        assert [report["period"] for report in reports] == [0]
+        self.assert_quantity_in_outbox(0)
+
+    def test_stores_due_batch(self) -> None:
+        """The keeper uploads the batch before voting on its CID, and the round then moves on."""
+        behaviour = self.fast_forward(IPFSStorageBehaviour, pending_reports=[])
+        reports = cast(IPFSStorageBehaviour, behaviour).get_pending_reports()
+        cid = get_directory_cid(*build_batch(reports))
+        with self.override_params(ipfs_batch_size=1), self.record_payloads():
+            self.behaviour.act_wrapper()
+            assert self.payloads == []
+            self.mock_ipfs_request(
+                request_kwargs=dict(performative=IpfsMessage.Performative.STORE_FILES),
+                response_kwargs=dict(
+                    performative=IpfsMessage.Performative.IPFS_HASH,
+                    ipfs_hash=cid,
+                ),
+            )
+
+            payload = cast(IPFSPayload, self.payloads[0])
+            assert payload.ipfs_hash == cid
+            # the reports stay pending until the batch is retrieved
+            assert decode_reports(cast(str, payload.reports)) == reports
+            assert not behaviour.is_done()
+            self.end_round(Event.IPFS_STORED)
+
+        current_behaviour = cast(BaseBehaviour, self.behaviour.current_behaviour)
+        assert (
+            current_behaviour.behaviour_id == IPFSRetrieveBehaviour.auto_behaviour_id()
+        )
+        self.assert_quantity_in_outbox(0)
+
+    def test_keeps_reports_when_upload_fails(self) -> None:
+        """The keeper votes for no CID when the batch could not be uploaded."""
+        behaviour = self.fast_forward(IPFSStorageBehaviour, pending_reports=[])
+        with self.override_params(ipfs_batch_size=1), self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_ipfs_request(
+                request_kwargs=dict(performative=IpfsMessage.Performative.STORE_FILES),
+                response_kwargs=dict(
+                    performative=IpfsMessage.Performative.ERROR, reason="unavailable"
+                ),
+            )
+
+        assert behaviour.is_done()
+        payload = cast(IPFSPayload, self.payloads[0])
+        assert payload.ipfs_hash is None
+        reports = decode_reports(cast(str, payload.reports))
+        assert [report["period"] for report in reports] == [0]
+
+    def test_uploads_datasets_before_voting(self) -> None:
+        """The keeper uploads the changed datasets in chunks, followed by their manifests, before voting."""
+        behaviour = self.fast_forward(IPFSStorageBehaviour, pending_reports=[])
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, "model.bin")
+            with open(path, "wb") as file:
+                file.write(b"weights")
+            manifest = build_manifest(path, "model", 1024)
+            with self.override_params(
+                ipfs_datasets={"model": path}, ipfs_chunk_size=1024
+            ), self.mock_round():
+                self.behaviour.act_wrapper()
+                for cid in (*manifest["chunks"], get_manifest_cid(manifest)):
+                    assert self.payloads == []
+                    self.mock_ipfs_request(
+                        request_kwargs=dict(
+                            performative=IpfsMessage.Performative.STORE_FILES
+                        ),
+                        response_kwargs=dict(
+                            performative=IpfsMessage.Performative.IPFS_HASH,
+                            ipfs_hash=cid,
+                        ),
+                    )
+
+        assert behaviour.is_done()
+        reports = decode_reports(cast(str, cast(IPFSPayload, self.payloads[0]).reports))
+        assert len(reports) == 1
+
+
+class TestIPFSRetrieveBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the IPFSRetrieveBehaviour."""
+
+    def test_retrieves_stored_cid(self) -> None:
+        """The files of the stored batch are retrieved once, and voted on."""
+        cid = "bafybeih4rycgs5zd5zduv3z7kbcvyuwowzqzjw7np6ih4hkmqzmhgyhxlu"
+        behaviour = self.fast_forward(IPFSRetrieveBehaviour, stored_ipfs_hash=cid)
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_ipfs_request(
+                request_kwargs=dict(performative=IpfsMessage.Performative.GET_FILES),
+                response_kwargs=dict(
+                    performative=IpfsMessage.Performative.FILES,
+                    files={"report.txt": "report"},
+                ),
+            )
+
+        # the retrieved directory is not a batch of reports, so no dataset is downloaded
+        assert behaviour.is_done()
+        assert cast(IPFSPayload, self.payloads[0]).ipfs_hash == cid
+        self.assert_quantity_in_outbox(0)
+
+
+class TestMultisendTxPreparationBehaviour(LearningAbciFSMBehaviourBaseCase):
+    """Test the MultisendTxPreparationBehaviour."""
+
+    def test_queues_transfer(self) -> None:
+        """The transfer of the period waits in the queue until the queue is due."""
+        behaviour = self.fast_forward(
+            MultisendTxPreparationBehaviour, multisend_queue=[]
+        )
+        with self.mock_round():
+            self.behaviour.act_wrapper()
+
+        assert behaviour.is_done()
+        payload = cast(MultisendTxPayload, self.payloads[0])
+        assert payload.multisend_tx_hash is None
+        assert len(decode_transfers(cast(str, payload.queue))) == 1
+        self.assert_quantity_in_outbox(0)
+
+    def test_flushes_due_queue(self) -> None:
+        """A multisend transaction is prepared for the transfers of the due queue."""
+        behaviour = self.fast_forward(
+            MultisendTxPreparationBehaviour, multisend_queue=[]
+        )
+        with self.override_params(multisend_batch_size=1), self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_fee_history_error()
+            self.mock_safe_nonce(3)
+
+        assert behaviour.is_done()
+        payload = cast(MultisendTxPayload, self.payloads[0])
+        assert payload.multisend_tx_hash is not None
+        assert len(decode_transfers(cast(str, payload.transactions))) == 1
+        assert decode_transfers(cast(str, payload.queue)) == []
+        assert payload.safe_nonce == 3
+
+    def test_keeps_queue_without_nonce(self) -> None:
+        """The due queue is kept in its order, and not flushed, if the nonce of the Safe cannot be read."""
+        queue = [
+            dict(operation=0, to=SAFE_ADDRESS, value=2, data="", queued_at=0.0),
+            dict(operation=0, to=SAFE_ADDRESS, value=3, data="ff" * 512, queued_at=1.0),
+        ]
+        behaviour = self.fast_forward(
+            MultisendTxPreparationBehaviour, multisend_queue=queue
+        )
+        with self.override_params(multisend_batch_size=3), self.mock_round():
+            self.behaviour.act_wrapper()
+            self.mock_fee_history_error()
+            self.mock_safe_nonce(None)
+
+        assert behaviour.is_done()
+        payload = cast(MultisendTxPayload, self.payloads[0])
+        assert payload.multisend_tx_hash is None
+        assert payload.safe_nonce is None
+        transfers = decode_transfers(cast(str, payload.queue))
+        assert [transfer["value"] for transfer in transfers] == [2, 3, TRANSFER_VALUE]
+        assert not any(transfer.get("flushed", False) for transfer in transfers)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's columnar format."""
+
+# pylint: skip-file
+
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from packages.valory.skills.learning_abci.columnar import (
+    FLOAT,
+    INT,
+    STR,
+    TableDecodingError,
+    decode_table,
+    encode_table,
+    get_dtype,
+    read_header,
+)
+
+
+TABLE: Dict[str, List[Any]] = {
+    "period": list(range(10)),
+    "price": [1.0 + period / 100 for period in range(10)],
+    "tx_hash": [None if period % 3 else f"0x{period:02x}" for period in range(10)],
+    "volatility": [None if period == 0 else 0.01 for period in range(10)],
+}
+
+
+def assert_column(actual: Any, expected: List[Any]) -> None:
+    """Check the values of a decoded column, where None and NaN stand for a missing value."""
+    actual = list(actual)
+    assert len(actual) == len(expected)
+    for value, expected_value in zip(actual, expected):
+        if expected_value is None and not isinstance(value, str):
+            assert value is None or math.isnan(value)
+        else:
+            assert value == expected_value
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    (
+        ([1, 2, np.int64(3)], INT),
+        ([1, 2.5], FLOAT),
+        ([1, None], FLOAT),
+        ([True, False], FLOAT),
+        ([1.0, "a", None], STR),
+    ),
+)
+def test_get_dtype(values: List[Any], dtype: str) -> None:
+    """The type of a column is inferred from its values."""
+    assert get_dtype(values) == dtype
+
+
+@pytest.mark.parametrize("codec", ("zlib", "lzma"))
+@pytest.mark.parametrize("group_size", (3, 4096))
+def test_round_trip(codec: str, group_size: int) -> None:
+    """A table is decoded as it was encoded."""
+    data = encode_table(TABLE, "period", group_size=group_size, codec=codec)
+
+    decoded = decode_table(data)
+
+    assert list(decoded) == list(TABLE)
+    for name, values in TABLE.items():
+        assert_column(decoded[name], values)
+    assert decoded["period"].dtype == np.dtype("<i8")
+
+
+def test_deterministic() -> None:
+    """The same table is always encoded to the same bytes."""
+    assert encode_table(TABLE, "period") == encode_table(dict(TABLE), "period")
+
+
+def test_select_columns_and_range() -> None:
+    """Only the selected columns, and the rows in the range of the index, are decoded."""
+    data = encode_table(TABLE, "period", group_size=3)
+
+    decoded = decode_table(data, columns=["price"], start=2, end=5)
+
+    assert list(decoded) == ["price"]
+    assert_column(decoded["price"], TABLE["price"][2:5])
+
+
+def test_header() -> None:
+    """The header records the columns, and the range of the index in each group."""
+    header, _, _ = read_header(encode_table(TABLE, "period", group_size=4))
+
+    assert header["rows"] == 10
+    assert [column["dtype"] for column in header["columns"]] == [INT, FLOAT, STR, FLOAT]
+    assert [(group["min"], group["max"]) for group in header["groups"]] == [
+        (0, 3),
+        (4, 7),
+        (8, 9),
+    ]
+
+
+def test_empty_table() -> None:
+    """A table without rows can be encoded and decoded."""
+    decoded = decode_table(encode_table({"period": [], "price": []}, "period"))
+    assert [len(values) for values in decoded.values()] == [0, 0]
+
+
+@pytest.mark.parametrize(
+    "table, index, error",
+    (
+        ({"period": [0, 1], "price": [1.0]}, "period", "different lengths"),
+        ({"period": [1, 0]}, "period", "ascending order"),
+        ({"period": [0, None]}, "period", "column of numbers"),
+        ({"period": ["a", "b"]}, "period", "column of numbers"),
+    ),
+)
+def test_invalid_table(table: Dict[str, List[Any]], index: str, error: str) -> None:
+    """Tables which cannot be indexed are rejected."""
+    with pytest.raises(ValueError, match=error):
+        encode_table(table, index)
+
+
+def test_invalid_data() -> None:
+    """Corrupted tables are rejected."""
+    data = encode_table(TABLE, "period")
+
+    with pytest.raises(TableDecodingError):
+        decode_table(b"LCOL")
+    with pytest.raises(TableDecodingError):
+        decode_table(b"XXXX" + data[4:])
+    with pytest.raises(TableDecodingError):
+        decode_table(data[:-10])
+    with pytest.raises(TableDecodingError, match="Unknown columns"):
+        decode_table(data, columns=["unknown"])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's IPFS tools."""
+
+# pylint: skip-file
+
+from pathlib import Path
+
+from aea.helpers.cid import to_v0
+from aea.helpers.ipfs.base import IPFSHashOnly
+
+from packages.valory.skills.learning_abci.ipfs_tools import (
+    get_cid,
+    is_same_cid,
+    serialize_json,
+)
+
+
+def test_get_cid(tmp_path: Path) -> None:
+    """The CID computed locally is the one of the file added to IPFS."""
+    data = serialize_json({"period": 1, "price": 1.5, "token": "autonolas"})
+    path = tmp_path / "report.json"
+    path.write_bytes(data)
+
+    cid = get_cid("report.json", data)
+
+    assert cid == IPFSHashOnly.get(str(path), wrap=True, cid_v1=True)
+    assert cid != get_cid("other.json", data)
+    assert cid != get_cid("report.json", data + b" ")
+
+
+def test_serialize_json() -> None:
+    """The objects are serialized as the JSON storer of the IPFS interactions does."""
+    assert serialize_json({"b": "ü", "a": [1]}) == (
+        '{\n    "b": "ü",\n    "a": [\n        1\n    ]\n}'.encode()
+    )
+
+
+def test_is_same_cid() -> None:
+    """CIDs of different versions address the same content."""
+    cid = get_cid("report.json", b"report")
+    assert is_same_cid(cid, to_v0(cid))
+    assert not is_same_cid(cid, get_cid("report.json", b"other"))
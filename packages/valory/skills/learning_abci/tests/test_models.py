@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's models."""
+
+# pylint: skip-file
+
+from typing import Any, Dict, Optional
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from packages.valory.skills.abstract_round_abci.base import AbciAppDB
+from packages.valory.skills.learning_abci.models import AgreedTimeouts, SharedState
+from packages.valory.skills.learning_abci.price_history import PriceHistory
+from packages.valory.skills.learning_abci.rounds import Event
+
+
+def get_state(**data: Any) -> mock.MagicMock:
+    """Get a shared state with the given data in the db."""
+    state = mock.MagicMock()
+    state.synchronized_data.db = AbciAppDB(setup_data=AbciAppDB.data_to_lists(data))
+    return state
+
+
+class TestAgreedTimeouts:
+    """Tests for AgreedTimeouts."""
+
+    @pytest.mark.parametrize(
+        "data, expected",
+        (
+            ({}, 30.0),
+            ({"round_timeout": None}, 30.0),
+            ({"round_timeout": 75.0}, 75.0),
+        ),
+    )
+    def test_round_timeout(self, data: Dict[str, Any], expected: float) -> None:
+        """The agreed round timeout overrides the configured one."""
+        timeouts = AgreedTimeouts({Event.ROUND_TIMEOUT: 30.0}, get_state(**data))
+        assert timeouts.get(Event.ROUND_TIMEOUT) == expected
+
+    @pytest.mark.parametrize("configured", (None, 10.0))
+    def test_other_events(self, configured: Optional[float]) -> None:
+        """The timeouts of the other events are the configured ones."""
+        configured_timeouts = {} if configured is None else {Event.DONE: configured}
+        timeouts = AgreedTimeouts(configured_timeouts, get_state(round_timeout=75.0))
+        assert timeouts.get(Event.DONE) == configured
+
+
+class TestSharedState:
+    """Tests for SharedState."""
+
+    def setup_method(self) -> None:
+        """Set up the test method."""
+        self.state = SharedState(name="state", skill_context=mock.MagicMock())
+        self.state._price_history = PriceHistory(3, 1)
+
+    def test_sync_price_history(self) -> None:
+        """Only the agreed observations newer than the last synced one are pushed."""
+        self.state.sync_price_history([(1.0, (1.0,)), (2.0, (2.0,))])
+        with mock.patch.object(
+            PriceHistory, "push", autospec=True, side_effect=PriceHistory.push
+        ) as push:
+            self.state.sync_price_history([(1.0, (1.0,)), (2.0, (2.0,))])
+            push.assert_not_called()
+            self.state.sync_price_history([(2.0, (2.0,)), (3.0, (3.0,))])
+            push.assert_called_once()
+
+        assert self.state.price_history.values.ravel().tolist() == [1.0, 2.0, 3.0]
+
+    def test_resync_price_history(self) -> None:
+        """The history is built again from the agreed observations if its last one is no longer agreed."""
+        self.state.sync_price_history([(1.0, (1.0,)), (2.0, (5.0,))])
+        self.state.sync_price_history([(3.0, (3.0,)), (4.0, (4.0,))])
+
+        assert self.state.price_history.values.ravel().tolist() == [3.0, 4.0]
+        assert np.allclose(self.state.price_history.mean, [3.5])
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's multisend queue."""
+
+# pylint: skip-file
+
+from typing import Any, Dict, List
+
+from eth_abi import decode
+
+from packages.valory.contracts.multisend.contract import MultiSendOperation, to_bytes
+from packages.valory.skills.learning_abci.multisend import (
+    MultisendQueue,
+    SAFE_TX_GAS_OVERHEAD,
+    estimate_call_gas,
+    get_multisend_data,
+    pack_batches,
+)
+
+
+RECIPIENT = "0x615d3278680337e2D39C3bc5042D959C7938B917"
+NOW = 1_700_000_000.0
+GAS_LIMIT = 10_000_000
+
+
+def get_queue(
+    n_transfers: int, batch_size: int = 3, max_wait: float = 60.0
+) -> MultisendQueue:
+    """Get a queue of transfers queued one second apart, the last one at NOW."""
+    queue = MultisendQueue([], batch_size, max_wait, GAS_LIMIT)
+    for i in range(n_transfers):
+        queue.push(RECIPIENT, i + 1, "0x", NOW - n_transfers + 1 + i)
+    return queue
+
+
+def test_get_multisend_data() -> None:
+    """The calldata is a `multiSend` call with the transactions packed as the MultiSend contract package does."""
+    transactions = [
+        {"operation": 0, "to": RECIPIENT, "value": 1, "data": "0x"},
+        {"operation": 1, "to": RECIPIENT, "value": 0, "data": "a9059cbb"},
+    ]
+    data = get_multisend_data(transactions)
+
+    assert data[:4] == bytes.fromhex("8d80ff0a")
+    (encoded,) = decode(["bytes"], data[4:])
+    assert encoded == to_bytes(
+        [
+            {
+                "operation": MultiSendOperation.CALL,
+                "to": RECIPIENT,
+                "value": 1,
+                "data": b"",
+            },
+            {
+                "operation": MultiSendOperation.DELEGATE_CALL,
+                "to": RECIPIENT,
+                "value": 0,
+                "data": bytes.fromhex("a9059cbb"),
+            },
+        ]
+    )
+
+
+def test_push() -> None:
+    """A transfer is queued as a call, with the time at which it was queued."""
+    queue = get_queue(1)
+    assert queue.transfers == [
+        {
+            "operation": MultiSendOperation.CALL.value,
+            "to": RECIPIENT,
+            "value": 1,
+            "data": "0x",
+            "queued_at": NOW,
+        }
+    ]
+
+
+def test_is_due() -> None:
+    """The queue is due once it is full, or once its oldest transfer has waited long enough."""
+    assert not get_queue(0).is_due(NOW + 3600)
+    assert not get_queue(2).is_due(NOW)
+    assert get_queue(2).is_due(NOW + 59)
+    assert get_queue(3).is_due(NOW)
+
+
+def test_flush_when_not_due() -> None:
+    """A queue which is not due is left untouched."""
+    queue = get_queue(2)
+    assert queue.flush(NOW) is None
+    assert len(queue.transfers) == 2
+
+
+def test_flush_takes_the_oldest() -> None:
+    """A full queue is flushed by taking its oldest transfers, up to the batch size."""
+    queue = get_queue(5)
+    batch = queue.flush(NOW)
+
+    assert batch is not None
+    assert [transfer["value"] for transfer in batch] == [1, 2, 3]
+    assert [transfer["value"] for transfer in queue.transfers] == [4, 5]
+    assert not queue.is_due(NOW)
+
+
+def get_call(value: int, gas: int) -> Dict[str, Any]:
+    """Get a call which is estimated to use the given gas on top of the transfer."""
+    return {
+        "operation": MultiSendOperation.CALL.value,
+        "to": RECIPIENT,
+        "value": value,
+        "data": "0x",
+        "queued_at": NOW + value,
+        "gas": gas,
+    }
+
+
+# room for two calls of 100k gas, or one of 200k gas and a transfer
+PACKING_GAS_LIMIT = SAFE_TX_GAS_OVERHEAD + 250_000
+CALLS = [
+    get_call(1, 100_000),
+    get_call(2, 200_000),
+    get_call(3, 100_000),
+    get_call(4, 0),
+]
+
+
+def values(transfers: List[Dict[str, Any]]) -> List[int]:
+    """Get the values which identify the transfers."""
+    return [transfer["value"] for transfer in transfers]
+
+
+def test_estimate_call_gas() -> None:
+    """The explicit gas of a call is added to its estimate."""
+    assert (
+        estimate_call_gas(get_call(1, 100_000))
+        == estimate_call_gas(get_call(1, 0)) + 100_000
+    )
+
+
+def test_pack_batches() -> None:
+    """The calls are packed first-fit decreasing, and the batches are ordered by their oldest call."""
+    batches = pack_batches(CALLS, PACKING_GAS_LIMIT)
+
+    assert [values(batch) for batch in batches] == [[1, 3], [2, 4]]
+    for batch in batches:
+        gas = sum(estimate_call_gas(call) for call in batch)
+        assert gas <= PACKING_GAS_LIMIT - SAFE_TX_GAS_OVERHEAD
+
+
+def test_pack_batches_oversized_call() -> None:
+    """A call which does not fit in an empty batch is placed alone in a batch."""
+    batches = pack_batches([get_call(1, 0), get_call(2, 1_000_000)], PACKING_GAS_LIMIT)
+    assert [values(batch) for batch in batches] == [[1], [2]]
+    assert pack_batches([], PACKING_GAS_LIMIT) == []
+
+
+def test_flush_leaves_the_other_batches_flushed() -> None:
+    """The batches which are not taken are settled next, without waiting again."""
+    queue = MultisendQueue(CALLS, len(CALLS), 3600.0, PACKING_GAS_LIMIT)
+
+    batch = queue.flush(NOW)
+    assert batch is not None
+    assert values(batch) == [1, 3]
+    assert values(queue.transfers) == [2, 4]
+    assert all(transfer["flushed"] for transfer in queue.transfers)
+
+    batch = queue.flush(NOW)
+    assert batch is not None
+    assert values(batch) == [2, 4]
+    assert queue.transfers == []
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's payload tools."""
+
+# pylint: skip-file
+
+import base64
+import json
+import math
+from typing import Any, Dict, List
+
+import pytest
+from aea_ledger_ethereum import EthereumCrypto
+
+from packages.valory.skills.learning_abci.payload_tools import (
+    PayloadDecodingError,
+    decode_prices,
+    decode_reports,
+    decode_transfers,
+    encode_prices,
+    encode_reports,
+    encode_transfers,
+    is_attested_by,
+)
+
+
+RECIPIENT = "0x615d3278680337e2D39C3bc5042D959C7938B917"
+OTHER_RECIPIENT = "0x5C5b146905c11Ee1fE7260c0338b52DCA9582a13"
+TRANSFERS: List[Dict[str, Any]] = [
+    {
+        "operation": 0,
+        "to": RECIPIENT,
+        "value": 1,
+        "data": "",
+        "queued_at": 1_700_000_000.5,
+    },
+    {
+        "operation": 0,
+        "to": OTHER_RECIPIENT,
+        "value": 10**18,
+        "data": "a9059cbb",
+        "queued_at": 1_700_000_001.0,
+        "gas": 21_000,
+    },
+    {
+        "operation": 1,
+        "to": RECIPIENT,
+        "value": 0,
+        "data": "00" * 68,
+        "queued_at": 1_700_000_002.0,
+        "flushed": True,
+    },
+]
+
+
+def test_prices_round_trip() -> None:
+    """A price vector is decoded as it was encoded, with NaN in place of the missing prices."""
+    decoded = decode_prices(encode_prices([1.5, None, 0.000123, 42]))
+    assert decoded[0] == 1.5
+    assert math.isnan(decoded[1])
+    assert decoded[2:] == (0.000123, 42.0)
+
+
+def test_empty_prices_round_trip() -> None:
+    """An empty price vector is decoded as empty."""
+    assert decode_prices(encode_prices([])) == ()
+
+
+@pytest.mark.parametrize(
+    "encoded",
+    ("not base64!", base64.b64encode(b"\x00" * 7).decode()),
+)
+def test_decode_invalid_prices(encoded: str) -> None:
+    """A price vector which is not base64 or not a whole number of doubles is rejected."""
+    with pytest.raises(PayloadDecodingError):
+        decode_prices(encoded)
+
+
+def test_is_attested_by() -> None:
+    """A message is attested by the address which signed it, and only by it."""
+    signer, other = EthereumCrypto(), EthereumCrypto()
+    message = "1.5:1700000000.0"
+    signature = signer.sign_message(message.encode())
+
+    assert is_attested_by(message, signature, signer.address, "ethereum")
+    assert not is_attested_by(message, signature, other.address, "ethereum")
+    assert not is_attested_by("1.6:1700000000.0", signature, signer.address, "ethereum")
+    assert not is_attested_by(message, None, signer.address, "ethereum")
+    assert not is_attested_by(message, "0xdeadbeef", signer.address, "ethereum")
+
+
+def test_transfers_round_trip() -> None:
+    """The transfers are decoded as they were encoded."""
+    assert decode_transfers(encode_transfers(TRANSFERS)) == TRANSFERS
+    assert decode_transfers(encode_transfers([])) == []
+
+
+def test_transfers_recipients_are_stored_once() -> None:
+    """A recipient is stored once however many transfers it receives."""
+    same = dict(TRANSFERS[0])
+    other = dict(TRANSFERS[0], to=OTHER_RECIPIENT)
+    to_same = base64.b64decode(encode_transfers([TRANSFERS[0], same]))
+    to_other = base64.b64decode(encode_transfers([TRANSFERS[0], other]))
+    assert len(to_other) - len(to_same) == 20
+
+
+def test_transfers_recipients_are_checksummed() -> None:
+    """The recipients are decoded checksummed, however they were encoded."""
+    transfers = [dict(TRANSFERS[0], to=RECIPIENT.lower())]
+    assert decode_transfers(encode_transfers(transfers))[0]["to"] == RECIPIENT
+
+
+@pytest.mark.parametrize(
+    "packed",
+    (
+        b"",
+        base64.b64decode(encode_transfers(TRANSFERS))[:-1],
+        base64.b64decode(encode_transfers(TRANSFERS)) + b"\x00",
+        b"\x02" + base64.b64decode(encode_transfers(TRANSFERS))[1:],
+    ),
+)
+def test_decode_invalid_transfers(packed: bytes) -> None:
+    """Truncated, padded or unversioned transfers are rejected."""
+    with pytest.raises(PayloadDecodingError):
+        decode_transfers(base64.b64encode(packed).decode())
+
+
+def test_reports_round_trip() -> None:
+    """The reports are decoded as they were encoded, without their extra fields."""
+    reports = [
+        {"period": 1, "created_at": 1_700_000_000.0, "report": "AAA="},
+        {"period": 3, "created_at": 1_700_000_020, "report": "AAE="},
+    ]
+    extended = [dict(report, tx_hash="0x00") for report in reports]
+    assert decode_reports(encode_reports(extended)) == reports
+    assert decode_reports(encode_reports([])) == []
+
+
+@pytest.mark.parametrize(
+    "encoded",
+    (
+        "not json",
+        json.dumps({"period": 1, "created_at": 0.0, "report": ""}),
+        json.dumps([{"period": "1", "created_at": 0.0, "report": ""}]),
+        json.dumps([{"period": 1, "created_at": 0.0}]),
+        json.dumps(
+            [
+                {"period": 2, "created_at": 0.0, "report": ""},
+                {"period": 1, "created_at": 0.0, "report": ""},
+            ]
+        ),
+        json.dumps(
+            [
+                {"period": 1, "created_at": 0.0, "report": ""},
+                {"period": 1, "created_at": 0.0, "report": ""},
+            ]
+        ),
+    ),
+)
+def test_decode_invalid_reports(encoded: str) -> None:
+    """Malformed reports, or reports whose periods are not increasing, are rejected."""
+    with pytest.raises(PayloadDecodingError):
+        decode_reports(encoded)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's price history."""
+
+# pylint: skip-file
+
+import warnings
+
+import numpy as np
+import pytest
+
+from packages.valory.skills.learning_abci.price_history import PriceHistory
+
+
+def test_empty() -> None:
+    """An empty history has no prices and no statistics."""
+    history = PriceHistory(3, 2)
+    assert len(history) == 0
+    assert history.last is None
+    assert history.values.shape == (0, 2)
+    for statistic in (history.mean, history.std, history.min, history.max):
+        assert np.isnan(statistic).all()
+
+
+@pytest.mark.parametrize("capacity, n_tokens", ((0, 1), (-1, 1)))
+def test_invalid_capacity(capacity: int, n_tokens: int) -> None:
+    """The capacity must be positive."""
+    with pytest.raises(ValueError):
+        PriceHistory(capacity, n_tokens)
+
+
+def test_push_invalid_shape() -> None:
+    """A price vector must have a price per token."""
+    with pytest.raises(ValueError):
+        PriceHistory(3, 2).push([1.0])
+
+
+def test_ring_buffer() -> None:
+    """The oldest price vectors are evicted once the history is full."""
+    history = PriceHistory(3, 1)
+    for price in range(5):
+        history.push([float(price)])
+
+    assert len(history) == 3
+    assert history.values[:, 0].tolist() == [2.0, 3.0, 4.0]
+    assert history.latest(2)[:, 0].tolist() == [3.0, 4.0]
+    assert history.latest(10).shape == (3, 1)
+    assert history.last.tolist() == [4.0]
+
+
+@pytest.mark.parametrize("capacity", (1, 4, 25))
+def test_rolling_statistics(capacity: int) -> None:
+    """The statistics are the ones of the prices in the history, ignoring the missing ones."""
+    rng = np.random.default_rng(capacity)
+    prices = 1_000.0 + rng.normal(size=(60, 3))
+    prices[rng.random(prices.shape) < 0.2] = np.nan
+    # a token without any price for a while
+    prices[10:40, 2] = np.nan
+    history = PriceHistory(capacity, 3)
+
+    for step, vector in enumerate(prices):
+        history.push(vector)
+        window = prices[max(step + 1 - capacity, 0) : step + 1]
+        np.testing.assert_array_equal(history.values, window)
+        with warnings.catch_warnings():
+            # the statistics of a token without prices are NaN, with a warning
+            warnings.simplefilter("ignore", RuntimeWarning)
+            expected = (
+                np.nanmean(window, axis=0),
+                np.nanstd(window, axis=0),
+                np.nanmin(window, axis=0),
+                np.nanmax(window, axis=0),
+            )
+        actual = (history.mean, history.std, history.min, history.max)
+        for actual_statistic, expected_statistic in zip(actual, expected):
+            np.testing.assert_allclose(actual_statistic, expected_statistic, atol=1e-6)
+
+
+def test_std_precision() -> None:
+    """The deviation of large prices which barely move is precise, however many prices were pushed."""
+    rng = np.random.default_rng(0)
+    prices = 1e6 + rng.normal(scale=1e-3, size=(1_000, 1))
+    history = PriceHistory(30, 1)
+    for vector in prices:
+        history.push(vector)
+    np.testing.assert_allclose(history.std, np.std(prices[-30:], axis=0), rtol=1e-3)
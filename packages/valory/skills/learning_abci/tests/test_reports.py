@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's batches of period reports."""
+
+# pylint: skip-file
+
+import math
+from typing import Any, Dict, List
+
+import pytest
+
+from packages.valory.skills.learning_abci.columnar import (
+    FLOAT,
+    INT,
+    STR,
+    decode_table,
+    read_header,
+)
+from packages.valory.skills.learning_abci.ipfs_tools import decode_binary
+from packages.valory.skills.learning_abci.reports import (
+    INDEX_FILENAME,
+    PATH_COLUMN,
+    build_batch,
+    build_index,
+    decode_report,
+    encode_report,
+    get_report_filename,
+    is_batch_due,
+)
+
+
+def get_report(period: int, **columns: Any) -> Dict[str, Any]:
+    """Get the pending report of a period, with the given columns besides the period."""
+    return {
+        "period": period,
+        "created_at": 1000.0 + period,
+        "report": encode_report({"period": period, **columns}),
+    }
+
+
+@pytest.mark.parametrize(
+    "periods, now, due",
+    (
+        ([], 2000.0, False),
+        ([0, 1], 1001.0, False),
+        ([0, 1, 2], 1002.0, True),
+        ([0], 1000.0 + 60, True),
+    ),
+)
+def test_is_batch_due(periods: List[int], now: float, due: bool) -> None:
+    """A batch is due once enough reports are pending, or the oldest has waited long enough."""
+    reports = [get_report(period) for period in periods]
+    assert is_batch_due(reports, batch_size=3, max_wait=60, now=now) is due
+
+
+def test_build_index() -> None:
+    """The index has all the rows of the reports, with the path of the report of each row."""
+    reports = [
+        get_report(0, price_a=1.0, tx_count=1),
+        get_report(1, price_a=2.0, tx_count=2),
+    ]
+
+    index = build_index(reports)
+
+    header, _, _ = read_header(index)
+    assert {column["name"]: column["dtype"] for column in header["columns"]} == {
+        "period": INT,
+        "price_a": FLOAT,
+        "tx_count": INT,
+        PATH_COLUMN: "str",
+    }
+    decoded = decode_table(index)
+    assert list(decoded["period"]) == [0, 1]
+    assert list(decoded["tx_count"]) == [1, 2]
+    assert decoded[PATH_COLUMN] == [get_report_filename(0), get_report_filename(1)]
+
+
+def test_build_index_missing_columns() -> None:
+    """The integer columns which some reports miss are stored as floats, whether they appear late or stop early."""
+    reports = [
+        get_report(0, price_a=1.0, stopped=7),
+        get_report(1, price_b=2.0, started=3),
+    ]
+
+    decoded = decode_table(build_index(reports))
+
+    assert list(decoded) == [
+        "period",
+        "price_a",
+        "stopped",
+        "price_b",
+        "started",
+        PATH_COLUMN,
+    ]
+    assert decoded["stopped"][0] == 7 and math.isnan(decoded["stopped"][1])
+    assert math.isnan(decoded["started"][0]) and decoded["started"][1] == 3
+    assert math.isnan(decoded["price_b"][0]) and decoded["price_b"][1] == 2.0
+
+
+def test_build_batch() -> None:
+    """The batch links the file of each report, and its index."""
+    reports = [get_report(3, price_a=1.0), get_report(4, price_a=2.0)]
+
+    dirname, files = build_batch(reports)
+
+    assert dirname == "reports_000000003_000000004"
+    assert set(files) == {
+        get_report_filename(3),
+        get_report_filename(4),
+        INDEX_FILENAME,
+    }
+    assert files[get_report_filename(3)] == reports[0]["report"].encode()
+    assert decode_binary(files[INDEX_FILENAME]) == build_index(reports)
+
+
+def test_build_index_missing_strings() -> None:
+    """The hash of the transaction and the CIDs of the datasets are strings, even if they are missing in every row."""
+    reports = [
+        get_report(0, tx_hash=None, **{"dataset.prices": None}),
+        get_report(1, tx_hash=None, **{"dataset.prices": None}),
+    ]
+
+    index = build_index(reports)
+
+    header, _, _ = read_header(index)
+    dtypes = {column["name"]: column["dtype"] for column in header["columns"]}
+    assert dtypes["tx_hash"] == dtypes["dataset.prices"] == STR
+    assert decode_table(index)["dataset.prices"] == [None, None]
+
+
+@pytest.mark.parametrize("encoded", ("[]", '{"period": "1"}', "{"))
+def test_decode_invalid_report(encoded: str) -> None:
+    """A report which is not a row with its period is rejected."""
+    with pytest.raises(ValueError):
+        decode_report(encoded)
@@ -0,0 +1,597 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's rounds."""
+
+# pylint: skip-file
+
+import math
+from enum import Enum
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple, cast
+from unittest import mock
+
+import pytest
+
+from packages.valory.skills.abstract_round_abci.base import (
+    BaseTxPayload,
+    TransactionNotValidError,
+)
+from packages.valory.skills.abstract_round_abci.test_tools.rounds import (
+    BaseCollectSameUntilThresholdRoundTest,
+)
+from packages.valory.skills.learning_abci.payload_tools import (
+    decode_prices,
+    encode_prices,
+    encode_reports,
+    encode_transfers,
+)
+from packages.valory.skills.learning_abci.payloads import (
+    APICheckPayload,
+    CustomContractPayload,
+    IPFSPayload,
+    MultisendTxPayload,
+    TxPreparationPayload,
+)
+from packages.valory.skills.learning_abci.rounds import (
+    APICheckRound,
+    CustomContractRound,
+    Event,
+    IPFSRetrieveRound,
+    IPFSStoreRound,
+    MultisendTxRound,
+    SynchronizedData,
+    TxPreparationRound,
+)
+
+
+CID = "bafybeih4rycgs5zd5zduv3z7kbcvyuwowzqzjw7np6ih4hkmqzmhgyhxlu"
+PREVIOUS_CID = "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi"
+REPORTS = [{"period": 0, "created_at": 1.0, "report": "report"}]
+NOW = 1_700_000_010.0
+TX_HASH = "0x" + "ab" * 32
+RECIPIENT = "0x615d3278680337e2D39C3bc5042D959C7938B917"
+BATCH = [
+    {"operation": 0, "to": RECIPIENT, "value": value, "data": "", "queued_at": NOW}
+    for value in (1, 2)
+]
+QUEUE = [{"operation": 0, "to": RECIPIENT, "value": 3, "data": "", "queued_at": NOW}]
+API_CHECK_PARAMS = {
+    "price_tolerance": 0.01,
+    "price_token_ids": ["autonolas", "ethereum"],
+    "decide_in_price_round": False,
+    "volatility_decay": 0.9,
+    "price_history_size": 2,
+    "min_round_timeout": 65.0,
+    "max_round_timeout": 300.0,
+}
+
+
+def get_ipfs_payloads(
+    participants: FrozenSet[str], **kwargs: Any
+) -> Mapping[str, BaseTxPayload]:
+    """Get the same IPFS payload from each participant."""
+    return {
+        participant: IPFSPayload(sender=participant, **kwargs)
+        for participant in participants
+    }
+
+
+class BaseLearningRoundTest(BaseCollectSameUntilThresholdRoundTest):
+    """Base test class for the rounds of the LearningAbci skill."""
+
+    _synchronized_data_class = SynchronizedData
+    _event_class = Event
+
+    @staticmethod
+    def get_context(params: Optional[Dict[str, Any]] = None) -> mock.MagicMock:
+        """Get the context of a round, with the given params."""
+        context = mock.MagicMock()
+        for name, value in (params or {}).items():
+            setattr(context.params, name, value)
+        round_sequence = context.state.round_sequence
+        round_sequence.last_round_transition_timestamp.timestamp.return_value = NOW
+        return context
+
+    def run_round(
+        self,
+        round_cls: Any,
+        payloads: Mapping[str, BaseTxPayload],
+        final_data: Dict[str, Any],
+        most_voted_payload: Any,
+        exit_event: Event,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Run a round with the same payload from each participant, and check the data and the event it ends with."""
+        test_round = round_cls(
+            synchronized_data=self.synchronized_data, context=self.get_context(params)
+        )
+        checks: List[Callable] = [
+            lambda synchronized_data, name=name: synchronized_data.db.get(name, None)
+            for name in final_data
+        ]
+        self._complete_run(
+            self._test_round(
+                test_round=test_round,
+                round_payloads=payloads,
+                synchronized_data_update_fn=lambda synchronized_data, _: synchronized_data.update(
+                    **final_data
+                ),
+                synchronized_data_attr_checks=checks,
+                most_voted_payload=most_voted_payload,
+                exit_event=exit_event,
+            )
+        )
+
+
+class TestIPFSRetrieveRound(BaseLearningRoundTest):
+    """Tests for IPFSRetrieveRound."""
+
+    def test_retrieved(self) -> None:
+        """The agreed CID is the one which was retrieved, and the reports which it links are no longer pending."""
+        self.synchronized_data.update(
+            ipfs_hash=PREVIOUS_CID, stored_ipfs_hash=CID, pending_reports=REPORTS
+        )
+        self.run_round(
+            IPFSRetrieveRound,
+            get_ipfs_payloads(self.participants, ipfs_hash=CID),
+            final_data={"ipfs_hash": CID, "pending_reports": []},
+            most_voted_payload=CID,
+            exit_event=Event.IPFS_RETRIEVED,
+        )
+
+    @pytest.mark.parametrize("ipfs_hash", (None, CID))
+    def test_nothing_retrieved(self, ipfs_hash: Optional[str]) -> None:
+        """When nothing was retrieved, the round ends without replacing the agreed CID or the pending reports."""
+        self.synchronized_data.update(ipfs_hash=ipfs_hash, pending_reports=REPORTS)
+        self.run_round(
+            IPFSRetrieveRound,
+            get_ipfs_payloads(self.participants, ipfs_hash=None),
+            final_data={"ipfs_hash": ipfs_hash, "pending_reports": REPORTS},
+            most_voted_payload=None,
+            exit_event=Event.NO_ACTION,
+        )
+
+
+class TestIPFSStoreRound(BaseLearningRoundTest):
+    """Tests for IPFSStoreRound."""
+
+    def test_batch_stored(self) -> None:
+        """When the batch is due, its CID is agreed, and its reports are kept pending until it is retrieved."""
+        self.synchronized_data.update(ipfs_hash=PREVIOUS_CID)
+        reports = encode_reports(REPORTS)
+        self.run_round(
+            IPFSStoreRound,
+            get_ipfs_payloads(self.participants, ipfs_hash=CID, reports=reports),
+            final_data={
+                "ipfs_hash": PREVIOUS_CID,
+                "stored_ipfs_hash": CID,
+                "pending_reports": REPORTS,
+            },
+            most_voted_payload=CID,
+            exit_event=Event.IPFS_STORED,
+        )
+
+    def test_batch_not_due(self) -> None:
+        """Until the batch is due, the reports are kept pending, with the CID of the previous batch."""
+        self.synchronized_data.update(ipfs_hash=PREVIOUS_CID)
+        reports = encode_reports(REPORTS)
+        self.run_round(
+            IPFSStoreRound,
+            get_ipfs_payloads(self.participants, ipfs_hash=None, reports=reports),
+            final_data={
+                "ipfs_hash": PREVIOUS_CID,
+                "stored_ipfs_hash": None,
+                "pending_reports": REPORTS,
+            },
+            most_voted_payload=None,
+            exit_event=Event.NO_ACTION,
+        )
+
+
+class TestAPICheckRound(BaseLearningRoundTest):
+    """Tests for APICheckRound."""
+
+    def get_payloads(
+        self, *prices: List[Optional[float]], **kwargs: Any
+    ) -> List[APICheckPayload]:
+        """Get the payloads of the participants, in order, with the given price vectors."""
+        return [
+            APICheckPayload(sender=sender, prices=encode_prices(vector), **kwargs)
+            for sender, vector in zip(sorted(self.participants), prices)
+        ]
+
+    def get_round(self, **params: Any) -> APICheckRound:
+        """Get the round, with the given params on top of the default ones."""
+        return APICheckRound(
+            synchronized_data=self.synchronized_data,
+            context=self.get_context({**API_CHECK_PARAMS, **params}),
+        )
+
+    def end_round(
+        self, payloads: List[APICheckPayload], **params: Any
+    ) -> Optional[Tuple[SynchronizedData, Enum]]:
+        """Process the payloads, and end the block."""
+        test_round = self.get_round(**params)
+        for payload in payloads:
+            test_round.process_payload(payload)
+        return test_round.end_block()
+
+    def test_median_within_tolerance(self) -> None:
+        """The median of the price vectors within tolerance is agreed, and the outliers are ignored."""
+        payloads = self.get_payloads(
+            [1.0, 2000.0], [1.001, None], [0.999, 2001.0], [2.0, 2000.5]
+        )
+        result = self.end_round(payloads)
+
+        assert result is not None
+        synchronized_data, event = result
+        assert event == Event.DONE
+        prices = cast(SynchronizedData, synchronized_data).prices
+        assert prices == (1.0, 2000.5)
+
+    def test_oldest_observation(self) -> None:
+        """The agreed prices are stamped with the oldest observation of the agreeing senders."""
+        payloads = [
+            APICheckPayload(
+                sender=payload.sender,
+                prices=payload.prices,
+                price_timestamp=NOW - i,
+            )
+            for i, payload in enumerate(self.get_payloads(*[[1.0, 2.0]] * 3))
+        ]
+        synchronized_data, _ = self.end_round(payloads)
+        assert cast(SynchronizedData, synchronized_data).price_timestamp == NOW - 2
+
+    def test_waits_for_the_threshold(self) -> None:
+        """The round does not end before the threshold of payloads is reached."""
+        assert self.end_round(self.get_payloads([1.0, 2.0], [1.0, 2.0])) is None
+
+    def test_waits_for_the_remaining_agents(self) -> None:
+        """The round does not end while the remaining agents may still bring a majority within tolerance."""
+        payloads = self.get_payloads([1.0, 2.0], [1.1, 2.0], [1.2, 2.0])
+        assert self.end_round(payloads) is None
+
+    def test_no_majority(self) -> None:
+        """Once all the agents have sent their prices, and too few are within tolerance, there is no majority."""
+        payloads = self.get_payloads([1.0, 2.0], [1.1, 2.0], [1.2, 2.0], [1.3, 2.0])
+        synchronized_data, event = self.end_round(payloads)
+        assert event == Event.NO_MAJORITY
+        assert synchronized_data.db.get("prices", None) is None
+
+    def test_missing_prices_are_ignored(self) -> None:
+        """The agents which could not observe any price do not count towards the threshold."""
+        payloads = self.get_payloads([1.0, 2.0], [None, None], [1.0, None])
+        assert self.end_round(payloads) is None
+
+        payloads.append(self.get_payloads(*[[1.0, 2.0]] * 4)[3])
+        synchronized_data, event = self.end_round(payloads)
+        assert event == Event.DONE
+        assert decode_prices(synchronized_data.db.get("prices", None)) == (1.0, 2.0)
+
+    @pytest.mark.parametrize("prices", ("not base64!", encode_prices([1.0])))
+    def test_invalid_price_vector(self, prices: str) -> None:
+        """A price vector which cannot be decoded, or without a price per token, is rejected."""
+        payload = APICheckPayload(sender=sorted(self.participants)[0], prices=prices)
+        with pytest.raises(TransactionNotValidError):
+            self.get_round().check_payload(payload)
+
+    @pytest.mark.parametrize(
+        "sender_index, attested, valid",
+        ((0, True, True), (0, False, False), (1, True, False)),
+    )
+    def test_raw_response(self, sender_index: int, attested: bool, valid: bool) -> None:
+        """A raw response is only accepted from the keeper of the period, with a valid signature."""
+        test_round = self.get_round()
+        sender = sorted(self.participants)[sender_index]
+        payload = APICheckPayload(
+            sender=sender,
+            prices=encode_prices([1.0, 2.0]),
+            raw_response='{"autonolas": {"usd": 1.0}}',
+            raw_response_signature="0xsignature",
+        )
+        with mock.patch(
+            "packages.valory.skills.learning_abci.rounds.is_attested_by",
+            return_value=attested,
+        ) as is_attested_by:
+            if valid:
+                test_round.check_payload(payload)
+            else:
+                with pytest.raises(TransactionNotValidError):
+                    test_round.check_payload(payload)
+
+        if sender_index == 0:
+            is_attested_by.assert_called_once_with(
+                payload.raw_response,
+                payload.raw_response_signature,
+                sender,
+                test_round.context.default_ledger_id,
+            )
+
+    @pytest.mark.parametrize(
+        "decide_in_price_round, votes, expected_event",
+        (
+            (True, ["transact"] * 3, Event.TRANSACT),
+            (True, ["contract_interacted"] * 3, Event.CONTRACT_INTERACTED),
+            (True, ["done"] * 3, Event.NO_ACTION),
+            (True, ["transact", "transact", None], Event.DONE),
+            (True, ["transact", "transact", "error"], Event.DONE),
+            (False, ["transact"] * 3, Event.DONE),
+        ),
+    )
+    def test_decision(
+        self,
+        decide_in_price_round: bool,
+        votes: List[Optional[str]],
+        expected_event: Event,
+    ) -> None:
+        """The event agreed along with the prices is taken, otherwise the decision is left to the DecisionMakingRound."""
+        payloads = [
+            APICheckPayload(sender=payload.sender, prices=payload.prices, event=vote)
+            for payload, vote in zip(self.get_payloads(*[[1.0, 2.0]] * 3), votes)
+        ]
+        _, event = self.end_round(payloads, decide_in_price_round=decide_in_price_round)
+        assert event == expected_event
+
+    def test_invalid_decision(self) -> None:
+        """An event which the DecisionMakingRound could not emit is rejected."""
+        payload = APICheckPayload(
+            sender=sorted(self.participants)[0],
+            prices=encode_prices([1.0, 2.0]),
+            event=Event.NO_MAJORITY.value,
+        )
+        with pytest.raises(TransactionNotValidError):
+            self.get_round().check_payload(payload)
+
+    @pytest.mark.parametrize(
+        "previous_variance, previous_timestamp, expected_variance",
+        (
+            (None, NOW - 60, (math.log(1.1) ** 2 + math.log(0.9) ** 2) / 2),
+            (
+                0.01,
+                NOW - 60,
+                0.9 * 0.01 + 0.1 * (math.log(1.1) ** 2 + math.log(0.9) ** 2) / 2,
+            ),
+            (0.01, NOW, 0.01),
+        ),
+    )
+    def test_price_variance(
+        self,
+        previous_variance: Optional[float],
+        previous_timestamp: float,
+        expected_variance: float,
+    ) -> None:
+        """The variance of the returns is only updated with the prices observed anew."""
+        self.synchronized_data.update(
+            prices=encode_prices([1.0, 2.0]),
+            price_timestamp=previous_timestamp,
+            price_variance=previous_variance,
+        )
+        payloads = [
+            APICheckPayload(
+                sender=payload.sender, prices=payload.prices, price_timestamp=NOW
+            )
+            for payload in self.get_payloads(*[[1.1, 1.8]] * 3)
+        ]
+        synchronized_data, _ = self.end_round(payloads)
+
+        synchronized_data = cast(SynchronizedData, synchronized_data)
+        assert synchronized_data.price_variance == pytest.approx(expected_variance)
+        assert synchronized_data.period_started_at == NOW
+
+    @pytest.mark.parametrize(
+        "previous_history, timestamp, expected_timestamps",
+        (
+            ([], NOW, [NOW]),
+            ([[NOW - 60, encode_prices([1.0, 2.0])]], NOW, [NOW - 60, NOW]),
+            ([[NOW - 60, encode_prices([1.0, 2.0])]], NOW - 60, [NOW - 60]),
+            (
+                [
+                    [NOW - 120, encode_prices([1.0, 2.0])],
+                    [NOW - 60, encode_prices([1.0, 2.0])],
+                ],
+                NOW,
+                [NOW - 60, NOW],
+            ),
+            ([], None, []),
+        ),
+    )
+    def test_price_history(
+        self,
+        previous_history: List[List[Any]],
+        timestamp: Optional[float],
+        expected_timestamps: List[float],
+    ) -> None:
+        """The agreed prices are only appended to the bounded history when they were observed anew."""
+        self.synchronized_data.update(price_history=previous_history)
+        payloads = [
+            APICheckPayload(
+                sender=payload.sender, prices=payload.prices, price_timestamp=timestamp
+            )
+            for payload in self.get_payloads(*[[1.1, 1.8]] * 3)
+        ]
+        synchronized_data, _ = self.end_round(payloads)
+
+        history = cast(SynchronizedData, synchronized_data).price_history
+        assert [observed_at for observed_at, _ in history] == expected_timestamps
+        if expected_timestamps and expected_timestamps[-1] == timestamp == NOW:
+            assert history[-1][1] == (1.1, 1.8)
+
+    def test_price_variance_without_previous_prices(self) -> None:
+        """The variance cannot be computed from the first agreed prices."""
+        synchronized_data, _ = self.end_round(self.get_payloads(*[[1.0, 2.0]] * 3))
+        assert cast(SynchronizedData, synchronized_data).price_variance is None
+
+    @pytest.mark.parametrize(
+        "proposals, expected_timeout",
+        (
+            ([40.0, 100.0, 500.0], 100.0),
+            ([10.0, 20.0, None], 65.0),
+            ([400.0, 500.0, 600.0], 300.0),
+            ([None, None, None], 90.0),
+        ),
+    )
+    def test_round_timeout(
+        self, proposals: List[Optional[float]], expected_timeout: float
+    ) -> None:
+        """The median of the proposed round timeouts is agreed within bounds, or the previous one is kept."""
+        self.synchronized_data.update(round_timeout=90.0)
+        payloads = [
+            APICheckPayload(
+                sender=payload.sender, prices=payload.prices, round_timeout=proposal
+            )
+            for payload, proposal in zip(
+                self.get_payloads(*[[1.0, 2.0]] * 3), proposals
+            )
+        ]
+        synchronized_data, _ = self.end_round(payloads)
+        assert (
+            cast(SynchronizedData, synchronized_data).round_timeout == expected_timeout
+        )
+
+
+class TestTxPreparationRound(BaseLearningRoundTest):
+    """Tests for TxPreparationRound."""
+
+    def test_tx_agreed(self) -> None:
+        """The agreed transaction is handed over to the settlement, with its nonce."""
+        payloads = {
+            participant: TxPreparationPayload(
+                sender=participant,
+                tx_submitter="agent_0",
+                tx_hash=TX_HASH,
+                safe_nonce=5,
+            )
+            for participant in self.participants
+        }
+        self.run_round(
+            TxPreparationRound,
+            payloads,
+            final_data={"most_voted_tx_hash": TX_HASH, "tx_safe_nonce": 5},
+            most_voted_payload="agent_0",
+            exit_event=Event.DONE,
+        )
+
+    def test_no_tx(self) -> None:
+        """Without a transaction, there is nothing to settle."""
+        payloads = {
+            participant: TxPreparationPayload(sender=participant)
+            for participant in self.participants
+        }
+        self.run_round(
+            TxPreparationRound,
+            payloads,
+            final_data={"most_voted_tx_hash": None},
+            most_voted_payload=None,
+            exit_event=Event.NO_TX,
+        )
+
+
+class TestCustomContractRound(BaseLearningRoundTest):
+    """Tests for CustomContractRound."""
+
+    def test_call_agreed(self) -> None:
+        """The agreed call to the custom contract is handed over to the settlement."""
+        payloads = {
+            participant: CustomContractPayload(
+                sender=participant,
+                tx_submitter="agent_0",
+                tx_hash=TX_HASH,
+                safe_nonce=5,
+            )
+            for participant in self.participants
+        }
+        self.run_round(
+            CustomContractRound,
+            payloads,
+            final_data={"most_voted_tx_hash": TX_HASH, "tx_safe_nonce": 5},
+            most_voted_payload="agent_0",
+            exit_event=Event.CONTRACT_INTERACTED,
+        )
+
+    def test_no_contract(self) -> None:
+        """Without a custom contract, there is nothing to settle."""
+        payloads = {
+            participant: CustomContractPayload(sender=participant)
+            for participant in self.participants
+        }
+        self.run_round(
+            CustomContractRound,
+            payloads,
+            final_data={"most_voted_tx_hash": None},
+            most_voted_payload=None,
+            exit_event=Event.NO_TX,
+        )
+
+
+class TestMultisendTxRound(BaseLearningRoundTest):
+    """Tests for MultisendTxRound."""
+
+    def get_payloads(self, **kwargs: Any) -> Mapping[str, BaseTxPayload]:
+        """Get the same multisend payload from each participant."""
+        return {
+            participant: MultisendTxPayload(sender=participant, **kwargs)
+            for participant in self.participants
+        }
+
+    def test_flushed(self) -> None:
+        """A flushed batch is handed over to the settlement, with its nonce, and the rest stays queued."""
+        payloads = self.get_payloads(
+            tx_submitter="agent_0",
+            multisend_tx_hash=TX_HASH,
+            transactions=encode_transfers(BATCH),
+            queue=encode_transfers(QUEUE),
+            safe_nonce=5,
+        )
+        self.run_round(
+            MultisendTxRound,
+            payloads,
+            final_data={
+                "most_voted_tx_hash": TX_HASH,
+                "multisend_transactions": BATCH,
+                "multisend_queue": QUEUE,
+                "tx_safe_nonce": 5,
+            },
+            most_voted_payload="agent_0",
+            exit_event=Event.MULTISEND_DONE,
+        )
+
+    def test_queued(self) -> None:
+        """Until the queue is flushed, the agreed queue is kept, and there is nothing to settle."""
+        payloads = self.get_payloads(queue=encode_transfers(BATCH + QUEUE))
+        self.run_round(
+            MultisendTxRound,
+            payloads,
+            final_data={
+                "most_voted_tx_hash": None,
+                "multisend_transactions": None,
+                "multisend_queue": BATCH + QUEUE,
+            },
+            most_voted_payload=None,
+            exit_event=Event.NO_TX,
+        )
+
+    @pytest.mark.parametrize("field", ("transactions", "queue"))
+    def test_invalid_transfers(self, field: str) -> None:
+        """Transfers which cannot be decoded are rejected."""
+        test_round = MultisendTxRound(
+            synchronized_data=self.synchronized_data, context=self.get_context()
+        )
+        payload = MultisendTxPayload(sender="agent_0", **{field: "AAAA"})
+        with pytest.raises(TransactionNotValidError):
+            test_round.check_payload(payload)
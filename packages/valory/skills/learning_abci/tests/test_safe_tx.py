@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's safe transaction tools."""
+
+# pylint: skip-file
+
+from typing import Any, Dict
+from unittest import mock
+
+import pytest
+
+from packages.valory.contracts.gnosis_safe.contract import (
+    GnosisSafeContract,
+    SafeOperation,
+)
+from packages.valory.skills.learning_abci.safe_tx import (
+    get_domain_separator,
+    get_safe_tx_hash,
+)
+
+
+SAFE_ADDRESS = "0x5C5b146905c11Ee1fE7260c0338b52DCA9582a13"
+CHAIN_ID = 100
+
+
+@pytest.mark.parametrize(
+    "tx",
+    (
+        dict(
+            to_address="0x615d3278680337e2D39C3bc5042D959C7938B917",
+            value=1,
+            data=b"",
+            nonce=0,
+        ),
+        dict(
+            to_address="0xA238CBeb142c10Ef7Ad8442C6D1f9E89e07e7761",
+            value=0,
+            data=bytes.fromhex("8d80ff0a") + b"\x01" * 100,
+            nonce=42,
+            operation=SafeOperation.DELEGATE_CALL.value,
+            safe_tx_gas=300_000,
+            base_gas=21_000,
+            gas_price=10**9,
+            gas_token="0x6B175474E89094C44Da98b954EedeAC495271d0F",
+            refund_receiver="0x615d3278680337e2D39C3bc5042D959C7938B917",
+        ),
+    ),
+)
+def test_get_safe_tx_hash(tx: Dict[str, Any]) -> None:
+    """The hash is the one the Safe contract computes, for a Safe >= 1.3.0."""
+    domain_separator = get_domain_separator(CHAIN_ID, SAFE_ADDRESS)
+    contract_tx = dict(tx)
+    safe_nonce = contract_tx.pop("nonce")
+
+    with mock.patch.object(GnosisSafeContract, "get_instance"):
+        expected = GnosisSafeContract.get_raw_safe_transaction_hash(
+            ledger_api=mock.MagicMock(),
+            contract_address=SAFE_ADDRESS,
+            safe_nonce=safe_nonce,
+            safe_version="1.3.0",
+            chain_id=CHAIN_ID,
+            **contract_tx,
+        )["tx_hash"]
+
+    assert get_safe_tx_hash(domain_separator, **tx) == expected.removeprefix("0x")
+
+
+def test_domain_separator_depends_on_the_safe() -> None:
+    """The domain separator changes with the chain and with the Safe."""
+    domain_separator = get_domain_separator(CHAIN_ID, SAFE_ADDRESS)
+    assert len(domain_separator) == 32
+    assert domain_separator != get_domain_separator(1, SAFE_ADDRESS)
+    assert domain_separator != get_domain_separator(
+        CHAIN_ID, "0x615d3278680337e2D39C3bc5042D959C7938B917"
+    )
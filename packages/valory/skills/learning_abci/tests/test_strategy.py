@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+"""Tests for valory/learning_abci skill's decision strategy."""
+
+# pylint: skip-file
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from packages.valory.skills.learning_abci.strategy import (
+    InvalidRuleError,
+    RollingWindows,
+    Strategy,
+)
+
+
+TOKENS = ("autonolas", "ethereum")
+DEFAULT_EVENT = "no_action"
+TRANSACT = "transact"
+RULES: List[Dict[str, Any]] = [
+    {"name": "high", "type": "threshold", "above": 10.0, "event": TRANSACT},
+    {
+        "name": "golden_cross",
+        "type": "crossover",
+        "token": "ethereum",
+        "fast": 2,
+        "slow": 4,
+        "event": "cross",
+    },
+    {
+        "name": "dip",
+        "type": "band",
+        "window": 8,
+        "width": 2.0,
+        "side": "below",
+        "event": "dip",
+    },
+]
+
+
+def get_strategy(rules: List[Dict[str, Any]] = RULES) -> Strategy:
+    """Get a strategy over the test tokens."""
+    return Strategy(rules, TOKENS, DEFAULT_EVENT)
+
+
+@pytest.mark.parametrize(
+    "rule",
+    (
+        {"type": "threshold", "above": 1.0},
+        {"type": "threshold", "above": 1.0, "event": "unknown"},
+        {"type": "threshold", "token": "bitcoin", "above": 1.0, "event": TRANSACT},
+        {"type": "threshold", "event": TRANSACT},
+        {"type": "unknown", "event": TRANSACT},
+        {"type": "crossover", "fast": 4, "slow": 2, "event": TRANSACT},
+        {
+            "type": "crossover",
+            "fast": 2,
+            "slow": 4,
+            "direction": "left",
+            "event": TRANSACT,
+        },
+        {"type": "band", "window": 1, "width": 2.0, "event": TRANSACT},
+        {"type": "band", "window": "long", "width": 2.0, "event": TRANSACT},
+    ),
+)
+def test_invalid_rule(rule: Dict[str, Any]) -> None:
+    """A rule which cannot be compiled is rejected."""
+    with pytest.raises(InvalidRuleError):
+        Strategy([rule], TOKENS, DEFAULT_EVENT, allowed_events={TRANSACT})
+
+
+def test_rolling_windows() -> None:
+    """The moving averages and deviations are the ones of the complete windows, ignoring the missing prices."""
+    rng = np.random.default_rng(0)
+    prices = 1_000.0 + rng.random((20, 2))
+    prices[7, 1] = np.nan
+    windows = RollingWindows(prices)
+    token_index, window = np.array([0, 1]), np.array([3, 5])
+
+    means = windows.mean(token_index, window)
+    stds = windows.std(token_index, window)
+    previous_means = windows.mean(token_index, window, lag=1)
+
+    for rule, (token, size) in enumerate(zip(token_index, window)):
+        assert np.isnan(means[: size - 1, rule]).all()
+        for step in range(size - 1, 20):
+            values = prices[step - size + 1 : step + 1, token]
+            assert means[step, rule] == pytest.approx(np.nanmean(values))
+            assert stds[step, rule] == pytest.approx(np.nanstd(values), abs=1e-9)
+        assert previous_means[size, rule] == pytest.approx(means[size - 1, rule])
+
+
+def test_threshold_rule() -> None:
+    """A threshold rule fires while the price is beyond its level, and not on a missing price."""
+    strategy = get_strategy(RULES[:1])
+    prices = np.array([[9.0, 1.0], [11.0, 1.0], [np.nan, 1.0]])
+    assert strategy.evaluate(prices)[:, 0].tolist() == [False, True, False]
+
+
+def test_crossover_rule() -> None:
+    """A crossover rule fires only at the step where the fast average crosses the slow one."""
+    strategy = get_strategy(RULES[1:2])
+    ethereum = [5.0, 5.0, 5.0, 5.0, 4.0, 4.0, 6.0, 7.0, 8.0]
+    prices = np.column_stack([np.ones(len(ethereum)), ethereum])
+    assert np.flatnonzero(strategy.evaluate(prices)[:, 0]).tolist() == [6]
+
+
+def test_band_rule() -> None:
+    """A band rule fires when the price falls outside of its band, on the given side."""
+    strategy = get_strategy(RULES[2:])
+    autonolas = [1.0, 1.1, 0.9] * 3 + [0.2, 1.0, 1.1]
+    prices = np.column_stack([autonolas, np.ones(len(autonolas))])
+    assert np.flatnonzero(strategy.evaluate(prices)[:, 0]).tolist() == [9]
+
+
+def test_decide_first_rule_wins() -> None:
+    """The first rule which fires decides the event, and the default event is used when none fires."""
+    strategy = get_strategy()
+    prices = np.ones((10, 2))
+    assert strategy.decide(prices) == (DEFAULT_EVENT, None)
+
+    prices[-1, 0] = 0.0
+    assert strategy.decide(prices) == ("dip", "dip")
+
+    prices[:, 0] = 20.0
+    assert strategy.decide(prices) == (TRANSACT, "high")
+
+
+def test_decide_series_matches_decide() -> None:
+    """The event decided at every step of a series is the one decided at the end of its prefix."""
+    rng = np.random.default_rng(1)
+    prices = 10.0 + np.cumsum(rng.normal(scale=0.5, size=(60, 2)), axis=0)
+    strategy = get_strategy()
+
+    events = strategy.decide_series(prices)
+    assert set(events) > {DEFAULT_EVENT}
+    for step in range(len(prices)):
+        assert events[step] == strategy.decide(prices[: step + 1])[0]
+
+
+def test_no_rules() -> None:
+    """Without rules, the default event is always decided."""
+    strategy = get_strategy([])
+    assert strategy.decide(np.ones((3, 2))) == (DEFAULT_EVENT, None)
+    assert strategy.decide_series(np.ones((3, 2))).tolist() == [DEFAULT_EVENT] * 3
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 1_000))
+def test_first_rules_chunked(chunk_size: int) -> None:
+    """The rules which fire do not depend on the size of the chunks the series is evaluated in."""
+    rng = np.random.default_rng(2)
+    prices = 10.0 + np.cumsum(rng.normal(scale=0.5, size=(100, 2)), axis=0)
+    strategy = get_strategy()
+
+    expected = strategy.first_rules(prices)
+    assert (strategy.first_rules(prices, chunk_size) == expected).all()
+    assert (
+        strategy.decide_series(prices, chunk_size) == strategy.decide_series(prices)
+    ).all()
@@ -19,21 +19,27 @@
 
 """This package contains round behaviours of LearningChainedSkillAbci."""
 
-from typing import Set, Type
+from typing import Generator, Set, Type, cast
 
 from packages.valory.skills.abstract_round_abci.behaviours import (
     AbstractRoundBehaviour,
     BaseBehaviour,
 )
-from packages.valory.skills.learning_abci.behaviours import LearningRoundBehaviour
+from packages.valory.skills.learning_abci.behaviours import (
+    PricePrefetchBehaviour,
+    VotingRoundBehaviour,
+)
+from packages.valory.skills.learning_abci.rounds import SynchronizedData
 from packages.valory.skills.learning_chained_abci.composition import (
     LearningChainedSkillAbciApp,
 )
+from packages.valory.skills.learning_chained_abci.models import Params
 from packages.valory.skills.registration_abci.behaviours import (
     AgentRegistrationRoundBehaviour,
     RegistrationStartupBehaviour,
 )
 from packages.valory.skills.reset_pause_abci.behaviours import (
+    ResetAndPauseBehaviour,
     ResetPauseABCIConsensusBehaviour,
 )
 from packages.valory.skills.termination_abci.behaviours import (
@@ -45,6 +51,56 @@ from packages.valory.skills.transaction_settlement_abci.behaviours import (
 )
 
 
+class AdaptiveResetAndPauseBehaviour(ResetAndPauseBehaviour):
+    """Reset and pause for a duration which adapts to the price volatility and to the duration of the period."""
+
+    def get_pause_duration(self) -> float:
+        """
+        Get the duration of the pause before the next period.
+
+        The periods are scheduled every `reset_pause_duration` or `max_reset_pause_duration` seconds, whichever
+        is longer, when the prices are still, and more frequently as their volatility grows beyond
+        `volatility_reference`. The time spent in the current period counts towards the schedule, and the pause
+        is kept between `min_reset_pause_duration` and that longest interval.
+
+        The duration only depends on the synchronized data and on the consensus timestamps,
+        so that all the agents pause for the same duration and agree on it in the `ResetAndPauseRound`.
+
+        :return: the duration of the pause, in seconds
+        """
+        params = cast(Params, self.params)
+        synchronized_data = SynchronizedData(self.synchronized_data.db)
+        volatility = synchronized_data.price_volatility or 0.0
+        max_pause_duration = max(
+            params.reset_pause_duration, params.max_reset_pause_duration
+        )
+        interval = max_pause_duration / (1 + volatility / params.volatility_reference)
+
+        started_at = synchronized_data.period_started_at
+        if started_at is not None:
+            now = self.round_sequence.last_round_transition_timestamp.timestamp()
+            interval -= now - started_at
+
+        return min(max(interval, params.min_reset_pause_duration), max_pause_duration)
+
+    def wait_from_last_timestamp(self, seconds: float) -> Generator:
+        """
+        Wait from the last timestamp, pausing for the adaptive duration instead of `reset_pause_duration`.
+
+        The parent behaviour only waits for `reset_pause_duration` in the periods which do not reset
+        the tendermint nodes, while the reset waits for its own duration.
+
+        :param seconds: the duration requested by the parent behaviour, in seconds.
+        :yield: None
+        """
+        # + 1 because `period_count` starts from 0
+        n_periods_done = self.synchronized_data.period_count + 1
+        if n_periods_done % self.params.reset_tendermint_after != 0:
+            seconds = self.get_pause_duration()
+            self.context.logger.info(f"Pausing for {seconds:.1f}s.")
+        yield from super().wait_from_last_timestamp(seconds)
+
+
 class LearningChainedConsensusBehaviour(AbstractRoundBehaviour):
     """Class to define the behaviours this AbciApp has."""
 
@@ -52,9 +108,10 @@ class LearningChainedConsensusBehaviour(AbstractRoundBehaviour):
     abci_app_cls = LearningChainedSkillAbciApp
     behaviours: Set[Type[BaseBehaviour]] = {
         *AgentRegistrationRoundBehaviour.behaviours,
-        *ResetPauseABCIConsensusBehaviour.behaviours,
+        *(ResetPauseABCIConsensusBehaviour.behaviours - {ResetAndPauseBehaviour}),
+        AdaptiveResetAndPauseBehaviour,
         *TransactionSettlementRoundBehaviour.behaviours,
         *TerminationAbciBehaviours.behaviours,
-        *LearningRoundBehaviour.behaviours,
+        *VotingRoundBehaviour.behaviours,
     }
-    background_behaviours_cls = {BackgroundBehaviour}
+    background_behaviours_cls = {BackgroundBehaviour, PricePrefetchBehaviour}
@@ -39,6 +39,10 @@ abci_app_transition_mapping: AbciAppTransitionMapping = {
     RegistrationAbci.FinishedRegistrationRound: LearningAbci.APICheckRound,
     LearningAbci.FinishedDecisionMakingRound: ResetAndPauseAbci.ResetAndPauseRound,
     LearningAbci.FinishedTxPreparationRound: TxSettlementAbci.RandomnessTransactionSubmissionRound,
+    LearningAbci.FinishedWithoutTxRound: ResetAndPauseAbci.ResetAndPauseRound,
+    LearningAbci.FinishedMultisendRound: TxSettlementAbci.RandomnessTransactionSubmissionRound,
+    LearningAbci.FinishedIPFSRound: ResetAndPauseAbci.ResetAndPauseRound,
+    LearningAbci.FinishedContractInteractionRound: TxSettlementAbci.RandomnessTransactionSubmissionRound,
     TxSettlementAbci.FinishedTransactionSubmissionRound: ResetAndPauseAbci.ResetAndPauseRound,
     TxSettlementAbci.FailedRound: TxSettlementAbci.RandomnessTransactionSubmissionRound,
     ResetAndPauseAbci.FinishedResetAndPauseRound: LearningAbci.APICheckRound,
@@ -54,7 +58,7 @@ termination_config = BackgroundAppConfig(
 LearningChainedSkillAbciApp = chain(
     (
         RegistrationAbci.AgentRegistrationAbciApp,
-        LearningAbci.LearningAbciApp,
+        LearningAbci.VotingAbciApp,
         TxSettlementAbci.TransactionSubmissionAbciApp,
         ResetAndPauseAbci.ResetPauseAbciApp,
     ),
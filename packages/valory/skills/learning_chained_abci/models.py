@@ -19,14 +19,19 @@
 
 """This module contains the shared state for the abci skill of LearningChainedSkillAbciApp."""
 
-from packages.valory.skills.abstract_round_abci.models import (
-    BenchmarkTool as BaseBenchmarkTool,
-)
 from packages.valory.skills.abstract_round_abci.models import Requests as BaseRequests
 from packages.valory.skills.abstract_round_abci.tests.data.dummy_abci.models import (
     RandomnessApi as BaseRandomnessApi,
 )
+from packages.valory.skills.learning_abci.models import (
+    BenchmarkTool as LearningBenchmarkTool,
+)
+from packages.valory.skills.learning_abci.models import FeeOracle as LearningFeeOracle
+from packages.valory.skills.learning_abci.models import IPFSCache as LearningIPFSCache
 from packages.valory.skills.learning_abci.models import Params as LearningParams
+from packages.valory.skills.learning_abci.models import (
+    RateLimiter as LearningRateLimiter,
+)
 from packages.valory.skills.learning_abci.models import SharedState as BaseSharedState
 from packages.valory.skills.learning_abci.rounds import Event as LearningEvent
 from packages.valory.skills.learning_chained_abci.composition import (
@@ -34,10 +39,14 @@ from packages.valory.skills.learning_chained_abci.composition import (
 )
 from packages.valory.skills.reset_pause_abci.rounds import Event as ResetPauseEvent
 from packages.valory.skills.termination_abci.models import TerminationParams
+from packages.valory.skills.transaction_settlement_abci.models import TransactionParams
 
 
 Requests = BaseRequests
-BenchmarkTool = BaseBenchmarkTool
+BenchmarkTool = LearningBenchmarkTool
+RateLimiter = LearningRateLimiter
+FeeOracle = LearningFeeOracle
+IPFSCache = LearningIPFSCache
 
 RandomnessApi = BaseRandomnessApi
 
@@ -60,15 +69,23 @@ class SharedState(BaseSharedState):
 
         LearningChainedSkillAbciApp.event_to_timeout[
             ResetPauseEvent.RESET_AND_PAUSE_TIMEOUT
-        ] = (self.context.params.reset_pause_duration + MARGIN)
+        ] = (
+            max(
+                self.context.params.reset_pause_duration,
+                self.context.params.max_reset_pause_duration,
+            )
+            + MARGIN
+        )
 
-        LearningChainedSkillAbciApp.event_to_timeout[LearningEvent.ROUND_TIMEOUT] = (
-            self.context.params.round_timeout_seconds * MULTIPLIER
+        LearningChainedSkillAbciApp.event_to_timeout[LearningEvent.ROUND_TIMEOUT] = max(
+            self.context.params.round_timeout_seconds * MULTIPLIER,
+            self.context.params.min_round_timeout,
         )
 
 
 class Params(  # pylint: disable=too-many-ancestors
     LearningParams,
     TerminationParams,
+    TransactionParams,
 ):
     """A model to represent params for multiple abci apps."""
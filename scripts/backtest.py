@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ------------------------------------------------------------------------------
+#
+#   Copyright 2023-2024 Valory AG
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ------------------------------------------------------------------------------
+
+
+"""
+Script for backtesting the decision strategy of the learning service.
+
+This script
+
+- Loads a recorded price series, from a CSV file with a header of `timestamp,<token id>,...`
+  (missing prices written as `nan`), or from a `.npy` array of shape (steps, tokens)
+- Replays it through the same rule engine as the `DecisionMakingBehaviour`
+- Reports the event counts, the simulated transfers and the PnL of the strategy
+- Optionally sweeps a grid of rule parameters across a pool of processes
+
+The rules are read from a YAML file with a list of rules, or by default from the `decision_rules`
+of the `learning_abci` skill. Besides the keys used by the skill, a rule may have an `action`
+(`buy` or `sell`) and an `amount`, which are used to simulate its trades.
+
+Run it from the root of the repository, e.g.:
+
+    python -m scripts.backtest prices.csv --rules rules.yaml --sweep sweep.yaml
+
+A sweep file maps `<rule index>.<key>` to the list of values to try, e.g.:
+
+    0.above: [1.1, 1.2, 1.3]
+    1.fast: [5, 10]
+"""
+
+import copy
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import click
+import numpy as np
+import yaml
+
+from packages.valory.skills.learning_abci.strategy import Strategy
+
+
+SKILL_YAML = Path("packages", "valory", "skills", "learning_abci", "skill.yaml")
+DEFAULT_EVENT = "done"
+TRANSACT_EVENT = "transact"
+BUY = "buy"
+SELL = "sell"
+
+_worker_prices: Optional[np.ndarray] = None
+_worker_token_ids: Tuple[str, ...] = ()
+
+
+@dataclass
+class BacktestResult:
+    """The result of a backtest."""
+
+    parameters: Dict[str, Any]
+    steps: int
+    event_counts: Dict[str, int]
+    transfers: int
+    transferred_amount: float
+    trades: int
+    pnl: float
+    max_drawdown: float
+
+
+def load_prices(
+    path: Path, token_ids: Optional[Sequence[str]]
+) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """Load a price series and the ids of its tokens."""
+    if path.suffix == ".npy":
+        prices = np.load(path)
+        if prices.ndim == 1:
+            prices = prices[:, None]
+        if token_ids is None:
+            raise click.BadParameter("The token ids are required for a .npy series.")
+        return prices.astype(np.float64), tuple(token_ids)
+
+    with open(path, "r", encoding="utf-8") as file:
+        header = file.readline().strip().split(",")
+    columns = header[1:] if token_ids is None else list(token_ids)
+    indices = [header.index(token_id) for token_id in columns]
+    prices = np.loadtxt(
+        path, delimiter=",", skiprows=1, usecols=indices, ndmin=2, dtype=np.float64
+    )
+    return prices, tuple(columns)
+
+
+def load_rules(path: Optional[Path]) -> List[Dict[str, Any]]:
+    """Load the rules from a file, or from the skill configuration."""
+    if path is not None:
+        with open(path, "r", encoding="utf-8") as file:
+            return yaml.safe_load(file)
+
+    with open(SKILL_YAML, "r", encoding="utf-8") as file:
+        skill = yaml.safe_load(file)
+    return skill["models"]["params"]["args"]["decision_rules"]
+
+
+def backtest(
+    prices: np.ndarray,
+    token_ids: Sequence[str],
+    rules: List[Dict[str, Any]],
+    parameters: Optional[Dict[str, Any]] = None,
+    chunk_size: Optional[int] = None,
+) -> BacktestResult:
+    """
+    Replay a price series through a strategy, and simulate its transfers and trades.
+
+    Each `transact` event is counted as a transfer of the `amount` of its rule. A rule with an `action`
+    buys or sells the `amount` of its token at the price of the step; the PnL marks the final position
+    to the last known price.
+
+    :param prices: the price series, of shape (steps, tokens).
+    :param token_ids: the ids of the tokens, in the order of the columns.
+    :param rules: the rules of the strategy.
+    :param parameters: the swept parameters of the rules, reported with the result.
+    :param chunk_size: the number of steps to evaluate at once.
+    :return: the result of the backtest.
+    """
+    strategy = Strategy(rules, token_ids, DEFAULT_EVENT)
+    first = strategy.first_rules(prices, chunk_size)
+    events = np.array([*strategy.events, DEFAULT_EVENT], dtype=object)[first]
+    labels, counts = np.unique(events, return_counts=True)
+
+    amounts = np.array([float(rule.get("amount", 1.0)) for rule in rules] + [0.0])
+    directions = np.array(
+        [{BUY: 1.0, SELL: -1.0}.get(rule.get("action"), 0.0) for rule in rules] + [0.0]
+    )
+    tokens = np.array(
+        [token_ids.index(rule.get("token", token_ids[0])) for rule in rules] + [0]
+    )
+    transfers = events == TRANSACT_EVENT
+
+    # quantities bought (positive) or sold (negative) of each token, at each step
+    quantities = np.zeros_like(prices)
+    quantities[np.arange(len(first)), tokens[first]] = (
+        directions[first] * amounts[first]
+    )
+    # no trade can be filled without a price
+    quantities[np.isnan(prices)] = 0.0
+    traded = np.nan_to_num(quantities * prices)
+    filled = _forward_fill(prices)
+    positions = np.cumsum(quantities, axis=0)
+    equity = np.nansum(positions * filled, axis=1) - np.cumsum(traded.sum(axis=1))
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+
+    return BacktestResult(
+        parameters=parameters or {},
+        steps=int(prices.shape[0]),
+        event_counts=dict(zip(labels.tolist(), counts.tolist())),
+        transfers=int(transfers.sum()),
+        transferred_amount=float(amounts[first][transfers].sum()),
+        trades=int(np.count_nonzero(directions[first])),
+        pnl=float(equity[-1]) if len(equity) else 0.0,
+        max_drawdown=float(drawdown.max()) if len(drawdown) else 0.0,
+    )
+
+
+def _forward_fill(prices: np.ndarray) -> np.ndarray:
+    """Replace the missing prices with the last known ones."""
+    valid = ~np.isnan(prices)
+    last_valid = np.where(valid, np.arange(prices.shape[0])[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return prices[last_valid, np.arange(prices.shape[1])]
+
+
+def expand_grid(
+    rules: List[Dict[str, Any]], grid: Dict[str, List[Any]]
+) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Get the rules for every combination of the values of a parameter grid."""
+    keys = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        parameters = dict(zip(keys, values))
+        variant = copy.deepcopy(rules)
+        for key, value in parameters.items():
+            rule_index, rule_key = key.split(".", 1)
+            variant[int(rule_index)][rule_key] = value
+        variants.append((parameters, variant))
+    return variants
+
+
+def _init_worker(prices: np.ndarray, token_ids: Tuple[str, ...]) -> None:
+    """Keep the price series in the worker, so that it is not sent with every task."""
+    global _worker_prices, _worker_token_ids  # pylint: disable=global-statement
+    _worker_prices, _worker_token_ids = prices, token_ids
+
+
+def _run_variant(
+    variant: Tuple[Dict[str, Any], List[Dict[str, Any]]], chunk_size: Optional[int]
+) -> BacktestResult:
+    """Backtest a variant of the rules in a worker."""
+    parameters, rules = variant
+    return backtest(
+        np.asarray(_worker_prices), _worker_token_ids, rules, parameters, chunk_size
+    )
+
+
+@click.command()
+@click.argument(
+    "prices_path", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "--rules",
+    "rules_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="YAML file with the list of rules.",
+)
+@click.option(
+    "--tokens", help="Comma separated token ids, in the order of the columns to use."
+)
+@click.option(
+    "--sweep",
+    "sweep_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="YAML file with the grid of rule parameters to sweep.",
+)
+@click.option(
+    "--workers", type=int, default=None, help="Number of processes for the sweep."
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=100_000,
+    show_default=True,
+    help="Steps evaluated at once.",
+)
+@click.option(
+    "--top",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Number of sweep results to report, by PnL.",
+)
+def main(  # pylint: disable=too-many-arguments
+    prices_path: Path,
+    rules_path: Optional[Path],
+    tokens: Optional[str],
+    sweep_path: Optional[Path],
+    workers: Optional[int],
+    chunk_size: int,
+    top: int,
+) -> None:
+    """Backtest the decision rules over a recorded price series."""
+    token_ids = None if tokens is None else tokens.split(",")
+    prices, columns = load_prices(prices_path, token_ids)
+    rules = load_rules(rules_path)
+
+    if sweep_path is None:
+        result = backtest(prices, columns, rules, chunk_size=chunk_size)
+        click.echo(json.dumps(asdict(result), indent=2))
+        return
+
+    with open(sweep_path, "r", encoding="utf-8") as file:
+        grid = yaml.safe_load(file)
+    variants = expand_grid(rules, grid)
+    click.echo(f"Backtesting {len(variants)} variants over {prices.shape[0]} steps...")
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(prices, columns)
+    ) as executor:
+        results = list(
+            executor.map(
+                _run_variant,
+                variants,
+                itertools.repeat(chunk_size),
+                chunksize=max(len(variants) // (4 * (workers or 1)), 1),
+            )
+        )
+
+    results.sort(key=lambda result: result.pnl, reverse=True)
+    click.echo(json.dumps([asdict(result) for result in results[:top]], indent=2))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter